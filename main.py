@@ -6,6 +6,7 @@ import tkinter as tk  # For creating the GUI
 from tkinter import messagebox  # For displaying message boxes in the GUI
 from src.core.textractor import Textractor  # Import our main application class
 from src.config.settings import LOG_FILE, WINDOW_WIDTH, WINDOW_HEIGHT  # Import settings
+from src.utils import profiler  # Optional Tk handler profiling
 
 
 def setup_logging():
@@ -29,10 +30,12 @@ def setup_logging():
     logging.getLogger('').addHandler(console)
 
 
-def run_application():
+def run_application(profile_path=None, record_path=None):
     """
     Initialize and run the main application.
     This function sets up logging, creates the main window, and starts the application.
+    With profile_path, Tk handlers are timed and a Chrome trace is written there on exit.
+    With record_path, the session's input events are saved there on exit, for src.ui.replay.
     """
     # Set up logging
     setup_logging()
@@ -40,6 +43,12 @@ def run_application():
     # Create a logger object for this module
     logger = logging.getLogger(__name__)
 
+    # Profiling has to start before any widget registers a callback
+    if profile_path:
+        profiler.enable()
+
+    recorder = None
+
     try:
         # Log the start of application initialization
         logger.info("Initializing the Textractor application.")
@@ -61,6 +70,11 @@ def run_application():
         # Create an instance of our main application class
         app = Textractor(root)
 
+        # Record the session for replaying it headlessly
+        if record_path:
+            from src.ui.replay import InteractionRecorder
+            recorder = InteractionRecorder(app)
+
         # Log successful initialization
         logger.info("Application initialized successfully. Starting main loop.")
 
@@ -76,6 +90,14 @@ def run_application():
         messagebox.showerror("Error", f"An unexpected error occurred: {str(e)}")
 
     finally:
+        # Write the trace and the per-handler latency summary if profiling was on
+        tracer = profiler.disable()
+        if tracer is not None:
+            tracer.save(profile_path)
+            logger.info(f"Trace written to {profile_path}\n{tracer.summary()}")
+        if recorder is not None:
+            recorder.save(record_path)
+
         # Log application closure, whether it closed normally or due to an error
         logger.info("Application closed.")
 
@@ -1,6 +1,7 @@
 # run.py
 
 # Import necessary modules
+import argparse  # For command line options
 import sys  # For system-specific parameters and functions
 import logging  # For logging messages
 from dependency_checker import dependency_checker  # Custom module to check for required dependencies
@@ -12,6 +13,19 @@ def main():
     This function sets up logging, checks dependencies, and launches the application.
     """
 
+    # Parse command line options
+    # --profile times every Tk handler and writes a Chrome/Perfetto trace when the window closes
+    parser = argparse.ArgumentParser(description="Kev's Textractor")
+    parser.add_argument("--profile", nargs="?", const="textractor_trace.json", default=None, metavar="TRACE",
+                        help="Profile UI handlers and worker threads, writing a trace (default textractor_trace.json)")
+    # --record saves the session's input events for replaying them without a display (python -m src.ui.replay)
+    parser.add_argument("--record", default=None, metavar="TRACE",
+                        help="Record pointer events and menu choices to a replayable session trace")
+    # --perf-profile laptop|workstation|batch-server and --set key=value tune threads, caches and preview size
+    from src.cli import add_performance_arguments, configure_performance
+    add_performance_arguments(parser)
+    args = parser.parse_args()
+
     # Set up logging configuration
     # This will log messages with timestamps, logger name, log level, and the actual message
     logging.basicConfig(
@@ -32,12 +46,16 @@ def main():
         logger.info("All dependencies are satisfied. Launching the application.")
 
         try:
+            # Apply the performance settings before anything sizes a pool or a cache from them
+            configure_performance(parser, args)
+
             # Import the run_application function from the main module
             # We import here rather than at the top of the file to ensure all dependencies are met before importing
             from main import run_application
+            from src.config.settings import PROFILE_TRACE_PATH
 
             # Run the main application
-            run_application()
+            run_application(profile_path=args.profile or PROFILE_TRACE_PATH, record_path=args.record)
 
         except ImportError as e:
             # If there's an error importing the main module, log the error and exit
@@ -0,0 +1,411 @@
+# src/cli.py
+#
+# Headless command line entry point: python -m src.cli <command> ...
+# Nothing imported here may pull in tkinter.
+
+import argparse
+import logging
+import sys
+from typing import List, Optional, Tuple
+
+from src.config.settings import LOG_FORMAT, DEFAULT_QUALITY_PROFILE, DEFAULT_RESOLUTION, ATLAS_MAX_SIZE, \
+    ATLAS_PADDING, AUTO_DETECT_MIN_CONFIDENCE, PHASH_DUPLICATE_DISTANCE, QUEUE_LEASE_SECONDS, POSTPROCESS_PRESETS, \
+    PERFORMANCE_PROFILES, STITCH_BLEND_MODES, STITCH_TILE_SIZE, STACK_METHODS, TEXTURE_PACK_FORMATS
+
+logger = logging.getLogger(__name__)
+
+
+def render_overrides(args: argparse.Namespace) -> dict:
+    """Per-quad settings replaced for this run by --resolution, --quality and --postprocess."""
+    overrides = {}
+    if args.resolution:
+        overrides["resolution"] = args.resolution
+    if args.quality:
+        overrides["quality"] = args.quality
+    if args.postprocess:
+        overrides["postprocess"] = POSTPROCESS_PRESETS[args.postprocess]
+    return overrides
+
+
+def cmd_reexport(args: argparse.Namespace) -> int:
+    from src.core.project import Project
+
+    project = Project.load(args.project)
+    overrides = render_overrides(args)
+    summary = project.reexport(workers=args.workers, force=args.force, overrides=overrides, dry_run=args.dry_run)
+    for output in summary.rendered:
+        print(("would render " if args.dry_run else "rendered ") + output)
+    for output, error in summary.failed.items():
+        print(f"FAILED {output}: {error}", file=sys.stderr)
+    print(summary)
+    return 1 if summary.failed else 0
+
+
+def parse_point(value: str) -> Tuple[float, float]:
+    try:
+        x, y = map(float, value.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected a point as X,Y, got {value!r}")
+    return x, y
+
+
+def cmd_sequence(args: argparse.Namespace) -> int:
+    from src.core.camera import get_camera_profile
+    from src.core.postprocess import PostProcessChain
+    from src.core.sequence import extract_sequence
+
+    count = extract_sequence(args.source, args.output, args.points, resolution=args.resolution,
+                             quality=args.quality, aspect_mode=args.aspect_mode, aspect_ratio=args.aspect_ratio,
+                             track=args.track, fps=args.fps, camera=get_camera_profile(args.camera),
+                             postprocess=PostProcessChain.from_preset(args.postprocess) if args.postprocess else None)
+    print(f"{count} frames written to {args.output}")
+    return 0
+
+
+def cmd_atlas(args: argparse.Namespace) -> int:
+    import os
+    from src.core.atlas import write_atlas
+    from src.core.project import Project
+
+    project = Project.load(args.project)
+    overrides = {"resolution": args.resolution} if args.resolution else None
+    textures = ((os.path.normpath(os.path.splitext(task.quad["output"])[0]), image)
+                for task, image in project.render(overrides))
+    uv_map = write_atlas(args.output, textures, padding=args.padding, max_size=args.max_size)
+    print(f"{len(uv_map['textures'])} textures packed into {len(uv_map['pages'])} page(s)")
+    return 0
+
+
+def cmd_stitch(args: argparse.Namespace) -> int:
+    import json
+    import os
+    from src.core.stitch import Stitcher, load_stitch_spec, register_pieces
+
+    with open(args.spec, 'r') as f:
+        spec = json.load(f)
+    pieces, width, height = load_stitch_spec(spec, os.path.dirname(os.path.abspath(args.spec)))
+    if args.register:
+        register_pieces(pieces)
+    stitcher = Stitcher(pieces, width, height, blend=args.blend, quality=args.quality, tile=args.tile)
+    stitcher.write(args.output)
+    print(f"{len(pieces)} pieces stitched into {args.output} ({stitcher.width}x{stitcher.height})")
+    return 0
+
+
+def cmd_stack(args: argparse.Namespace) -> int:
+    import json
+    import os
+    from src.core.camera import get_camera_profile
+    from src.core.engine import save_texture
+    from src.core.stack import load_stack_spec, stack_quads
+
+    with open(args.spec, 'r') as f:
+        spec = json.load(f)
+    frames, width, height = load_stack_spec(spec, os.path.dirname(os.path.abspath(args.spec)))
+    stacked = stack_quads(frames, width, height, method=args.method, quality=args.quality,
+                          camera=get_camera_profile(args.camera), align=args.align)
+    save_texture(args.output, stacked)
+    print(f"{len(frames)} frames stacked into {args.output} ({stacked.shape[1]}x{stacked.shape[0]}, {args.method})")
+    return 0
+
+
+def cmd_detect(args: argparse.Namespace) -> int:
+    import os
+    from src.core.engine import ExtractionSession, load_image
+    from src.core.project import Project
+    from src.core.phash_index import HashIndex, quad_hash
+    from src.core.quad_detector import detect_quads
+    from src.core.sequence import list_sequence_files
+
+    project = Project.load_or_create(args.project)
+    index = HashIndex.load(args.index)
+    images = [path for source in args.images for path in (list_sequence_files(source) or [source])]
+    added = skipped = duplicates = 0
+    for path in images:
+        try:
+            image = load_image(path)
+        except Exception as e:
+            print(f"FAILED {path}: {e}", file=sys.stderr)
+            skipped += 1
+            continue
+        quads = [quad for quad in detect_quads(image, max_quads=args.max_quads)
+                 if quad.confidence >= args.min_confidence]
+        if not quads:
+            print(f"skipped {path}: no quad above confidence {args.min_confidence:.2f}")
+            skipped += 1
+            continue
+        session = ExtractionSession(image)
+        session.set_resolution(args.resolution or project.data["defaults"]["resolution"])
+        session.quality_profile = args.quality or project.data["defaults"]["quality"]
+        for quad in quads:
+            region_hash = quad_hash(image, quad.points)
+            duplicate = index.find_duplicate(region_hash, args.max_distance, kind="source")
+            if duplicate is not None:
+                print(f"{'skipped' if args.skip_duplicates else 'duplicate'} {path}: "
+                      f"near-identical to {duplicate['path']} in {duplicate['source']}")
+                duplicates += 1
+                if args.skip_duplicates:
+                    continue
+            session.set_points(quad.points)
+            output = project.add_selection(path, session)["output"]
+            index.add(region_hash, project.resolve(output), kind="source", source=os.path.abspath(path),
+                      points=[list(point) for point in quad.points])
+            print(f"added {os.path.normpath(output)} from {path} (confidence {quad.confidence:.2f})")
+            added += 1
+    project.save()
+    index.save()
+    print(f"{added} selections added, {skipped} images skipped, {duplicates} duplicates")
+    if args.export:
+        summary = project.reexport(workers=args.workers)
+        print(summary)
+        return 1 if summary.failed else 0
+    return 0
+
+
+def cmd_index(args: argparse.Namespace) -> int:
+    import os
+    from src.core.engine import load_image
+    from src.core.phash_index import HashIndex, phash
+    from src.core.sequence import list_sequence_files
+
+    index = HashIndex.load(args.index)
+    paths = [path for source in args.textures for path in (list_sequence_files(source) or [source])]
+    duplicates = 0
+    for path in paths:
+        path = os.path.abspath(path)
+        texture_hash = phash(load_image(path))
+        duplicate = index.find_duplicate(texture_hash, args.max_distance, kind="texture", exclude_path=path)
+        if duplicate is not None:
+            print(f"duplicate {path}: near-identical to {duplicate['path']}")
+            duplicates += 1
+        if not args.report_only:
+            index.add(texture_hash, path)
+    if not args.report_only:
+        index.save()
+    print(f"{len(paths)} textures checked, {duplicates} duplicates, {len(index)} in the index")
+    return 0
+
+
+def cmd_queue(args: argparse.Namespace) -> int:
+    from src.core.project import Project
+    from src.core.work_queue import WorkQueue, run_worker
+
+    queue = WorkQueue(args.queue, lease_seconds=args.lease)
+    if args.action == "submit":
+        submitted = queue.submit(Project.load(args.project), force=args.force, overrides=render_overrides(args))
+        print(f"{len(submitted)} job(s) queued in {queue.root}")
+    elif args.action == "work":
+        processed = run_worker(queue, worker=args.name, wait=args.wait)
+        print(f"{processed} job(s) processed")
+
+    status = queue.status()
+    if args.action == "status" and args.project:
+        summary = queue.collect(Project.load(args.project))
+        print(f"project updated: {summary}")
+    for output, error in status.failed.items():
+        print(f"FAILED {output}: {error}", file=sys.stderr)
+    print(status)
+    return 1 if status.failed or status.counts["failed"] else 0
+
+
+def cmd_pack(args: argparse.Namespace) -> int:
+    import os
+    from src.core.engine import save_texture
+    from src.core.project import Project
+    from src.core.texture_pack import TexturePack
+
+    if args.action == "build":
+        summary = Project.load(args.project).export_pack(args.pack, format=args.format, force=args.force,
+                                                         overrides=render_overrides(args))
+        for name, error in summary.failed.items():
+            print(f"FAILED {name}: {error}", file=sys.stderr)
+        print(summary)
+        return 1 if summary.failed else 0
+    if args.action == "compact":
+        with TexturePack(args.pack, "a") as pack:
+            print(f"{pack.compact()} bytes reclaimed, {len(pack)} textures in {pack.size} bytes")
+        return 0
+    with TexturePack(args.pack) as pack:
+        if args.action == "extract":
+            names = args.names or list(pack)
+            root = os.path.realpath(args.output)
+            extracted = 0
+            for name in names:
+                output = args.output
+                if len(names) > 1 or not args.names:
+                    # Names come from the pack; one like "../x.png" must not write outside the target directory
+                    output = os.path.realpath(os.path.join(root, name))
+                    try:
+                        inside = os.path.commonpath([root, output]) == root and output != root
+                    except ValueError:  # On another drive
+                        inside = False
+                    if not inside:
+                        print(f"FAILED {name}: outside {args.output}", file=sys.stderr)
+                        continue
+                os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+                save_texture(output, pack.read(name))
+                extracted += 1
+            print(f"{extracted} textures extracted")
+            return 0 if extracted == len(names) else 1
+        for entry in pack.entries():
+            print(f"{entry.name}  {entry.width}x{entry.height}x{entry.channels} {entry.dtype} {entry.format}  "
+                  f"{entry.length} bytes  source {(entry.source_hash or '-')[:12]}")
+        print(f"{len(pack)} textures, {pack.size} bytes ({pack.dead_bytes} dead)")
+    return 0
+
+
+def add_performance_arguments(parser: argparse.ArgumentParser) -> None:
+    """--perf-profile and --set, shared with the GUI launcher (run.py)."""
+    parser.add_argument("--perf-profile", choices=list(PERFORMANCE_PROFILES),
+                        help="Performance profile (overrides performance.json and TEXTRACTOR_PERF_PROFILE)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Override one performance setting, e.g. --set extraction_workers=4 (repeatable)")
+
+
+def configure_performance(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    from src.config.performance import configure, parse_overrides
+
+    try:
+        configure(args.perf_profile, parse_overrides(args.set))
+    except ValueError as e:
+        parser.error(str(e))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="Kev's Textractor command line tools")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Enable debug logging")
+    add_performance_arguments(parser)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    reexport = subparsers.add_parser("reexport", help="Re-render the outputs of a project whose inputs changed")
+    reexport.add_argument("project", help="Project file (.json)")
+    reexport.add_argument("--resolution", help="Override the resolution of every quad, e.g. 2048x2048 or Source")
+    reexport.add_argument("--quality", help="Override the quality profile of every quad")
+    reexport.add_argument("--postprocess", choices=list(POSTPROCESS_PRESETS),
+                          help="Override the post-processing preset of every quad")
+    reexport.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    reexport.add_argument("--force", action="store_true", help="Render every output, even if up to date")
+    reexport.add_argument("--dry-run", action="store_true", help="Only list the outputs that would be rendered")
+    reexport.set_defaults(func=cmd_reexport)
+
+    sequence = subparsers.add_parser("sequence", help="Rectify the same quad in every frame of a video or sequence")
+    sequence.add_argument("source", help="Video file, printf pattern (frame_%%04d.png), glob pattern or directory")
+    sequence.add_argument("output", help="Output video (.mp4/.avi/...), printf pattern or directory")
+    sequence.add_argument("--points", type=parse_point, nargs=4, required=True, metavar="X,Y",
+                          help="Quad corners in the first frame, clockwise from top-left")
+    sequence.add_argument("--resolution", default=DEFAULT_RESOLUTION, help="Output size, e.g. 1024x1024 or Source")
+    sequence.add_argument("--quality", default=DEFAULT_QUALITY_PROFILE, help="Quality profile")
+    sequence.add_argument("--aspect-mode", default="Estimated", choices=["Estimated", "Square", "Custom"])
+    sequence.add_argument("--aspect-ratio", type=float, default=None, help="Aspect ratio for --aspect-mode Custom")
+    sequence.add_argument("--track", action="store_true", help="Follow the quad with optical flow")
+    sequence.add_argument("--fps", type=float, default=None, help="Output frame rate for videos")
+    sequence.add_argument("--camera", help="Camera profile (from camera_profiles.json) to correct lens distortion")
+    sequence.add_argument("--postprocess", choices=list(POSTPROCESS_PRESETS), help="Post-processing preset per frame")
+    sequence.set_defaults(func=cmd_sequence)
+
+    atlas = subparsers.add_parser("atlas", help="Pack every texture of a project into an atlas with a UV map")
+    atlas.add_argument("project", help="Project file (.json)")
+    atlas.add_argument("output", help="Atlas image; the UV map is written next to it as .json")
+    atlas.add_argument("--padding", type=int, default=ATLAS_PADDING, help="Edge bleed around each texture")
+    atlas.add_argument("--max-size", type=int, default=ATLAS_MAX_SIZE, help="Maximum page width/height")
+    atlas.add_argument("--resolution", help="Override the resolution of every quad")
+    atlas.set_defaults(func=cmd_atlas)
+
+    stitch = subparsers.add_parser("stitch", help="Stitch quads from overlapping photos into one planar texture")
+    stitch.add_argument("spec", help="Stitch description (.json) with the output size and every piece")
+    stitch.add_argument("output", help="Output image, or .npy to write it tile by tile through a memory map")
+    stitch.add_argument("--blend", default="multiband", choices=list(STITCH_BLEND_MODES), help="Seam blending")
+    stitch.add_argument("--tile", type=int, default=STITCH_TILE_SIZE, help="Pixels rendered per tile side")
+    stitch.add_argument("--quality", default=DEFAULT_QUALITY_PROFILE, help="Quality profile")
+    stitch.add_argument("--register", action="store_true",
+                        help="Shift each piece to line up with the piece it overlaps most")
+    stitch.set_defaults(func=cmd_stitch)
+
+    stack = subparsers.add_parser("stack", help="Average the same surface from several photos into one texture")
+    stack.add_argument("spec", help="Stack description (.json) with the quad in every photo")
+    stack.add_argument("output", help="Output image")
+    stack.add_argument("--method", default="median", choices=list(STACK_METHODS), help="How frames are combined")
+    stack.add_argument("--quality", default=DEFAULT_QUALITY_PROFILE, help="Quality profile")
+    stack.add_argument("--camera", help="Camera profile (from camera_profiles.json) to correct lens distortion")
+    stack.add_argument("--align", action="store_true",
+                       help="Shift each warped frame to line up with the first, for slightly different selections")
+    stack.set_defaults(func=cmd_stack)
+
+    detect = subparsers.add_parser("detect", help="Detect texture quads in images and add them to a project")
+    detect.add_argument("project", help="Project file (.json), created if missing")
+    detect.add_argument("images", nargs="+", help="Image files, directories or glob patterns")
+    detect.add_argument("--min-confidence", type=float, default=AUTO_DETECT_MIN_CONFIDENCE,
+                        help="Skip detections scoring lower than this (0-1)")
+    detect.add_argument("--max-quads", type=int, default=1, help="Maximum number of quads added per image")
+    detect.add_argument("--resolution", help="Resolution of the added quads, e.g. 2048x2048 or Source")
+    detect.add_argument("--quality", help="Quality profile of the added quads")
+    detect.add_argument("--export", action="store_true", help="Re-export the project afterwards")
+    detect.add_argument("--workers", type=int, default=None, help="Number of worker processes for --export")
+    detect.add_argument("--skip-duplicates", action="store_true",
+                        help="Do not add quads whose region matches one already in the duplicate index")
+    detect.add_argument("--max-distance", type=int, default=PHASH_DUPLICATE_DISTANCE,
+                        help="Perceptual hash bits that may differ between duplicates")
+    detect.add_argument("--index", default=None, help="Duplicate index file (defaults to the one the GUI uses)")
+    detect.set_defaults(func=cmd_detect)
+
+    index = subparsers.add_parser("index", help="Add textures to the duplicate index and report near-duplicates")
+    index.add_argument("textures", nargs="+", help="Texture files, directories or glob patterns")
+    index.add_argument("--max-distance", type=int, default=PHASH_DUPLICATE_DISTANCE,
+                       help="Perceptual hash bits that may differ between duplicates")
+    index.add_argument("--report-only", action="store_true", help="Only report duplicates, do not add anything")
+    index.add_argument("--index", default=None, help="Duplicate index file (defaults to the one the GUI uses)")
+    index.set_defaults(func=cmd_index)
+
+    queue = subparsers.add_parser("queue", help="Share a project re-export between hosts through a shared directory")
+    queue_actions = queue.add_subparsers(dest="action", required=True)
+    queue_submit = queue_actions.add_parser("submit", help="Queue one job per source with stale outputs")
+    queue_work = queue_actions.add_parser("work", help="Claim and run jobs until the queue is drained")
+    queue_status = queue_actions.add_parser("status", help="Summarize progress and failures")
+    for action in (queue_submit, queue_work, queue_status):
+        action.add_argument("queue", help="Shared queue directory")
+        action.add_argument("--lease", type=float, default=QUEUE_LEASE_SECONDS,
+                            help="Seconds without a heartbeat before a claimed job is handed to another worker")
+    queue_submit.add_argument("project", help="Project file (.json)")
+    queue_submit.add_argument("--resolution", help="Override the resolution of every quad")
+    queue_submit.add_argument("--quality", help="Override the quality profile of every quad")
+    queue_submit.add_argument("--postprocess", choices=list(POSTPROCESS_PRESETS),
+                              help="Override the post-processing preset of every quad")
+    queue_submit.add_argument("--force", action="store_true", help="Queue every output, even if up to date")
+    queue_work.add_argument("--name", help="Worker name in the summary (default host:pid)")
+    queue_work.add_argument("--wait", action="store_true", help="Keep polling for new jobs instead of exiting")
+    queue_status.add_argument("--project", help="Record finished outputs in this project's build map")
+    queue.set_defaults(func=cmd_queue)
+
+    pack = subparsers.add_parser("pack", help="Keep a project's textures in one indexed, memory-mapped pack file")
+    pack_actions = pack.add_subparsers(dest="action", required=True)
+    pack_build = pack_actions.add_parser("build", help="Render a project into a pack, skipping unchanged textures")
+    pack_list = pack_actions.add_parser("list", help="List the textures of a pack")
+    pack_extract = pack_actions.add_parser("extract", help="Write textures of a pack out as image files")
+    pack_compact = pack_actions.add_parser("compact", help="Reclaim the space of replaced and removed textures")
+    pack_build.add_argument("project", help="Project file (.json)")
+    for action in (pack_build, pack_list, pack_extract, pack_compact):
+        action.add_argument("pack", help="Texture pack file")
+    pack_build.add_argument("--format", default="raw", choices=list(TEXTURE_PACK_FORMATS),
+                            help="raw pixels for zero-copy reads, or png for smaller packs")
+    pack_build.add_argument("--resolution", help="Override the resolution of every quad")
+    pack_build.add_argument("--quality", help="Override the quality profile of every quad")
+    pack_build.add_argument("--postprocess", choices=list(POSTPROCESS_PRESETS),
+                            help="Apply a post-processing preset to every texture")
+    pack_build.add_argument("--force", action="store_true", help="Render every texture, even if up to date")
+    pack_extract.add_argument("output", help="Output image for one name, else a directory")
+    pack_extract.add_argument("names", nargs="*", help="Textures to extract (default all)")
+    pack.set_defaults(func=cmd_pack)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format=LOG_FORMAT)
+    configure_performance(parser, args)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
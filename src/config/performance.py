@@ -0,0 +1,137 @@
+# src/config/performance.py
+#
+# Runtime performance settings: worker counts, OpenCV's thread count, cache
+# budgets, preview size and poll intervals. They are resolved in layers, each
+# overriding the previous one key by key:
+#
+#   PERFORMANCE_DEFAULTS in settings.py
+#   -> a named profile from PERFORMANCE_PROFILES ("laptop", "workstation", "batch-server")
+#   -> performance.json next to the application
+#   -> TEXTRACTOR_<KEY> environment variables, e.g. TEXTRACTOR_PREVIEW_SIZE=400
+#   -> command line flags (--set key=value)
+#
+# The profile itself is picked by the last layer that names one ("profile" in
+# performance.json, TEXTRACTOR_PERF_PROFILE or --perf-profile). Code reads the
+# active values through performance() where it uses them, so the GUI and the
+# headless tools apply the same settings.
+
+import json
+import logging
+import os
+from dataclasses import dataclass, fields
+from typing import Dict, Iterable, Mapping, Optional
+
+import cv2
+
+from src.config.settings import PERFORMANCE_CONFIG_PATH, PERFORMANCE_DEFAULTS, PERFORMANCE_PROFILES
+
+logger = logging.getLogger(__name__)
+
+ENVIRONMENT_PREFIX = "TEXTRACTOR_"
+PROFILE_VARIABLE = "TEXTRACTOR_PERF_PROFILE"
+
+
+@dataclass(frozen=True)
+class PerformanceSettings:
+    extraction_workers: int
+    process_workers: int
+    opencv_threads: int
+    preview_size: int
+    poll_ms: int
+    recent_files: int
+    camera_map_cache_mb: int
+    postprocess_cache_pixels: int
+    tiled_display_size: int
+    queue_poll_seconds: float
+    batch_memory_mb: int
+    memory_budget_mb: int
+    profile: Optional[str] = None
+
+    @classmethod
+    def from_values(cls, values: Mapping[str, object], profile: Optional[str] = None) -> "PerformanceSettings":
+        """Settings from a complete set of values, converting strings from files and the environment."""
+        types = {field.name: field.type for field in fields(cls) if field.name != "profile"}
+        converted = {}
+        for key, value in values.items():
+            try:
+                converted[key] = types[key](value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value for performance setting {key}: {value!r}")
+        return cls(**converted, profile=profile)
+
+
+_active: Optional[PerformanceSettings] = None
+
+
+def _check_keys(values: Mapping[str, object], source: str) -> None:
+    unknown = set(values) - set(PERFORMANCE_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown performance setting(s) in {source}: {', '.join(sorted(unknown))}")
+
+
+def _read_config_file(path: Optional[str]) -> Dict[str, object]:
+    try:
+        with open(path or PERFORMANCE_CONFIG_PATH, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _environment_values(environ: Mapping[str, str]) -> Dict[str, str]:
+    return {key: environ[ENVIRONMENT_PREFIX + key.upper()] for key in PERFORMANCE_DEFAULTS
+            if ENVIRONMENT_PREFIX + key.upper() in environ}
+
+
+def parse_overrides(assignments: Iterable[str]) -> Dict[str, str]:
+    """{key: value} from "key=value" strings, as given to --set."""
+    overrides = {}
+    for assignment in assignments:
+        key, separator, value = assignment.partition("=")
+        if not separator:
+            raise ValueError(f"Expected KEY=VALUE, got {assignment!r}")
+        overrides[key.strip().replace("-", "_")] = value.strip()
+    _check_keys(overrides, "--set")
+    return overrides
+
+
+def resolve(profile: Optional[str] = None, overrides: Optional[Mapping[str, object]] = None,
+            path: Optional[str] = None, environ: Optional[Mapping[str, str]] = None) -> PerformanceSettings:
+    """Combine every layer without applying the result. profile and overrides are the command line layer."""
+    environ = os.environ if environ is None else environ
+    file_values = dict(_read_config_file(path))
+    file_profile = file_values.pop("profile", None)
+    _check_keys(file_values, str(path or PERFORMANCE_CONFIG_PATH))
+    profile = profile or environ.get(PROFILE_VARIABLE) or file_profile
+    if profile and profile not in PERFORMANCE_PROFILES:
+        raise ValueError(f"Unknown performance profile: {profile}")
+
+    values = dict(PERFORMANCE_DEFAULTS)
+    for layer in (PERFORMANCE_PROFILES.get(profile, {}), file_values, _environment_values(environ),
+                  overrides or {}):
+        values.update(layer)
+    return PerformanceSettings.from_values(values, profile)
+
+
+def apply(settings: PerformanceSettings) -> PerformanceSettings:
+    """Make settings the active ones and set the process-wide knobs they control."""
+    global _active
+    _active = settings
+    cv2.setNumThreads(settings.opencv_threads)
+    logger.debug(f"Performance settings ({settings.profile or 'default'}): {settings}")
+    return settings
+
+
+def configure(profile: Optional[str] = None, overrides: Optional[Mapping[str, object]] = None,
+              path: Optional[str] = None) -> PerformanceSettings:
+    """Resolve and apply the settings; entry points call this with their command line flags before starting."""
+    return apply(resolve(profile, overrides, path))
+
+
+def performance() -> PerformanceSettings:
+    """The active settings. Until an entry point calls configure(), they are resolved from the defaults,
+    performance.json and the environment on first use, without touching process-wide knobs such as OpenCV's
+    thread count."""
+    global _active
+    if _active is None:
+        _active = resolve()
+    return _active
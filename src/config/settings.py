@@ -8,6 +8,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 # File paths
 RECENT_FILES_PATH = BASE_DIR / "recent_files.json"
+PHASH_INDEX_PATH = BASE_DIR / "phash_index.json"
+CAMERA_PROFILES_PATH = BASE_DIR / "camera_profiles.json"
 LOG_FILE = BASE_DIR / "kevstextractor.log"
 BANNER_PATH = BASE_DIR / "resources" / "images" / "textractor_banner.png"
 
@@ -30,6 +32,24 @@ ACCENT_COLOR = "#4A90E2"
 # Texture extraction settings
 MAX_TEXTURE_SIZE = 2048  # Maximum size of extracted texture
 
+# Quality/speed profiles for the perspective warp. "mipmaps" picks a downsampled
+# pyramid level of the source when the output is smaller than the selection,
+# "supersample" warps at N times the output size and area-filters back down.
+QUALITY_PROFILES = {
+    "Fast": {"interpolation": "nearest", "supersample": 1, "mipmaps": True},
+    "Balanced": {"interpolation": "linear", "supersample": 1, "mipmaps": True},
+    "High": {"interpolation": "cubic", "supersample": 2, "mipmaps": True},
+    "Best": {"interpolation": "lanczos", "supersample": 3, "mipmaps": True},
+    "Legacy": {"interpolation": "linear", "supersample": 1, "mipmaps": False},
+}
+DEFAULT_QUALITY_PROFILE = "Balanced"
+
+# Output resolution options. "Source" sizes the texture from the pixel density
+# inside the selection, "Original" scales its longest side to the longest side
+# of the whole image (the previous default).
+RESOLUTION_OPTIONS = ["Source", "Source (Power of 2)", "Original", "1024x1024", "2048x2048", "4096x4096", "Custom"]
+DEFAULT_RESOLUTION = "Source"
+
 # Launch popup settings
 SHOW_LAUNCH_POPUP = True
 LICENSE_WARNING = "This software is licensed under the Apache License 2.0. See the LICENSE file for more information."
@@ -50,11 +70,159 @@ MAX_RECENT_FILES = 5
 LOG_LEVEL = "INFO"
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
+# Profiling mode (run.py --profile, or TEXTRACTOR_PROFILE=trace.json): Tk handlers slower than this are stalls
+PROFILE_STALL_MS = 50
+PROFILE_TRACE_PATH = os.environ.get("TEXTRACTOR_PROFILE")
+
+# Overlay, status bar and preview requests made while dragging are merged into one redraw per frame
+FRAME_INTERVAL_MS = 16
+
+# Magnifier shown next to the pointer while placing or dragging corners
+LOUPE_SIZE = 160  # Width and height on screen
+LOUPE_ZOOM = 8  # Screen pixels per full-resolution source pixel
+LOUPE_OFFSET = 24  # Distance from the pointer to the loupe's nearest corner
+
+# Memory governor (see src.core.memory): fractions of the memory_budget_mb performance setting
+MEMORY_SOFT_LIMIT = 0.85  # Above this, caches are dropped, previews shrink and the source moves into tiles
+MEMORY_RESTORE_LIMIT = 0.5  # Below this, previews return to their configured size
+MEMORY_MIN_PREVIEW_SIZE = 128
+MEMORY_UNDO_KEEP = 10  # Undo states kept when the history is trimmed
+
 # Default aspect ratio
 DEFAULT_ASPECT_RATIO = 1.0
 
 # Image processing settings
 PREVIEW_MAX_SIZE = 500  # Maximum size of preview image (width or height)
+CPU_COUNT = os.cpu_count() or 1
+EXTRACTION_WORKERS = CPU_COUNT  # Upper bound for background extraction threads and re-export processes
+try:
+    PHYSICAL_MEMORY_MB = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+except (AttributeError, ValueError, OSError):
+    PHYSICAL_MEMORY_MB = 8192  # Not available on Windows; assume a modest machine
+SEQUENCE_DEFAULT_FPS = 30.0  # Frame rate for image sequences and videos without one
+
+# Out-of-core sources: images with more pixels than this are converted once into a tiled,
+# memory-mapped pyramid (see src.core.tiled_image) and read tile by tile afterwards. The limit is
+# below Pillow's decompression bomb limit, so any image Pillow refuses to open is tiled.
+TILED_IMAGE_MIN_PIXELS = 128 * 1024 * 1024
+TILED_TILE_SIZE = 512
+TILED_CACHE_DIR = BASE_DIR / "tile_cache"
+TILED_DISPLAY_MAX_SIZE = 4096  # Longest side of the pyramid level shown on the canvas
+
+# Shared-directory work queue (python -m src.cli queue ...)
+QUEUE_LEASE_SECONDS = 300  # A claimed job returns to pending if its worker stops heartbeating for this long
+QUEUE_MAX_ATTEMPTS = 3  # Jobs that fail or lose their lease this many times are moved to failed/
+QUEUE_POLL_SECONDS = 2.0  # How often idle workers look for new or expired jobs
+
+# Texture atlas settings
+ATLAS_MAX_SIZE = 8192  # Maximum width/height of one atlas page
+ATLAS_PADDING = 4  # Pixels of replicated edge around each texture to stop mip bleeding
+
+# Planar stitching of overlapping shots (python -m src.cli stitch ...)
+STITCH_BLEND_MODES = ("feather", "multiband")
+STITCH_TILE_SIZE = 1024  # The mosaic is rendered and written this many pixels square at a time
+STITCH_FEATHER = 64  # Feather blends ramp weights up over this many pixels from each piece's edge
+STITCH_BANDS = 5  # Pyramid levels of the multi-band blend
+
+# Stacking several photos of the same surface (python -m src.cli stack ...)
+STACK_METHODS = ("mean", "median", "sigma-clip")
+STACK_MEDIAN_BASE = 5  # Frames reduced to one median at each remedian level; up to this many the median is exact
+STACK_SIGMA_KAPPA = 2.5  # Sigma clipping drops values further than this many standard deviations from the mean
+STACK_SIGMA_MIN_FRAMES = 3  # Frames accepted before there are statistics to clip against
+
+# Texture packs: batch outputs appended to one indexed file (python -m src.cli pack ...)
+TEXTURE_PACK_FORMATS = ("raw", "png")  # Stored by position in the index, so only ever append to this
+TEXTURE_PACK_ALIGN = 64  # Payload alignment, so raw textures map onto cache lines and SIMD loads
+TEXTURE_PACK_COMPACT_RATIO = 0.5  # Builds compact the pack once this fraction of it is dead bytes
+
+# Block-compressed (.dds) output settings
+DDS_DEFAULT_FORMAT = "auto"  # "auto" (BC1, or BC3 when the texture has alpha), "BC1", "BC3" or "BC7"
+DDS_DEFAULT_QUALITY = "normal"  # "fast", "normal" or "high"
+
+# Quality of .jpg/.jpeg saves (0-100). 75 is what saves used when they went through Pillow
+JPEG_QUALITY = 75
+
+# Lens correction: remap tables are cached per (camera profile, quad, output size), up to this many MB.
+# Full-resolution maps take 6 bytes per warped pixel, so a 4096x4096 "Best" warp alone is about 900 MB
+CAMERA_MAP_CACHE_MB = 256
+NO_CAMERA = "None"  # Camera menu entry that turns lens correction off
+
+# Post-processing chains applied to extracted textures (see src.core.postprocess for the stages)
+POSTPROCESS_NONE = "None"
+POSTPROCESS_PRESETS = {
+    POSTPROCESS_NONE: [],
+    "Balance": [{"stage": "white_balance"}],
+    "Clean Scan": [
+        {"stage": "white_balance"},
+        {"stage": "flat_field", "strength": 1.0, "degree": 2},
+        {"stage": "sharpen", "amount": 0.5, "radius": 1.0},
+    ],
+    "Cutout (White Backdrop)": [
+        {"stage": "white_balance", "method": "white_patch"},
+        {"stage": "alpha_mask", "key": [255, 255, 255], "tolerance": 0.12, "feather": 0.06},
+    ],
+}
+POSTPROCESS_CACHE_MAX_PIXELS = 4 * 1024 * 1024  # Working buffers above this size are freed after each use
+
+# Runtime performance settings (see src.config.performance). These defaults are the bottom layer;
+# a named profile, performance.json, TEXTRACTOR_<KEY> environment variables and command line flags
+# (--perf-profile, --set key=value) override them in that order.
+PERFORMANCE_CONFIG_PATH = BASE_DIR / "performance.json"
+PERFORMANCE_DEFAULTS = {
+    "extraction_workers": max(CPU_COUNT // 2, 1),  # Threads in the background extraction pool
+    "process_workers": EXTRACTION_WORKERS,  # Processes used by project re-exports
+    "opencv_threads": 2,  # cv2.setNumThreads for OpenCV's own pool; 1 keeps every cv2 call single-threaded
+    "preview_size": PREVIEW_MAX_SIZE,
+    "poll_ms": 100,  # How often the GUI checks for finished background work
+    "recent_files": MAX_RECENT_FILES,
+    "camera_map_cache_mb": CAMERA_MAP_CACHE_MB,
+    "postprocess_cache_pixels": POSTPROCESS_CACHE_MAX_PIXELS,
+    "tiled_display_size": TILED_DISPLAY_MAX_SIZE,
+    "queue_poll_seconds": QUEUE_POLL_SECONDS,
+    # Estimated peak memory of the re-export jobs running at once; larger jobs wait for room instead
+    "batch_memory_mb": PHYSICAL_MEMORY_MB // 2,
+    # Pixel buffers the GUI may keep alive (source, display copies, textures, previews) before degrading
+    "memory_budget_mb": PHYSICAL_MEMORY_MB // 4,
+}
+PERFORMANCE_PROFILES = {
+    # Fewer threads and smaller buffers, so the machine stays responsive and memory use stays low
+    "laptop": {"extraction_workers": 2, "process_workers": 2, "opencv_threads": 2, "preview_size": 400,
+               "poll_ms": 150, "camera_map_cache_mb": 64, "postprocess_cache_pixels": 2 * 1024 * 1024,
+               "tiled_display_size": 2048, "batch_memory_mb": PHYSICAL_MEMORY_MB // 4,
+               "memory_budget_mb": PHYSICAL_MEMORY_MB // 8},
+    # A few large interactive warps at a time, each using several OpenCV threads
+    "workstation": {"extraction_workers": max(CPU_COUNT // 4, 1), "process_workers": CPU_COUNT,
+                    "opencv_threads": 4, "preview_size": 800, "poll_ms": 50, "camera_map_cache_mb": 1024,
+                    "postprocess_cache_pixels": 16 * 1024 * 1024, "tiled_display_size": 8192},
+    # Throughput over latency: one job per core and no threading inside OpenCV
+    "batch-server": {"extraction_workers": CPU_COUNT, "process_workers": CPU_COUNT, "opencv_threads": 1,
+                     "poll_ms": 250, "camera_map_cache_mb": 2048, "postprocess_cache_pixels": 0,
+                     "queue_poll_seconds": 5.0, "batch_memory_mb": PHYSICAL_MEMORY_MB * 3 // 4},
+}
+
+# Mesh warp control grids (columns x rows of control points) for curved surfaces
+MESH_OFF = "Off"
+MESH_GRID_OPTIONS = [MESH_OFF, "3x3", "4x4", "5x5", "3x5", "5x3"]
+
+# Automatic quad detection
+AUTO_DETECT_WORKING_SIZE = 512  # Longest side of the pyramid level the detector runs on
+AUTO_DETECT_MIN_AREA = 0.02  # Ignore candidates smaller than this fraction of the image
+AUTO_DETECT_MAX_QUADS = 5  # Candidates returned per image
+AUTO_DETECT_MIN_CONFIDENCE = 0.6  # Unattended runs skip images whose best quad scores lower
+AUTO_DETECT_ON_LOAD = True  # Pre-select the best quad when an image is opened, if it is confident enough
+
+# Duplicate detection: textures whose 64-bit perceptual hashes differ in at most
+# this many bits are reported as near-identical
+PHASH_DUPLICATE_DISTANCE = 8
+
+# Export set presets: every resolution is derived from one warp at the largest size.
+# With "mip_chain" the largest size is written as a single .dds with a full mip chain.
+EXPORT_PRESETS = {
+    "4096 / 2048 / 1024 / 512": {"resolutions": ["4096x4096", "2048x2048", "1024x1024", "512x512"], "mip_chain": False},
+    "2048 / 1024 / 512": {"resolutions": ["2048x2048", "1024x1024", "512x512"], "mip_chain": False},
+    "4096 DDS with mip chain": {"resolutions": ["4096x4096"], "mip_chain": True},
+    "2048 DDS with mip chain": {"resolutions": ["2048x2048"], "mip_chain": True},
+}
 
 # File type settings
 SUPPORTED_IMAGE_TYPES = [
@@ -65,6 +233,20 @@ SUPPORTED_IMAGE_TYPES = [
     ("All files", "*.*")
 ]
 
+SAVE_IMAGE_TYPES = [
+    ("PNG files", "*.png"),
+    ("JPEG files", "*.jpg"),
+    ("TIFF files", "*.tif"),
+    ("BMP files", "*.bmp"),
+    ("DDS files (block compressed)", "*.dds"),
+    ("All files", "*.*")
+]
+
+PROJECT_FILE_TYPES = [
+    ("Textractor projects", "*.json"),
+    ("All files", "*.*")
+]
+
 # Keyboard shortcuts
 SHORTCUTS = {
     "open": "<Control-o>",
@@ -80,10 +262,15 @@ UI_TEXTS = {
     "load_button": "Load Image",
     "clear_button": "Clear Selection",
     "save_button": "Save Texture",
+    "detect_button": "Auto Detect",
     "flip_checkbox": "Flip Vertically",
     "flop_checkbox": "Flop Horizontally",
     "rotate_checkbox": "Rotate 90° Clockwise",
     "aspect_ratio_label": "Aspect Ratio:",
+    "quality_label": "Quality:",
+    "camera_label": "Camera:",
+    "mesh_label": "Grid:",
+    "postprocess_label": "Post-process:",
     "estimated_aspect_label": "Estimated Aspect Ratio: {:.2f}",
     "custom_aspect_error": "Please enter a valid aspect ratio between 0.1 and 10.0."
 }
@@ -102,5 +289,13 @@ STATUS_MESSAGES = {
     "save_failed": "Failed to save texture",
     "selection_cleared": "Selection cleared",
     "undo_performed": "Undo performed",
-    "redo_performed": "Redo performed"
+    "redo_performed": "Redo performed",
+    "project_updated": "Selection added to project: {}",
+    "exporting_set": "Exporting {}...",
+    "export_set_done": "Exported {} file(s): {}",
+    "quad_detected": "Detected texture (confidence {:.2f})",
+    "quad_low_confidence": "Detected texture with low confidence ({:.2f}), please check the corners",
+    "no_quad_detected": "No texture detected, select four points manually",
+    "duplicate_skipped": "Not saved, near-identical to {}",
+    "mesh_needs_quad": "Select four points before adding a grid",
 }
\ No newline at end of file
@@ -0,0 +1,191 @@
+# src/core/atlas.py
+#
+# Packs extracted textures into atlas pages with a skyline bottom-left bin
+# packer and writes the pages plus a JSON UV map. Textures are blitted straight
+# from their in-memory buffers, with edge pixels replicated into the padding so
+# mipmapping does not bleed neighbouring textures into each other.
+
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from src.core.engine import save_texture
+from src.config.settings import ATLAS_MAX_SIZE, ATLAS_PADDING
+from src.utils.exceptions import TextractorError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Placement:
+    name: str
+    page: int
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+class SkylinePacker:
+    """Skyline bottom-left rectangle packer for a single page of fixed size."""
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        # Each segment is [x, y, width]; together they cover the full page width
+        self.skyline: List[List[int]] = [[0, 0, width]]
+
+    def _fit(self, index: int, width: int, height: int) -> Optional[int]:
+        x = self.skyline[index][0]
+        if x + width > self.width:
+            return None
+        y = 0
+        remaining = width
+        i = index
+        while remaining > 0:
+            y = max(y, self.skyline[i][1])
+            if y + height > self.height:
+                return None
+            remaining -= self.skyline[i][2]
+            i += 1
+        return y
+
+    def insert(self, width: int, height: int) -> Optional[Tuple[int, int]]:
+        best = None
+        for index, (x, _, _) in enumerate(self.skyline):
+            y = self._fit(index, width, height)
+            if y is not None and (best is None or (y + height, x) < (best[1] + height, best[0])):
+                best = (x, y, index)
+        if best is None:
+            return None
+
+        x, y, index = best
+        self.skyline.insert(index, [x, y + height, width])
+        i = index + 1
+        while i < len(self.skyline):
+            segment = self.skyline[i]
+            previous = self.skyline[i - 1]
+            overlap = previous[0] + previous[2] - segment[0]
+            if overlap <= 0:
+                break
+            segment[0] += overlap
+            segment[2] -= overlap
+            if segment[2] <= 0:
+                del self.skyline[i]
+            else:
+                break
+        self._merge()
+        return x, y
+
+    def _merge(self) -> None:
+        i = 0
+        while i < len(self.skyline) - 1:
+            if self.skyline[i][1] == self.skyline[i + 1][1]:
+                self.skyline[i][2] += self.skyline.pop(i + 1)[2]
+            else:
+                i += 1
+
+
+def pack(sizes: Sequence[Tuple[str, int, int]], padding: int = ATLAS_PADDING,
+         max_size: int = ATLAS_MAX_SIZE) -> Tuple[List[Placement], List[Tuple[int, int]]]:
+    """Place (name, width, height) rectangles on as few pages as needed. Returns placements and page sizes."""
+    order = sorted(sizes, key=lambda item: (item[2], item[1]), reverse=True)
+    area = sum((w + 2 * padding) * (h + 2 * padding) for _, w, h in order)
+    widest = max((w + 2 * padding for _, w, _ in order), default=1)
+    if widest > max_size or max((h + 2 * padding for _, _, h in order), default=1) > max_size:
+        raise TextractorError(f"A texture larger than the maximum atlas size ({max_size}) cannot be packed")
+    page_width = min(2 ** int(np.ceil(np.log2(max(np.sqrt(area), widest)))), max_size)
+
+    packers = [SkylinePacker(page_width, max_size)]
+    placements = []
+    for name, width, height in order:
+        for page, packer in enumerate(packers):
+            position = packer.insert(width + 2 * padding, height + 2 * padding)
+            if position is not None:
+                break
+        else:
+            packers.append(SkylinePacker(page_width, max_size))
+            page = len(packers) - 1
+            position = packers[page].insert(width + 2 * padding, height + 2 * padding)
+        placements.append(Placement(name, page, position[0] + padding, position[1] + padding, width, height))
+
+    page_sizes = []
+    for page, packer in enumerate(packers):
+        used_height = max(p.y + p.height + padding for p in placements if p.page == page)
+        page_sizes.append((page_width, min(2 ** int(np.ceil(np.log2(used_height))), max_size)))
+    return placements, page_sizes
+
+
+def _as_channels(image: np.ndarray, channels: int) -> np.ndarray:
+    if image.ndim == 2:
+        image = image[:, :, None]
+    if image.shape[2] == channels:
+        return image
+    if image.shape[2] == 1:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    if channels == 4 and image.shape[2] == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+    return image[:, :, :channels]
+
+
+def blit(page: np.ndarray, image: np.ndarray, x: int, y: int, padding: int) -> None:
+    """Copy image into page at (x, y) and replicate its edge pixels into the surrounding padding."""
+    h, w = image.shape[:2]
+    page[y:y + h, x:x + w] = image
+    if padding:
+        page[y - padding:y, x:x + w] = page[y:y + 1, x:x + w]
+        page[y + h:y + h + padding, x:x + w] = page[y + h - 1:y + h, x:x + w]
+        page[y - padding:y + h + padding, x - padding:x] = page[y - padding:y + h + padding, x:x + 1]
+        page[y - padding:y + h + padding, x + w:x + w + padding] = page[y - padding:y + h + padding, x + w - 1:x + w]
+
+
+def build_atlas(textures: Iterable[Tuple[str, np.ndarray]], padding: int = ATLAS_PADDING,
+                max_size: int = ATLAS_MAX_SIZE) -> Tuple[List[np.ndarray], dict]:
+    """Pack named BGR(A) buffers into atlas pages. Returns the pages and the UV map."""
+    textures = list(textures)
+    names = [name for name, _ in textures]
+    if len(set(names)) != len(names):
+        raise TextractorError("Atlas texture names must be unique")
+    if not textures:
+        raise TextractorError("No textures to pack")
+
+    placements, page_sizes = pack([(name, image.shape[1], image.shape[0]) for name, image in textures],
+                                  padding, max_size)
+    channels = 4 if any(image.ndim == 3 and image.shape[2] == 4 for _, image in textures) else 3
+    dtype = textures[0][1].dtype
+    pages = [np.zeros((height, width, channels), dtype=dtype) for width, height in page_sizes]
+
+    by_name = dict(textures)
+    uv_map = {"padding": padding, "pages": [], "textures": {}}
+    for placement in placements:
+        page_width, page_height = page_sizes[placement.page]
+        blit(pages[placement.page], _as_channels(by_name[placement.name], channels), placement.x, placement.y, padding)
+        uv_map["textures"][placement.name] = {
+            "page": placement.page,
+            "x": placement.x, "y": placement.y, "width": placement.width, "height": placement.height,
+            # Normalised, origin at the top-left corner of the page
+            "u0": placement.x / page_width, "v0": placement.y / page_height,
+            "u1": (placement.x + placement.width) / page_width, "v1": (placement.y + placement.height) / page_height,
+        }
+    return pages, uv_map
+
+
+def write_atlas(output: str, textures: Iterable[Tuple[str, np.ndarray]], padding: int = ATLAS_PADDING,
+                max_size: int = ATLAS_MAX_SIZE) -> dict:
+    """Write atlas page(s) next to output (atlas.png, atlas_1.png, ...) and a matching .json UV map."""
+    pages, uv_map = build_atlas(textures, padding, max_size)
+    root, ext = os.path.splitext(output)
+    for index, page in enumerate(pages):
+        page_path = output if index == 0 else f"{root}_{index}{ext}"
+        save_texture(page_path, page)
+        uv_map["pages"].append({"file": os.path.basename(page_path), "width": page.shape[1], "height": page.shape[0]})
+
+    with open(root + ".json", 'w') as f:
+        json.dump(uv_map, f, indent=2)
+    logger.info(f"Packed {len(uv_map['textures'])} textures into {len(pages)} atlas page(s): {output}")
+    return uv_map
@@ -0,0 +1,260 @@
+# src/core/block_compression.py
+#
+# Vectorised GPU block compression (BC1, BC3 and a single-mode BC7) plus a DDS
+# writer. Every 4x4 block of a level is encoded at once with NumPy; blocks are
+# processed in chunks only to bound the size of the temporary arrays.
+
+import struct
+from concurrent.futures import Executor
+from itertools import repeat
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.config.settings import DDS_DEFAULT_FORMAT, DDS_DEFAULT_QUALITY
+from src.utils.exceptions import TextureSaveError
+
+BLOCK_FORMATS = ("BC1", "BC3", "BC7")
+BLOCK_QUALITIES = ("fast", "normal", "high")
+BLOCK_BYTES = {"BC1": 8, "BC3": 16, "BC7": 16}
+CHUNK_BLOCKS = 8192
+
+BC7_WEIGHTS = np.array([0, 4, 9, 13, 17, 21, 26, 30, 34, 38, 43, 47, 51, 55, 60, 64], dtype=np.int32)
+DXGI_FORMAT_BC7_UNORM = 98
+
+
+def to_blocks(rgba: np.ndarray) -> np.ndarray:
+    """Split an HxWx4 image into (blocks, 16, 4) in row-major block order, padding edges to multiples of 4."""
+    height, width = rgba.shape[:2]
+    pad_y, pad_x = -height % 4, -width % 4
+    if pad_y or pad_x:
+        rgba = np.pad(rgba, ((0, pad_y), (0, pad_x), (0, 0)), mode='edge')
+    rows, cols = rgba.shape[0] // 4, rgba.shape[1] // 4
+    return rgba.reshape(rows, 4, cols, 4, 4).transpose(0, 2, 1, 3, 4).reshape(rows * cols, 16, 4)
+
+
+def _principal_endpoints(pixels: np.ndarray, quality: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-block endpoints: bounding box (fast) or extent along the principal axis (normal/high)."""
+    if quality == "fast":
+        low, high = pixels.min(axis=1), pixels.max(axis=1)
+        inset = (high - low) / 16
+        low, high = low + inset, high - inset
+        # Pick the bounding-box diagonal: channels that fall as the widest channel rises swap ends
+        reference = (high - low).argmax(axis=1)
+        centered = pixels - pixels.mean(axis=1, keepdims=True)
+        covariance = np.einsum('nkc,nk->nc', centered, centered[np.arange(len(pixels)), :, reference])
+        flip = covariance < 0
+        return np.where(flip, low, high), np.where(flip, high, low)
+
+    mean = pixels.mean(axis=1, keepdims=True)
+    centered = pixels - mean
+    covariance = np.einsum('nki,nkj->nij', centered, centered)
+    axis = np.ones(pixels.shape[::2], dtype=np.float32)
+    for _ in range(8):  # power iteration, converges quickly for 3x3/4x4
+        axis = np.einsum('nij,nj->ni', covariance, axis)
+        axis /= np.maximum(np.linalg.norm(axis, axis=1, keepdims=True), 1e-12)
+    projection = np.einsum('nki,ni->nk', centered, axis)
+    mean = mean[:, 0]
+    return (mean + projection.max(axis=1, keepdims=True) * axis,
+            mean + projection.min(axis=1, keepdims=True) * axis)
+
+
+def _nearest(pixels: np.ndarray, palette: np.ndarray) -> np.ndarray:
+    distances = ((pixels[:, :, None, :] - palette[:, None, :, :]) ** 2).sum(axis=3)
+    return distances.argmin(axis=2)
+
+
+def _refine(pixels: np.ndarray, indices: np.ndarray, weights: np.ndarray,
+            e0: np.ndarray, e1: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Least-squares endpoints for fixed index assignments (vectorised 2x2 normal equations)."""
+    t = weights[indices]
+    a = 1 - t
+    aa, bb, ab = (a * a).sum(1), (t * t).sum(1), (a * t).sum(1)
+    ax = np.einsum('nk,nkc->nc', a, pixels)
+    bx = np.einsum('nk,nkc->nc', t, pixels)
+    det = aa * bb - ab * ab
+    valid = np.abs(det) > 1e-6
+    safe = np.where(valid, det, 1)[:, None]
+    new_e0 = (bb[:, None] * ax - ab[:, None] * bx) / safe
+    new_e1 = (aa[:, None] * bx - ab[:, None] * ax) / safe
+    return (np.where(valid[:, None], np.clip(new_e0, 0, 255), e0),
+            np.where(valid[:, None], np.clip(new_e1, 0, 255), e1))
+
+
+def _quantize_565(colors: np.ndarray) -> np.ndarray:
+    r = np.clip(np.rint(colors[:, 0] * 31 / 255), 0, 31).astype(np.uint16)
+    g = np.clip(np.rint(colors[:, 1] * 63 / 255), 0, 63).astype(np.uint16)
+    b = np.clip(np.rint(colors[:, 2] * 31 / 255), 0, 31).astype(np.uint16)
+    return (r << 11) | (g << 5) | b
+
+
+def _expand_565(packed: np.ndarray) -> np.ndarray:
+    r = (packed >> 11) & 31
+    g = (packed >> 5) & 63
+    b = packed & 31
+    return np.stack([(r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)], axis=1).astype(np.float32)
+
+
+def _encode_color_blocks(rgb: np.ndarray, quality: str) -> np.ndarray:
+    """BC1 colour blocks (always 4-colour mode) as an (N, 8) uint8 array."""
+    e0, e1 = _principal_endpoints(rgb, quality)
+    if quality == "high":
+        palette_weights = np.array([0, 1, 1 / 3, 2 / 3], dtype=np.float32)
+        palette = e0[:, None] * (1 - palette_weights[None, :, None]) + e1[:, None] * palette_weights[None, :, None]
+        e0, e1 = _refine(rgb, _nearest(rgb, palette), palette_weights, e0, e1)
+
+    c0, c1 = _quantize_565(e0), _quantize_565(e1)
+    swap = c0 < c1
+    c0, c1 = np.where(swap, c1, c0), np.where(swap, c0, c1)
+
+    p0, p1 = _expand_565(c0), _expand_565(c1)
+    palette = np.stack([p0, p1, (2 * p0 + p1) / 3, (p0 + 2 * p1) / 3], axis=1)
+    indices = _nearest(rgb, palette).astype(np.uint32)
+    indices[c0 == c1] = 0
+
+    packed_indices = (indices << (2 * np.arange(16, dtype=np.uint32))).sum(axis=1, dtype=np.uint32)
+    blocks = np.empty(len(rgb), dtype=[('c0', '<u2'), ('c1', '<u2'), ('indices', '<u4')])
+    blocks['c0'], blocks['c1'], blocks['indices'] = c0, c1, packed_indices
+    return blocks.view(np.uint8).reshape(-1, 8)
+
+
+def _encode_alpha_blocks(alpha: np.ndarray) -> np.ndarray:
+    """BC4-style 8-value alpha blocks (as used by BC3) as an (N, 8) uint8 array."""
+    a0 = alpha.max(axis=1).astype(np.int32)
+    a1 = alpha.min(axis=1).astype(np.int32)
+    k = np.arange(2, 8)
+    interpolated = ((8 - k)[None, :] * a0[:, None] + (k - 1)[None, :] * a1[:, None]) // 7
+    palette = np.concatenate([a0[:, None], a1[:, None], interpolated], axis=1).astype(np.float32)
+    indices = np.abs(alpha[:, :, None] - palette[:, None, :]).argmin(axis=2).astype(np.uint64)
+    indices[a0 == a1] = 0
+
+    bits = (indices << (3 * np.arange(16, dtype=np.uint64))).sum(axis=1, dtype=np.uint64)
+    packed = a0.astype(np.uint64) | (a1.astype(np.uint64) << np.uint64(8)) | (bits << np.uint64(16))
+    return packed.astype('<u8').view(np.uint8).reshape(-1, 8)
+
+
+def _quantize_bc7_endpoint(endpoint: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """7-bit RGBA plus the shared p-bit that best reproduces an 8-bit endpoint."""
+    best_error, best_values, best_pbit = None, None, None
+    for pbit in (0, 1):
+        values = np.clip(np.rint((endpoint - pbit) / 2), 0, 127).astype(np.int32)
+        error = ((values * 2 + pbit - endpoint) ** 2).sum(axis=1)
+        if best_error is None:
+            best_error, best_values, best_pbit = error, values, np.zeros(len(endpoint), dtype=np.int32)
+        else:
+            better = error < best_error
+            best_values = np.where(better[:, None], values, best_values)
+            best_pbit = np.where(better, 1, best_pbit)
+            best_error = np.minimum(error, best_error)
+    return best_values, best_pbit
+
+
+def _encode_bc7_mode6(rgba: np.ndarray, quality: str) -> np.ndarray:
+    """BC7 mode 6 blocks (single subset, 7777+p-bit endpoints, 4-bit indices) as an (N, 16) uint8 array."""
+    e0, e1 = _principal_endpoints(rgba, quality)
+    weights = BC7_WEIGHTS.astype(np.float32) / 64
+    if quality == "high":
+        palette = e0[:, None] * (1 - weights[None, :, None]) + e1[:, None] * weights[None, :, None]
+        e0, e1 = _refine(rgba, _nearest(rgba, palette), weights, e0, e1)
+
+    v0, p0 = _quantize_bc7_endpoint(e0)
+    v1, p1 = _quantize_bc7_endpoint(e1)
+    q0, q1 = v0 * 2 + p0[:, None], v1 * 2 + p1[:, None]
+    palette = ((64 - BC7_WEIGHTS)[None, :, None] * q0[:, None] + BC7_WEIGHTS[None, :, None] * q1[:, None] + 32) >> 6
+    indices = _nearest(rgba, palette.astype(np.float32))
+
+    # The first index is stored with an implicit leading zero bit
+    swap = indices[:, 0] >= 8
+    v0, v1 = np.where(swap[:, None], v1, v0), np.where(swap[:, None], v0, v1)
+    p0, p1 = np.where(swap, p1, p0), np.where(swap, p0, p1)
+    indices = np.where(swap[:, None], 15 - indices, indices).astype(np.uint64)
+
+    v0, v1 = v0.astype(np.uint64), v1.astype(np.uint64)
+    low = np.full(len(rgba), 1 << 6, dtype=np.uint64)
+    shift = 7
+    for channel in range(4):
+        low |= v0[:, channel] << np.uint64(shift)
+        low |= v1[:, channel] << np.uint64(shift + 7)
+        shift += 14
+    low |= p0.astype(np.uint64) << np.uint64(63)
+
+    high = p1.astype(np.uint64) | (indices[:, 0] << np.uint64(1))
+    high |= (indices[:, 1:] << (4 * np.arange(1, 16, dtype=np.uint64))).sum(axis=1, dtype=np.uint64)
+
+    blocks = np.empty((len(rgba), 2), dtype='<u8')
+    blocks[:, 0], blocks[:, 1] = low, high
+    return blocks.view(np.uint8).reshape(-1, 16)
+
+
+def bgr_to_rgba(image: np.ndarray) -> np.ndarray:
+    if image.dtype != np.uint8:
+        raise TextureSaveError("Block compression requires 8-bit images")
+    if image.ndim == 2:
+        image = image[:, :, None]
+    if image.shape[2] == 1:
+        image = np.repeat(image, 3, axis=2)
+    alpha = image[:, :, 3:4] if image.shape[2] == 4 else np.full(image.shape[:2] + (1,), 255, dtype=np.uint8)
+    return np.concatenate([image[:, :, 2::-1], alpha], axis=2)
+
+
+def choose_format(image: np.ndarray, block_format: str = DDS_DEFAULT_FORMAT) -> str:
+    if block_format != "auto":
+        return block_format
+    has_alpha = image.ndim == 3 and image.shape[2] == 4 and (image[:, :, 3] < 255).any()
+    return "BC3" if has_alpha else "BC1"
+
+
+def _encode_chunk(chunk: np.ndarray, block_format: str, quality: str) -> np.ndarray:
+    chunk = chunk.astype(np.float32)
+    if block_format == "BC1":
+        return _encode_color_blocks(chunk[:, :, :3], quality)
+    if block_format == "BC3":
+        return np.concatenate([_encode_alpha_blocks(chunk[:, :, 3]),
+                               _encode_color_blocks(chunk[:, :, :3], quality)], axis=1)
+    return _encode_bc7_mode6(chunk, quality)
+
+
+def compress(image: np.ndarray, block_format: str = "BC1", quality: str = DDS_DEFAULT_QUALITY,
+             executor: Optional[Executor] = None) -> bytes:
+    """Compress a BGR(A) uint8 buffer to raw block data, spreading chunks over executor if given."""
+    if block_format not in BLOCK_FORMATS:
+        raise TextureSaveError(f"Unsupported block format: {block_format}")
+    if quality not in BLOCK_QUALITIES:
+        raise TextureSaveError(f"Unsupported compression quality: {quality}")
+
+    blocks = to_blocks(bgr_to_rgba(image))
+    chunks = [blocks[start:start + CHUNK_BLOCKS] for start in range(0, len(blocks), CHUNK_BLOCKS)]
+    if executor is not None and len(chunks) > 1:
+        encoded = executor.map(_encode_chunk, chunks, repeat(block_format), repeat(quality))
+    else:
+        encoded = (_encode_chunk(chunk, block_format, quality) for chunk in chunks)
+    return b"".join(chunk.tobytes() for chunk in encoded)
+
+
+def dds_header(width: int, height: int, block_format: str, mip_count: int = 1) -> bytes:
+    blocks_wide, blocks_high = max(1, (width + 3) // 4), max(1, (height + 3) // 4)
+    flags = 0x1 | 0x2 | 0x4 | 0x1000 | 0x80000  # CAPS | HEIGHT | WIDTH | PIXELFORMAT | LINEARSIZE
+    caps = 0x1000  # TEXTURE
+    if mip_count > 1:
+        flags |= 0x20000  # MIPMAPCOUNT
+        caps |= 0x8 | 0x400000  # COMPLEX | MIPMAP
+    four_cc = {"BC1": b"DXT1", "BC3": b"DXT5", "BC7": b"DX10"}[block_format]
+    pixel_format = struct.pack("<II4sIIIII", 32, 0x4, four_cc, 0, 0, 0, 0, 0)
+    header = struct.pack("<4sIIIIIII44x", b"DDS ", 124, flags, height, width,
+                         blocks_wide * blocks_high * BLOCK_BYTES[block_format], 0, mip_count)
+    header += pixel_format + struct.pack("<IIIII", caps, 0, 0, 0, 0)
+    if block_format == "BC7":
+        header += struct.pack("<IIIII", DXGI_FORMAT_BC7_UNORM, 3, 0, 1, 0)  # TEXTURE2D, array size 1
+    return header
+
+
+def write_dds(file_path: str, levels: Sequence[np.ndarray], block_format: Optional[str] = None,
+              quality: str = DDS_DEFAULT_QUALITY, executor: Optional[Executor] = None) -> None:
+    """Write one or more mip levels (largest first) of BGR(A) buffers to a block-compressed DDS file."""
+    block_format = choose_format(levels[0], block_format or DDS_DEFAULT_FORMAT)
+    height, width = levels[0].shape[:2]
+    data: List[bytes] = [dds_header(width, height, block_format, len(levels))]
+    data.extend(compress(level, block_format, quality, executor) for level in levels)
+    with open(file_path, 'wb') as f:
+        for chunk in data:
+            f.write(chunk)
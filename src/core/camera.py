@@ -0,0 +1,164 @@
+# src/core/camera.py
+#
+# Camera profiles (intrinsics plus OpenCV distortion coefficients) for lens
+# correction that costs nothing extra: the quad is undistorted, the homography is
+# solved in undistorted space, and every output pixel is pushed back through the
+# lens model, so a single remap reads straight from the original photo.
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from src.core.image_processor import INTERPOLATION_FLAGS, ImageProcessor, WarpMaps
+from src.config.performance import performance
+from src.config.settings import CAMERA_PROFILES_PATH, DEFAULT_QUALITY_PROFILE, QUALITY_PROFILES
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CameraProfile:
+    """Pinhole intrinsics and distortion (k1, k2, p1, p2[, k3[, k4, k5, k6]]) calibrated at width x height."""
+    name: str
+    fx: float
+    fy: float
+    cx: float
+    cy: float
+    distortion: Tuple[float, ...]
+    width: int
+    height: int
+
+    @classmethod
+    def from_dict(cls, name: str, data: dict) -> "CameraProfile":
+        distortion = tuple(float(value) for value in data["distortion"])
+        if len(distortion) not in (4, 5, 8):
+            raise ValueError(f"Camera profile {name!r} needs 4, 5 or 8 distortion coefficients")
+        return cls(name, float(data["fx"]), float(data["fy"]), float(data["cx"]), float(data["cy"]), distortion,
+                   int(data["width"]), int(data["height"]))
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        del data["name"]
+        data["distortion"] = list(self.distortion)
+        return data
+
+    def camera_matrix(self, image_size: Tuple[int, int]) -> np.ndarray:
+        """Intrinsics scaled to an image of (width, height), e.g. a downscaled copy of the calibration size."""
+        sx, sy = image_size[0] / self.width, image_size[1] / self.height
+        return np.array([[self.fx * sx, 0, self.cx * sx], [0, self.fy * sy, self.cy * sy], [0, 0, 1]])
+
+    def undistort_points(self, points: np.ndarray, image_size: Tuple[int, int]) -> np.ndarray:
+        K = self.camera_matrix(image_size)
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+        return cv2.undistortPoints(points, K, np.array(self.distortion), P=K).reshape(-1, 2)
+
+    def distort(self, x: np.ndarray, y: np.ndarray, image_size: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Map undistorted pixel coordinates to where the lens put them in the photo (vectorised)."""
+        K = self.camera_matrix(image_size).astype(np.float32)
+        fx, fy, cx, cy = K[0, 0], K[1, 1], K[0, 2], K[1, 2]
+        k1, k2, p1, p2, k3, k4, k5, k6 = (self.distortion + (0.0,) * 8)[:8]
+        xn, yn = (x - cx) / fx, (y - cy) / fy
+        r2 = xn * xn + yn * yn
+        radial = (1 + r2 * (k1 + r2 * (k2 + r2 * k3))) / (1 + r2 * (k4 + r2 * (k5 + r2 * k6)))
+        xd = xn * radial + 2 * p1 * xn * yn + p2 * (r2 + 2 * xn * xn)
+        yd = yn * radial + p1 * (r2 + 2 * yn * yn) + 2 * p2 * xn * yn
+        return xd * fx + cx, yd * fy + cy
+
+    def warp_maps(self, image_shape: Tuple[int, ...], points: Sequence[Tuple[float, float]], width: int, height: int,
+                  quality: str = DEFAULT_QUALITY_PROFILE) -> WarpMaps:
+        return camera_maps(self, image_shape, points, width, height, quality)
+
+
+def load_camera_profiles(path: Optional[str] = None) -> Dict[str, CameraProfile]:
+    """Profiles from camera_profiles.json: {"name": {"fx", "fy", "cx", "cy", "distortion", "width", "height"}}."""
+    try:
+        with open(path or CAMERA_PROFILES_PATH, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {name: CameraProfile.from_dict(name, values) for name, values in data.items()}
+
+
+def get_camera_profile(name: Optional[str], path: Optional[str] = None) -> Optional[CameraProfile]:
+    if not name:
+        return None
+    profiles = load_camera_profiles(path)
+    if name not in profiles:
+        raise ValueError(f"Unknown camera profile: {name}")
+    return profiles[name]
+
+
+_map_cache: "OrderedDict[tuple, WarpMaps]" = OrderedDict()
+_map_cache_bytes = 0
+_map_cache_lock = threading.Lock()
+
+
+def _map_bytes(maps: WarpMaps) -> int:
+    return maps.map1.nbytes + (maps.map2.nbytes if maps.map2 is not None else 0)
+
+
+def camera_maps(camera: CameraProfile, image_shape: Tuple[int, ...], points: Sequence[Tuple[float, float]],
+                width: int, height: int, quality: str = DEFAULT_QUALITY_PROFILE) -> WarpMaps:
+    """Remap tables that undistort and rectify the quad in one pass, cached per profile, quad and size.
+
+    Full-resolution maps of large outputs run to hundreds of MB, so the cache is bounded by the bytes it holds
+    (camera_map_cache_mb) rather than by a count, and maps larger than the whole budget are not kept at all.
+    """
+    global _map_cache_bytes
+    key = (camera, tuple(image_shape[:2]), tuple((float(x), float(y)) for x, y in points), width, height, quality)
+    with _map_cache_lock:
+        maps = _map_cache.get(key)
+        if maps is not None:
+            _map_cache.move_to_end(key)
+            return maps
+    maps = _build_camera_maps(*key)
+    # Read on every insertion rather than at import, so settings applied later still size the cache
+    budget = performance().camera_map_cache_mb * 2 ** 20
+    size = _map_bytes(maps)
+    if size > budget:
+        return maps
+    with _map_cache_lock:
+        if key not in _map_cache:
+            _map_cache[key] = maps
+            _map_cache_bytes += size
+        while _map_cache_bytes > budget:
+            _map_cache_bytes -= _map_bytes(_map_cache.popitem(last=False)[1])
+    return maps
+
+
+def clear_map_cache() -> None:
+    global _map_cache_bytes
+    with _map_cache_lock:
+        _map_cache.clear()
+        _map_cache_bytes = 0
+
+
+def _build_camera_maps(camera: CameraProfile, image_shape: Tuple[int, int], points: Tuple[Tuple[float, float], ...],
+                       width: int, height: int, quality: str) -> WarpMaps:
+    profile = QUALITY_PROFILES[quality]
+    image_size = (image_shape[1], image_shape[0])
+    supersample = max(int(profile["supersample"]), 1)
+    warp_width, warp_height = width * supersample, height * supersample
+    quad = np.array(points, dtype=np.float32)
+
+    # Output pixel -> undistorted photo -> distorted photo, all in full-resolution coordinates
+    undistorted = camera.undistort_points(quad, image_size).astype(np.float32)
+    H = cv2.getPerspectiveTransform(ImageProcessor.destination_points(warp_width, warp_height), undistorted)
+    # float32 keeps 4K maps to a few hundred MB of temporaries at well under 1/1000 px error
+    H = H.astype(np.float32)
+    u = np.arange(warp_width, dtype=np.float32)[None, :]
+    v = np.arange(warp_height, dtype=np.float32)[:, None]
+    w = H[2, 0] * u + H[2, 1] * v + H[2, 2]
+    map_x, map_y = camera.distort((H[0, 0] * u + H[0, 1] * v + H[0, 2]) / w,
+                                  (H[1, 0] * u + H[1, 1] * v + H[1, 2]) / w, image_size)
+
+    level = ImageProcessor.select_pyramid_level(quad, warp_width, warp_height) if profile["mipmaps"] else 0
+    logger.debug(f"Built {warp_width}x{warp_height} lens-corrected maps for {camera.name}")
+    return ImageProcessor.fit_maps(image_shape, map_x, map_y, level, (width, height), supersample,
+                                   INTERPOLATION_FLAGS[profile["interpolation"]])
@@ -0,0 +1,375 @@
+# src/core/engine.py
+#
+# GUI-free extraction engine. Everything in here works on plain numpy buffers and
+# must not import tkinter, so batch tools and worker processes can use it without
+# a display.
+
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from src.core.block_compression import write_dds
+from src.core.camera import CameraProfile
+from src.core.image_processor import ImageProcessor
+from src.core.mesh_warp import extract_mesh_texture, fit_mesh_to_corners, mesh_aspect_ratio, mesh_corners
+from src.core.postprocess import PostProcessChain
+from src.core.tiled_image import TiledImage, open_tiled, should_tile
+from src.config.performance import performance
+from src.config.settings import DEFAULT_QUALITY_PROFILE, DEFAULT_RESOLUTION, DDS_DEFAULT_QUALITY, JPEG_QUALITY
+from src.utils.exceptions import ImageLoadError, TextureExtractionError, TextureSaveError
+from src.utils.profiler import span, traced
+
+logger = logging.getLogger(__name__)
+
+ASPECT_MODES = ("Estimated", "Square", "Custom")
+SOURCE_SIZING_POLICIES = ("Source", "Source (Power of 2)", "Original")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Shared thread pool used by ExtractionSession.submit and stream, sized by the performance settings."""
+    global _executor, _executor_workers
+    workers = performance().extraction_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                # Reconfigured at runtime: jobs already queued still finish on the old pool
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extract")
+            _executor_workers = workers
+        return _executor
+
+
+def load_image(file_path: str, min_tiled_pixels: Optional[int] = None) -> Union[np.ndarray, TiledImage]:
+    """Decode an image. Sources above min_tiled_pixels (TILED_IMAGE_MIN_PIXELS by default) come back as a
+    memory-mapped TiledImage."""
+    if should_tile(file_path, min_tiled_pixels):
+        return open_tiled(file_path)
+    if file_path.lower().endswith(".npy"):
+        return np.load(file_path)
+    image = cv2.imread(file_path, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ImageLoadError("Failed to load image")
+    return image
+
+
+@traced
+def save_texture(file_path: str, image: np.ndarray, block_format: Optional[str] = None,
+                 block_quality: str = DDS_DEFAULT_QUALITY, mip_levels: Sequence[np.ndarray] = (),
+                 executor: Optional[Executor] = None) -> None:
+    """Encode a BGR(A) buffer, writing to a temporary file first so readers never see partial output.
+
+    .dds paths are block compressed (see src.core.block_compression), with mip_levels (smallest last)
+    stored after the base level and blocks encoded on executor if given; anything else is encoded by OpenCV,
+    JPEGs at JPEG_QUALITY.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(directory, exist_ok=True)
+    root, ext = os.path.splitext(file_path)
+    tmp_path = f"{root}.tmp{os.getpid()}-{threading.get_ident()}{ext}"
+    try:
+        if ext.lower() == ".dds":
+            write_dds(tmp_path, [image, *mip_levels], block_format, block_quality, executor)
+        elif mip_levels:
+            raise TextureSaveError(f"Mip chains can only be saved as .dds: {file_path}")
+        else:
+            params = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY] if ext.lower() in (".jpg", ".jpeg") else []
+            try:
+                success, encoded = cv2.imencode(ext, np.ascontiguousarray(image), params)
+            except cv2.error:
+                success = False
+            if not success:
+                raise TextureSaveError(f"Unsupported output format: {file_path}")
+            # Written by numpy rather than cv2.imwrite, which cannot open non-ASCII paths on Windows
+            encoded.tofile(tmp_path)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def to_rgb(image: np.ndarray) -> np.ndarray:
+    """Convert an OpenCV (BGR, BGRA or grayscale) buffer to RGB(A) for display."""
+    if image.ndim == 2 or image.shape[2] == 1:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def apply_orientation(image: np.ndarray, flip: bool = False, flop: bool = False, rotate: bool = False) -> np.ndarray:
+    """Flip vertically, flop horizontally and/or rotate 90° clockwise (as views, no copies)."""
+    if flip:
+        image = image[::-1]
+    if flop:
+        image = image[:, ::-1]
+    if rotate:
+        image = np.rot90(image, k=-1)
+    return image
+
+
+def scale_for_preview(image: np.ndarray, preview_max_dim: Optional[int] = None) -> np.ndarray:
+    preview_max_dim = preview_max_dim or performance().preview_size
+    h, w = image.shape[:2]
+    if max(h, w) > preview_max_dim:
+        scale = preview_max_dim / max(h, w)
+        new_size = (max(int(w * scale), 1), max(int(h * scale), 1))
+        return cv2.resize(image, new_size, interpolation=cv2.INTER_AREA)
+    return image
+
+
+def estimate_aspect_ratio(points: Sequence[Tuple[float, float]]) -> float:
+    if len(points) != 4:
+        return 1.0
+    side_lengths = [
+        ((points[i][0] - points[(i + 1) % 4][0]) ** 2 +
+         (points[i][1] - points[(i + 1) % 4][1]) ** 2) ** 0.5
+        for i in range(4)
+    ]
+    width = (side_lengths[0] + side_lengths[2]) / 2
+    height = (side_lengths[1] + side_lengths[3]) / 2
+    return width / height
+
+
+def parse_resolution(value: str) -> Tuple[int, int]:
+    """Parse a "WIDTHxHEIGHT" string, raising ValueError if it is malformed."""
+    width, height = map(int, value.lower().split('x'))
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Invalid resolution: {value}")
+    return width, height
+
+
+@dataclass(frozen=True, eq=False)
+class ExtractionJob:
+    """A self-contained description of one extraction: source, quad, size and orientation."""
+    image: Union[np.ndarray, TiledImage]
+    points: Tuple[Tuple[float, float], ...]
+    width: int
+    height: int
+    quality: str = DEFAULT_QUALITY_PROFILE
+    flip: bool = False
+    flop: bool = False
+    rotate: bool = False
+    preview_size: Optional[int] = field(default_factory=lambda: performance().preview_size)
+    name: Optional[str] = None
+    camera: Optional[CameraProfile] = None
+    mesh: Optional[np.ndarray] = None  # Control grid (rows, columns, 2) that replaces points when set
+    postprocess: Optional[PostProcessChain] = None
+
+
+@dataclass(eq=False)
+class ExtractionResult:
+    job: ExtractionJob
+    warped: np.ndarray
+    preview: Optional[np.ndarray] = field(default=None)
+    postprocessed: bool = False  # Preview jobs only post-process the preview until finish() is called
+
+    def finish(self) -> "ExtractionResult":
+        """Post-process the full-resolution buffer if that was left for save time."""
+        if self.job.postprocess is not None and not self.postprocessed:
+            self.warped = self.job.postprocess.apply(self.warped)
+            self.postprocessed = True
+        return self
+
+    def oriented(self) -> np.ndarray:
+        """The warped buffer with the job's flip/flop/rotate applied."""
+        return apply_orientation(self.warped, self.job.flip, self.job.flop, self.job.rotate)
+
+
+def run_job(job: ExtractionJob, image_processor: Optional[ImageProcessor] = None) -> ExtractionResult:
+    processor = image_processor or ImageProcessor
+    try:
+        with span("run_job", "extract", size=f"{job.width}x{job.height}", preview=job.preview_size, job=job.name):
+            with span("warp", "extract"):
+                if job.mesh is not None:
+                    warped = extract_mesh_texture(job.image, job.mesh, job.width, job.height, job.quality,
+                                                  job.camera)
+                else:
+                    warped = processor.extract_texture(job.image, np.array(job.points, dtype=np.float32),
+                                                       job.width, job.height, quality=job.quality, camera=job.camera)
+            if job.postprocess is None or not job.preview_size:
+                if job.postprocess is not None:
+                    warped = job.postprocess.apply(warped)
+                preview = to_rgb(scale_for_preview(warped, job.preview_size)) if job.preview_size else None
+                return ExtractionResult(job, warped, preview, postprocessed=True)
+
+            # Interactive jobs run the chain at preview resolution; the full buffer is finished when saved
+            preview = scale_for_preview(warped, job.preview_size)
+            if preview is warped:
+                preview = preview.copy()
+            preview = job.postprocess.apply(preview, scale=preview.shape[1] / warped.shape[1])
+            return ExtractionResult(job, warped, to_rgb(preview))
+    except Exception as e:
+        raise TextureExtractionError(f"Failed to extract texture: {str(e)}") from e
+
+
+class ExtractionSession:
+    """Holds the state of one extraction (image, quad, sizing, orientation) without any UI."""
+
+    def __init__(self, image: Union[np.ndarray, TiledImage, None] = None,
+                 image_processor: Optional[ImageProcessor] = None):
+        self.image_processor = image_processor or ImageProcessor()
+        self.image: Union[np.ndarray, TiledImage, None] = image
+        self.points: List[Tuple[float, float]] = []
+        self.aspect_mode: str = "Estimated"
+        self.aspect_ratio: float = 1.0
+        self.output_resolution: Optional[Tuple[int, int]] = None
+        self.sizing_policy: str = "Source"
+        self.quality_profile: str = DEFAULT_QUALITY_PROFILE
+        self.flip: bool = False
+        self.flop: bool = False
+        self.rotate: bool = False
+        self.preview_size: Optional[int] = performance().preview_size
+        self.camera: Optional[CameraProfile] = None
+        self.mesh: Optional[np.ndarray] = None
+        self.postprocess: Optional[PostProcessChain] = None
+        self.set_resolution(DEFAULT_RESOLUTION)
+
+    @property
+    def is_ready(self) -> bool:
+        return self.image is not None and len(self.points) == 4
+
+    def set_image(self, image: Union[np.ndarray, TiledImage]) -> None:
+        self.image = image
+        self.points = []
+        self.mesh = None
+
+    def set_points(self, points: Iterable[Tuple[float, float]]) -> None:
+        self.points = [(float(x), float(y)) for x, y in points]
+        self.fit_mesh()
+        self.apply_aspect_mode()
+
+    def set_mesh(self, mesh: Optional[Sequence]) -> None:
+        """Use a control grid of rows x columns nodes instead of the four points; None goes back to points."""
+        if mesh is None:
+            self.mesh = None
+            return
+        mesh = np.array(mesh, dtype=np.float64)
+        if mesh.ndim != 3 or mesh.shape[2] != 2 or min(mesh.shape[:2]) < 2:
+            raise ValueError("A mesh must be a grid of at least 2x2 (x, y) points")
+        self.mesh = mesh
+        self.points = mesh_corners(mesh)
+        self.apply_aspect_mode()
+
+    def fit_mesh(self) -> None:
+        """Carry the mesh along after its corners were moved through points."""
+        if self.mesh is not None and len(self.points) == 4 and self.points != mesh_corners(self.mesh):
+            self.mesh = fit_mesh_to_corners(self.mesh, self.points)
+
+    def set_aspect_mode(self, mode: str, ratio: Optional[float] = None) -> None:
+        if mode not in ASPECT_MODES:
+            raise ValueError(f"Unknown aspect ratio mode: {mode}")
+        self.aspect_mode = mode
+        if ratio is not None:
+            self.aspect_ratio = ratio
+        self.apply_aspect_mode()
+
+    def apply_aspect_mode(self) -> float:
+        if self.aspect_mode == "Estimated":
+            self.aspect_ratio = mesh_aspect_ratio(self.mesh) if self.mesh is not None else \
+                estimate_aspect_ratio(self.points)
+        elif self.aspect_mode == "Square":
+            self.aspect_ratio = 1.0
+        return self.aspect_ratio
+
+    def set_resolution(self, value: str) -> None:
+        """Accepts a sizing policy name or a "WIDTHxHEIGHT" string."""
+        if value in SOURCE_SIZING_POLICIES:
+            self.output_resolution = None
+            self.sizing_policy = value
+        else:
+            self.output_resolution = parse_resolution(value)
+
+    def calculate_output_size(self, points: np.ndarray, max_dim: int) -> Tuple[int, int]:
+        if self.output_resolution:
+            return self.output_resolution
+
+        if self.sizing_policy != "Original":
+            return self.image_processor.source_output_size(
+                points, self.aspect_ratio, power_of_two=self.sizing_policy == "Source (Power of 2)")
+
+        width = max(
+            np.linalg.norm(points[0] - points[1]),
+            np.linalg.norm(points[2] - points[3])
+        )
+        height = max(
+            np.linalg.norm(points[1] - points[2]),
+            np.linalg.norm(points[3] - points[0])
+        )
+
+        if self.aspect_ratio > 1:
+            width = height * self.aspect_ratio
+        else:
+            height = width / self.aspect_ratio
+
+        scale = max_dim / max(width, height)
+        return (int(width * scale), int(height * scale))
+
+    def output_size(self) -> Tuple[int, int]:
+        src_pts = np.array(self.points, dtype=np.float32)
+        return self.calculate_output_size(src_pts, max(self.image.shape[0], self.image.shape[1]))
+
+    def make_job(self, name: Optional[str] = None) -> ExtractionJob:
+        if not self.is_ready:
+            raise TextureExtractionError("An image and four points are required for extraction")
+        width, height = self.output_size()
+        return ExtractionJob(
+            image=self.image,
+            points=tuple(self.points),
+            width=width,
+            height=height,
+            quality=self.quality_profile,
+            flip=self.flip,
+            flop=self.flop,
+            rotate=self.rotate,
+            preview_size=self.preview_size,
+            name=name,
+            camera=self.camera,
+            mesh=None if self.mesh is None else self.mesh.copy(),
+            postprocess=self.postprocess,
+        )
+
+    def extract(self, job: Optional[ExtractionJob] = None) -> ExtractionResult:
+        """Run an extraction synchronously on the calling thread."""
+        return run_job(job or self.make_job(), self.image_processor)
+
+    def submit(self, job: Optional[ExtractionJob] = None, executor: Optional[Executor] = None) -> Future:
+        """Run an extraction on the shared thread pool and return its Future."""
+        job = job or self.make_job()
+        return (executor or get_executor()).submit(run_job, job, self.image_processor)
+
+    def stream(self, jobs: Iterable[ExtractionJob], max_in_flight: Optional[int] = None,
+               ordered: bool = True, executor: Optional[Executor] = None) -> Iterator[ExtractionResult]:
+        """Yield results as jobs finish, keeping at most max_in_flight buffers alive."""
+        executor = executor or get_executor()
+        max_in_flight = max_in_flight or performance().extraction_workers * 2
+        pending: deque = deque()
+        jobs = iter(jobs)
+
+        def fill():
+            for job in jobs:
+                pending.append(executor.submit(run_job, job, self.image_processor))
+                if len(pending) >= max_in_flight:
+                    break
+
+        fill()
+        while pending:
+            if ordered:
+                future = pending.popleft()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                future = next(iter(done))
+                pending.remove(future)
+            result = future.result()
+            fill()
+            yield result
@@ -0,0 +1,97 @@
+# src/core/export_set.py
+#
+# Multi-resolution export: the quad is warped once at the largest requested size
+# and every smaller size is derived from a box-filtered (INTER_AREA) halving
+# chain of that warp, then all outputs are encoded in parallel.
+
+import logging
+import os
+from concurrent.futures import Executor
+from dataclasses import replace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from src.core.engine import ExtractionJob, apply_orientation, get_executor, parse_resolution, run_job, save_texture
+from src.config.settings import EXPORT_PRESETS
+from src.utils.exceptions import TextureSaveError
+
+logger = logging.getLogger(__name__)
+
+
+def halve(image: np.ndarray) -> np.ndarray:
+    h, w = image.shape[:2]
+    return cv2.resize(image, (max(w // 2, 1), max(h // 2, 1)), interpolation=cv2.INTER_AREA)
+
+
+def mip_chain(image: np.ndarray) -> List[np.ndarray]:
+    """The image followed by every halved level down to 1x1."""
+    levels = [image]
+    while max(levels[-1].shape[:2]) > 1:
+        levels.append(halve(levels[-1]))
+    return levels
+
+
+def derive_levels(image: np.ndarray, sizes: Sequence[Tuple[int, int]]) -> Dict[Tuple[int, int], np.ndarray]:
+    """Downsample image to each (width, height), walking a halving chain and area-resizing the remainder."""
+    chain = [image]
+    levels = {}
+    for size in sorted(set(sizes), key=lambda s: s[0] * s[1], reverse=True):
+        while True:
+            h, w = chain[-1].shape[:2]
+            if w // 2 < size[0] or h // 2 < size[1] or max(w, h) == 1:
+                break
+            chain.append(halve(chain[-1]))
+        level = chain[-1]
+        if (level.shape[1], level.shape[0]) != size:
+            level = cv2.resize(level, size, interpolation=cv2.INTER_AREA)
+        levels[size] = level
+    return levels
+
+
+def export_paths(base_path: str, sizes: Sequence[Tuple[int, int]]) -> Dict[Tuple[int, int], str]:
+    root, ext = os.path.splitext(base_path)
+    return {size: f"{root}_{size[0]}x{size[1]}{ext or '.png'}" for size in sizes}
+
+
+def export_set(job: ExtractionJob, base_path: str, resolutions: Sequence[str], mip_chain_file: bool = False,
+               executor: Optional[Executor] = None) -> List[str]:
+    """Export the job's quad at every resolution from a single warp and return the written paths.
+
+    Files are named <base>_<width>x<height><ext>. With mip_chain_file only the largest resolution is
+    written, to base_path itself, as a .dds holding the full mip chain.
+    """
+    sizes = [parse_resolution(value) for value in resolutions]
+    if not sizes:
+        raise TextureSaveError("An export set needs at least one resolution")
+    if mip_chain_file and os.path.splitext(base_path)[1].lower() != ".dds":
+        raise TextureSaveError("A mip chain can only be exported as .dds")
+
+    largest = max(sizes, key=lambda s: s[0] * s[1])
+    job = replace(job, width=largest[0], height=largest[1], preview_size=None)
+    warped = run_job(job).warped
+    executor = executor or get_executor()
+
+    def orient(image: np.ndarray) -> np.ndarray:
+        return apply_orientation(image, job.flip, job.flop, job.rotate)
+
+    if mip_chain_file:
+        levels = [orient(level) for level in mip_chain(warped)]
+        save_texture(base_path, levels[0], mip_levels=levels[1:], executor=executor)
+        logger.info(f"Exported {len(levels)} mip levels to {base_path}")
+        return [base_path]
+
+    levels = derive_levels(warped, sizes)
+    paths = export_paths(base_path, sizes)
+    futures = [executor.submit(save_texture, paths[size], orient(level)) for size, level in levels.items()]
+    for future in futures:
+        future.result()
+    logger.info(f"Exported {len(paths)} sizes of {base_path}")
+    return [paths[size] for size in sizes]
+
+
+def export_preset(job: ExtractionJob, base_path: str, preset: str,
+                  executor: Optional[Executor] = None) -> List[str]:
+    settings = EXPORT_PRESETS[preset]
+    return export_set(job, base_path, settings["resolutions"], settings["mip_chain"], executor)
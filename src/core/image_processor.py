@@ -1,7 +1,54 @@
 # image_processor.py
+import math
+
 import cv2
 import numpy as np
-from typing import Tuple, List
+from typing import Tuple, List, Optional, TYPE_CHECKING
+
+from src.core.tiled_image import TiledImage
+from src.config.settings import QUALITY_PROFILES, DEFAULT_QUALITY_PROFILE
+
+if TYPE_CHECKING:  # camera builds on this module
+    from src.core.camera import CameraProfile
+
+INTERPOLATION_FLAGS = {
+    "nearest": cv2.INTER_NEAREST,
+    "linear": cv2.INTER_LINEAR,
+    "cubic": cv2.INTER_CUBIC,
+    "lanczos": cv2.INTER_LANCZOS4,
+}
+
+
+def read_source(image, roi: Tuple[int, int, int, int], level: int) -> np.ndarray:
+    """The pixels of roi (x0, y0, x1, y1) reduced to a pyramid level, from an array or a TiledImage."""
+    if isinstance(image, TiledImage):
+        return image.region(roi, level)
+    x0, y0, x1, y1 = roi
+    source = image[y0:y1, x0:x1]
+    for _ in range(level):
+        source = cv2.pyrDown(source)
+    return source
+
+
+class WarpMaps:
+    """Precomputed remap tables for a fixed quad, output size and source shape."""
+
+    def __init__(self, map1: np.ndarray, map2: Optional[np.ndarray], roi: Tuple[int, int, int, int], level: int,
+                 size: Tuple[int, int], supersample: int, interpolation: int):
+        self.map1 = map1
+        self.map2 = map2
+        self.roi = roi
+        self.level = level
+        self.size = size
+        self.supersample = supersample
+        self.interpolation = interpolation
+
+    def apply(self, image: np.ndarray) -> np.ndarray:
+        source = read_source(image, self.roi, self.level)
+        warped = cv2.remap(source, self.map1, self.map2, self.interpolation)
+        if self.supersample > 1:
+            warped = cv2.resize(warped, self.size, interpolation=cv2.INTER_AREA)
+        return warped
 
 
 class ImageProcessor:
@@ -17,9 +64,158 @@ class ImageProcessor:
         return scaled_image, scale_factor
 
     @staticmethod
-    def extract_texture(image: np.ndarray, points: List[Tuple[float, float]], width: int, height: int) -> np.ndarray:
-        src_pts = np.array(points, dtype=np.float32)
-        dst_pts = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
-        M = cv2.getPerspectiveTransform(src_pts, dst_pts)
-        return cv2.warpPerspective(image, M, (width, height))
+    def destination_points(width: int, height: int) -> np.ndarray:
+        return np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
 
+    @staticmethod
+    def minification(points: np.ndarray, width: int, height: int, samples: int = 5) -> float:
+        """Smallest source-pixels-per-output-pixel ratio over a grid of output samples."""
+        dst_pts = ImageProcessor.destination_points(width, height)
+        H = cv2.getPerspectiveTransform(dst_pts, np.asarray(points, dtype=np.float32)).astype(np.float64)
+
+        u, v = np.meshgrid(np.linspace(0, width - 1, samples), np.linspace(0, height - 1, samples))
+        u, v = u.ravel(), v.ravel()
+        w = H[2, 0] * u + H[2, 1] * v + H[2, 2]
+        x = (H[0, 0] * u + H[0, 1] * v + H[0, 2]) / w
+        y = (H[1, 0] * u + H[1, 1] * v + H[1, 2]) / w
+
+        # Jacobian of the projective map, evaluated at every sample at once
+        dx_du = (H[0, 0] - x * H[2, 0]) / w
+        dx_dv = (H[0, 1] - x * H[2, 1]) / w
+        dy_du = (H[1, 0] - y * H[2, 0]) / w
+        dy_dv = (H[1, 1] - y * H[2, 1]) / w
+        area_scale = np.abs(dx_du * dy_dv - dx_dv * dy_du)
+        return float(np.sqrt(area_scale.min()))
+
+    @staticmethod
+    def select_pyramid_level(points: np.ndarray, width: int, height: int) -> int:
+        scale = ImageProcessor.minification(points, width, height)
+        if scale < 2.0:
+            return 0
+        return int(math.floor(math.log2(scale)))
+
+    @staticmethod
+    def source_output_size(points: np.ndarray, aspect_ratio: float,
+                           power_of_two: bool = False) -> Tuple[int, int]:
+        """Output size that keeps the source pixel density of the quad's longest edge."""
+        points = np.asarray(points, dtype=np.float32)
+        edges = np.linalg.norm(points - np.roll(points, -1, axis=0), axis=1)
+        longest = max(float(edges.max()), 1.0)
+
+        if aspect_ratio >= 1:
+            width, height = longest, longest / aspect_ratio
+        else:
+            width, height = longest * aspect_ratio, longest
+
+        if power_of_two:
+            return (ImageProcessor.nearest_power_of_two(width), ImageProcessor.nearest_power_of_two(height))
+        return (max(int(round(width)), 1), max(int(round(height)), 1))
+
+    @staticmethod
+    def nearest_power_of_two(value: float) -> int:
+        return 2 ** max(int(round(math.log2(max(value, 1.0)))), 0)
+
+    @staticmethod
+    def _source_roi(image_shape: Tuple[int, ...], points: np.ndarray, margin: int) -> Tuple[int, int, int, int]:
+        img_height, img_width = image_shape[:2]
+        x0 = min(max(int(math.floor(points[:, 0].min())) - margin, 0), img_width - 1)
+        y0 = min(max(int(math.floor(points[:, 1].min())) - margin, 0), img_height - 1)
+        x1 = min(int(math.ceil(points[:, 0].max())) + margin + 1, img_width)
+        y1 = min(int(math.ceil(points[:, 1].max())) + margin + 1, img_height)
+        return x0, y0, max(x1, x0 + 1), max(y1, y0 + 1)
+
+    @staticmethod
+    def plan_warp(image_shape: Tuple[int, ...], points: np.ndarray, width: int, height: int, profile: dict):
+        """Source ROI, pyramid level and level-local quad for warping points to a width x height output.
+
+        Only the pixels under the quad are read, then reduced to the pyramid level whose
+        density matches the output so the warp filter never skips source pixels.
+        """
+        supersample = max(int(profile["supersample"]), 1)
+        points = np.asarray(points, dtype=np.float32)
+        level = 0
+        if profile["mipmaps"]:
+            level = ImageProcessor.select_pyramid_level(points, width * supersample, height * supersample)
+
+        roi, levels, src_pts = ImageProcessor.level_points(image_shape, points, level)
+        return roi, levels, src_pts, supersample
+
+    @staticmethod
+    def level_points(image_shape: Tuple[int, ...], points: np.ndarray,
+                     level: int) -> Tuple[Tuple[int, int, int, int], int, np.ndarray]:
+        """Source ROI around points, the pyramid level actually reachable in it and points in that level."""
+        x0, y0, x1, y1 = ImageProcessor._source_roi(image_shape, points, margin=2 ** (level + 1))
+        # Starting on a multiple of 2**level lines the ROI's pyramid pixels up with those of the whole image,
+        # which is what a TiledImage stores
+        x0, y0 = x0 - x0 % 2 ** level, y0 - y0 % 2 ** level
+        src_pts = points - np.array([x0, y0], dtype=points.dtype)
+        roi_width, roi_height = x1 - x0, y1 - y0
+        levels = 0
+        while levels < level and min(roi_width, roi_height) >= 2:
+            roi_width, roi_height = (roi_width + 1) // 2, (roi_height + 1) // 2
+            levels += 1
+        # pyrDown blurs with a centred kernel and keeps the even pixels, so pixel i of level n sits at 2**n * i
+        src_pts = src_pts / 2 ** levels
+        return (x0, y0, x1, y1), levels, src_pts
+
+    @staticmethod
+    def perspective_maps(image_shape: Tuple[int, ...], points: List[Tuple[float, float]], width: int, height: int,
+                         quality: str = DEFAULT_QUALITY_PROFILE, fixed_point: bool = True) -> WarpMaps:
+        """Build remap tables once so the same quad can be applied to many frames of the same size."""
+        profile = QUALITY_PROFILES[quality]
+        roi, level, src_pts, supersample = ImageProcessor.plan_warp(image_shape, points, width, height, profile)
+        warp_width, warp_height = width * supersample, height * supersample
+
+        dst_pts = ImageProcessor.destination_points(warp_width, warp_height)
+        H = cv2.getPerspectiveTransform(dst_pts, src_pts).astype(np.float64)
+        u = np.arange(warp_width, dtype=np.float64)[None, :]
+        v = np.arange(warp_height, dtype=np.float64)[:, None]
+        w = H[2, 0] * u + H[2, 1] * v + H[2, 2]
+        map_x = ((H[0, 0] * u + H[0, 1] * v + H[0, 2]) / w).astype(np.float32)
+        map_y = ((H[1, 0] * u + H[1, 1] * v + H[1, 2]) / w).astype(np.float32)
+
+        interpolation = INTERPOLATION_FLAGS[profile["interpolation"]]
+        map1, map2 = map_x, map_y
+        if fixed_point:
+            map1, map2 = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2,
+                                         nninterpolation=interpolation == cv2.INTER_NEAREST)
+        return WarpMaps(map1, map2, roi, level, (width, height), supersample, interpolation)
+
+    @staticmethod
+    def fit_maps(image_shape: Tuple[int, ...], map_x: np.ndarray, map_y: np.ndarray, level: int,
+                 size: Tuple[int, int], supersample: int, interpolation: int) -> WarpMaps:
+        """WarpMaps for full-resolution source coordinates, cropped to the pixels they read and moved to level.
+
+        Used for warps that are not a single homography, with the same ROI and pyramid handling as plan_warp.
+        """
+        extent = np.array([[map_x.min(), map_y.min()], [map_x.max(), map_y.max()]])
+        roi, levels, _ = ImageProcessor.level_points(image_shape, extent, level)
+        # Source x sits at x / 2**n in level n, as in level_points
+        scale = 0.5 ** levels
+        map_x = ((map_x - roi[0]) * scale).astype(np.float32, copy=False)
+        map_y = ((map_y - roi[1]) * scale).astype(np.float32, copy=False)
+        map1, map2 = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2,
+                                     nninterpolation=interpolation == cv2.INTER_NEAREST)
+        return WarpMaps(map1, map2, roi, levels, size, supersample, interpolation)
+
+    @staticmethod
+    def extract_texture(image: np.ndarray, points: List[Tuple[float, float]], width: int, height: int,
+                        quality: str = DEFAULT_QUALITY_PROFILE,
+                        camera: Optional["CameraProfile"] = None) -> np.ndarray:
+        """Rectify the quad to width x height. With a CameraProfile, lens distortion is removed in the same pass."""
+        if camera is not None:
+            return camera.warp_maps(image.shape, points, width, height, quality).apply(image)
+
+        profile = QUALITY_PROFILES[quality]
+        roi, level, src_pts, supersample = ImageProcessor.plan_warp(image.shape, points, width, height, profile)
+        warp_width, warp_height = width * supersample, height * supersample
+
+        source = read_source(image, roi, level)
+
+        dst_pts = ImageProcessor.destination_points(warp_width, warp_height)
+        M = cv2.getPerspectiveTransform(src_pts, dst_pts)
+        warped = cv2.warpPerspective(source, M, (warp_width, warp_height),
+                                     flags=INTERPOLATION_FLAGS[profile["interpolation"]])
+        if supersample > 1:
+            warped = cv2.resize(warped, (width, height), interpolation=cv2.INTER_AREA)
+        return warped
@@ -0,0 +1,137 @@
+# src/core/memory.py
+#
+# Memory accounting for the GUI. The large buffers the application keeps alive
+# (the source image, its display copies, extracted textures, PhotoImages, the
+# undo history) are registered by name with a MemoryGovernor, which compares
+# their total against a budget. Once usage passes a soft limit, relief steps run
+# in the order they were registered, cheapest first: dropping caches, smaller
+# previews, moving the source into a memory-mapped tile pyramid. Once usage is
+# well below the limit again, steps with a restore action are undone, last first.
+
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from src.core.tiled_image import TiledImage
+from src.config.settings import MEMORY_SOFT_LIMIT, MEMORY_RESTORE_LIMIT
+
+logger = logging.getLogger(__name__)
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit in ("B", "KB") else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def buffer_size(buffer) -> int:
+    """Bytes of process memory pinned by buffer: arrays, PhotoImages (32 bits per pixel) and sequences of them.
+    Memory-mapped arrays and tile pyramids live in the page cache and count as nothing."""
+    if buffer is None or isinstance(buffer, (np.memmap, TiledImage)):
+        return 0
+    if isinstance(buffer, np.ndarray):
+        # Views (flipped or cropped) share the memory of their base
+        return buffer.nbytes if buffer.base is None else buffer_size(buffer.base)
+    if isinstance(buffer, (list, tuple)):
+        return sum(buffer_size(item) for item in buffer)
+    if isinstance(buffer, dict):
+        return sum(buffer_size(item) for item in buffer.values())
+    if callable(getattr(buffer, "width", None)) and callable(getattr(buffer, "height", None)):
+        return buffer.width() * buffer.height() * 4
+    return 0
+
+
+@dataclass
+class ReliefStep:
+    name: str
+    apply: Callable[[], bool]  # Returns False when there was nothing to do
+    restore: Optional[Callable[[], None]] = None
+    active: bool = False
+
+
+class MemoryGovernor:
+    def __init__(self, budget: int, on_change: Optional[Callable[["MemoryGovernor"], None]] = None,
+                 soft_limit: float = MEMORY_SOFT_LIMIT, restore_limit: float = MEMORY_RESTORE_LIMIT):
+        self.budget = budget
+        self.on_change = on_change
+        self.soft_limit = soft_limit
+        self.restore_limit = restore_limit
+        self.buffers: Dict[str, int] = {}
+        self.steps: List[ReliefStep] = []
+        self._rebalancing = False
+        self._over_budget = False
+
+    @property
+    def usage(self) -> int:
+        return sum(self.buffers.values())
+
+    @property
+    def pressure(self) -> float:
+        return self.usage / max(self.budget, 1)
+
+    def add_relief(self, name: str, apply: Callable[[], bool], restore: Optional[Callable[[], None]] = None) -> None:
+        self.steps.append(ReliefStep(name, apply, restore))
+
+    def track(self, name: str, buffer) -> int:
+        """Record the current buffer under name, replacing what was there; None releases it."""
+        size = buffer_size(buffer)
+        if size:
+            self.buffers[name] = size
+        else:
+            self.buffers.pop(name, None)
+        return size
+
+    def fits(self, size: int) -> bool:
+        """Whether size more bytes stay within the soft limit."""
+        return self.usage + size <= self.soft_limit * self.budget
+
+    def rebalance(self) -> List[str]:
+        """Run relief steps while usage is over the soft limit, or restore them when it is far below.
+        Returns the names of the steps applied."""
+        if self._rebalancing:
+            return []  # Relief steps that redraw account their buffers again
+        self._rebalancing = True
+        try:
+            applied = self._relieve()
+        finally:
+            self._rebalancing = False
+        if self.usage > self.budget and not self._over_budget:
+            logger.warning(f"Memory use {format_bytes(self.usage)} is over the budget of {format_bytes(self.budget)} "
+                           f"even after degrading: {self.breakdown()}")
+        self._over_budget = self.usage > self.budget
+        if self.on_change is not None:
+            self.on_change(self)
+        return applied
+
+    def _relieve(self) -> List[str]:
+        applied = []
+        for step in self.steps:
+            if self.usage <= self.soft_limit * self.budget:
+                break
+            if step.active:
+                continue
+            before = self.usage
+            step.active = step.apply()
+            if step.active:
+                applied.append(step.name)
+                logger.info(f"Memory at {format_bytes(before)} of {format_bytes(self.budget)}: {step.name} "
+                            f"(now {format_bytes(self.usage)})")
+        if not applied and self.usage < self.restore_limit * self.budget:
+            for step in reversed(self.steps):
+                if not step.active:
+                    continue
+                step.active = False  # Steps without a restore action may simply run again next time
+                if step.restore is not None:
+                    step.restore()
+                    logger.info(f"Memory at {format_bytes(self.usage)}: undid {step.name}")
+        return applied
+
+    def summary(self) -> str:
+        return f"Memory: {format_bytes(self.usage)} / {format_bytes(self.budget)}"
+
+    def breakdown(self) -> str:
+        return ", ".join(f"{name} {format_bytes(size)}"
+                         for name, size in sorted(self.buffers.items(), key=lambda item: -item[1]))
@@ -0,0 +1,159 @@
+# src/core/mesh_warp.py
+#
+# Grid (mesh) warps for surfaces that are not flat, such as bark, curved walls or
+# book pages. A selection is a grid of control points, rows x columns nodes in
+# source pixels, and every cell is rectified with its own homography. The
+# homographies of all cells are solved in closed form at once and evaluated for
+# every output pixel with array operations, so the whole texture still comes from a
+# single cv2.remap. A grid whose nodes all lie on one plane reproduces the plain
+# four-point warp exactly.
+
+import logging
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from src.core.camera import CameraProfile
+from src.core.image_processor import INTERPOLATION_FLAGS, ImageProcessor, WarpMaps
+from src.config.settings import DEFAULT_QUALITY_PROFILE, QUALITY_PROFILES
+
+logger = logging.getLogger(__name__)
+
+
+def mesh_from_quad(points: Sequence[Tuple[float, float]], columns: int, rows: int) -> np.ndarray:
+    """A flat grid of rows x columns nodes spanning the quad (corners clockwise from top-left)."""
+    if columns < 2 or rows < 2:
+        raise ValueError("A mesh needs at least 2x2 control points")
+    unit = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype=np.float32)
+    H = cv2.getPerspectiveTransform(unit, np.asarray(points, dtype=np.float32))
+    s, t = np.meshgrid(np.linspace(0, 1, columns), np.linspace(0, 1, rows))
+    grid = np.stack([s, t], axis=-1).reshape(-1, 1, 2)
+    return cv2.perspectiveTransform(grid, H).reshape(rows, columns, 2)
+
+
+def mesh_corners(mesh: np.ndarray) -> List[Tuple[float, float]]:
+    """The outer corners of a mesh in the same clockwise order as a four-point selection."""
+    return [(float(x), float(y)) for x, y in (mesh[0, 0], mesh[0, -1], mesh[-1, -1], mesh[-1, 0])]
+
+
+def fit_mesh_to_corners(mesh: np.ndarray, points: Sequence[Tuple[float, float]]) -> np.ndarray:
+    """Move the whole mesh with its corners, keeping the bends of interior nodes relative to the quad."""
+    H = cv2.getPerspectiveTransform(np.array(mesh_corners(mesh), dtype=np.float32),
+                                    np.asarray(points, dtype=np.float32))
+    return cv2.perspectiveTransform(mesh.reshape(-1, 1, 2).astype(np.float64), H).reshape(mesh.shape)
+
+
+def mesh_aspect_ratio(mesh: np.ndarray) -> float:
+    """Width over height measured along the grid lines, so curvature counts towards the surface size."""
+    widths = np.linalg.norm(np.diff(mesh, axis=1), axis=2).sum(axis=1)
+    heights = np.linalg.norm(np.diff(mesh, axis=0), axis=2).sum(axis=0)
+    return float(widths.mean() / max(heights.mean(), 1e-9))
+
+
+def _square_to_quad(p0: np.ndarray, p1: np.ndarray, p2: np.ndarray, p3: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Coefficients (a, b, c, d, e, f, g, h) of the homographies taking the unit square to each quad.
+
+    x = (a s + b t + c) / (g s + h t + 1) and y = (d s + e t + f) / (g s + h t + 1), for arrays of quads.
+    """
+    sx = p0[..., 0] - p1[..., 0] + p2[..., 0] - p3[..., 0]
+    sy = p0[..., 1] - p1[..., 1] + p2[..., 1] - p3[..., 1]
+    dx1, dy1 = p1[..., 0] - p2[..., 0], p1[..., 1] - p2[..., 1]
+    dx2, dy2 = p3[..., 0] - p2[..., 0], p3[..., 1] - p2[..., 1]
+    denominator = dx1 * dy2 - dx2 * dy1
+    denominator = np.where(np.abs(denominator) < 1e-12, 1e-12, denominator)
+    g = (sx * dy2 - dx2 * sy) / denominator
+    h = (dx1 * sy - sx * dy1) / denominator
+    a = p1[..., 0] - p0[..., 0] + g * p1[..., 0]
+    b = p3[..., 0] - p0[..., 0] + h * p3[..., 0]
+    d = p1[..., 1] - p0[..., 1] + g * p1[..., 1]
+    e = p3[..., 1] - p0[..., 1] + h * p3[..., 1]
+    return a, b, p0[..., 0], d, e, p0[..., 1], g, h
+
+
+def _cell_coordinates(size: int, cells: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Cell index and position within the cell (0..1) of every output pixel centre along one axis."""
+    grid = np.arange(size, dtype=np.float64) * (cells / max(size - 1, 1))
+    index = np.minimum(grid.astype(np.intp), cells - 1)
+    return index, (grid - index).astype(np.float32)
+
+
+def _quad_areas(p0: np.ndarray, p1: np.ndarray, p2: np.ndarray, p3: np.ndarray) -> np.ndarray:
+    diagonal1, diagonal2 = p2 - p0, p3 - p1
+    return 0.5 * np.abs(diagonal1[..., 0] * diagonal2[..., 1] - diagonal1[..., 1] * diagonal2[..., 0])
+
+
+def _cell_corners(nodes: np.ndarray) -> Tuple[np.ndarray, ...]:
+    return nodes[:-1, :-1], nodes[:-1, 1:], nodes[1:, 1:], nodes[1:, :-1]
+
+
+def _grid_maps(nodes: np.ndarray, width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Source coordinates of every output pixel, each cell mapped by its own homography."""
+    rows, columns = nodes.shape[0] - 1, nodes.shape[1] - 1
+    a, b, c, d, e, f, g, h = (values.astype(np.float32) for values in _square_to_quad(*_cell_corners(nodes)))
+    column, s = _cell_coordinates(width, columns)
+    row, t = _cell_coordinates(height, rows)
+    t = t[:, None]
+
+    # Terms that only depend on the output row are evaluated per (row, cell column) first; expanding
+    # them along each cell's run of columns is a contiguous repeat rather than a per-pixel gather
+    counts = np.bincount(column, minlength=columns)
+
+    def expand(values: np.ndarray) -> np.ndarray:
+        return np.repeat(values, counts, axis=1)
+
+    inverse_w = expand(g[row]) * s
+    inverse_w += expand(h[row] * t + 1)
+    np.reciprocal(inverse_w, out=inverse_w)
+    map_x = expand(a[row]) * s
+    map_x += expand(b[row] * t + c[row])
+    map_x *= inverse_w
+    map_y = expand(d[row]) * s
+    map_y += expand(e[row] * t + f[row])
+    map_y *= inverse_w
+    return map_x, map_y
+
+
+def mesh_maps(image_shape: Tuple[int, ...], mesh: np.ndarray, width: int, height: int,
+              quality: str = DEFAULT_QUALITY_PROFILE, camera: Optional[CameraProfile] = None) -> WarpMaps:
+    """Remap tables rectifying every cell of mesh into its share of a width x height output.
+
+    With a CameraProfile the nodes are undistorted first and the finished map is pushed back through
+    the lens model, as in src.core.camera.
+    """
+    profile = QUALITY_PROFILES[quality]
+    supersample = max(int(profile["supersample"]), 1)
+    warp_width, warp_height = width * supersample, height * supersample
+    nodes = np.asarray(mesh, dtype=np.float64)
+    rows, columns = nodes.shape[0] - 1, nodes.shape[1] - 1
+    image_size = (image_shape[1], image_shape[0])
+    if camera is not None:
+        nodes = camera.undistort_points(nodes.reshape(-1, 2), image_size).reshape(nodes.shape)
+
+    level = 0
+    if profile["mipmaps"]:
+        # Smallest source-to-output density over the cells, as select_pyramid_level does for one quad
+        cell_area = (warp_width / columns) * (warp_height / rows)
+        scale = float(np.sqrt(_quad_areas(*_cell_corners(nodes)).min() / cell_area))
+        level = int(np.floor(np.log2(scale))) if scale >= 2.0 else 0
+    interpolation = INTERPOLATION_FLAGS[profile["interpolation"]]
+    logger.debug(f"Building {warp_width}x{warp_height} maps for a {columns + 1}x{rows + 1} mesh")
+
+    if camera is not None:
+        map_x, map_y = _grid_maps(nodes, warp_width, warp_height)
+        map_x, map_y = camera.distort(map_x, map_y, image_size)
+        return ImageProcessor.fit_maps(image_shape, map_x, map_y, level, (width, height), supersample,
+                                       interpolation)
+
+    # Every cell lands inside the quad of its nodes, so the ROI and pyramid level can be applied to the
+    # nodes before the maps exist instead of to the finished full-size maps
+    roi, levels, local_nodes = ImageProcessor.level_points(image_shape, nodes.reshape(-1, 2), level)
+    map_x, map_y = _grid_maps(local_nodes.reshape(nodes.shape), warp_width, warp_height)
+    map1, map2 = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2, nninterpolation=interpolation == cv2.INTER_NEAREST)
+    return WarpMaps(map1, map2, roi, levels, (width, height), supersample, interpolation)
+
+
+def extract_mesh_texture(image: np.ndarray, mesh: np.ndarray, width: int, height: int,
+                         quality: str = DEFAULT_QUALITY_PROFILE,
+                         camera: Optional[CameraProfile] = None) -> np.ndarray:
+    return mesh_maps(image.shape, mesh, width, height, quality, camera).apply(image)
@@ -0,0 +1,171 @@
+# src/core/phash_index.py
+#
+# Perceptual hashes of extracted textures and source quad regions, kept in an
+# on-disk index so near-identical photos can be reported or skipped instead of
+# being extracted again. Lookups use multi-index hashing: the 64-bit hash is
+# split into chunks that are looked up exactly (or within a bit or two) in one
+# table each, so only a handful of candidates are ever compared in full.
+
+import json
+import logging
+import os
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from src.core.image_processor import ImageProcessor
+from src.core.tiled_image import TiledImage
+from src.config.settings import PHASH_INDEX_PATH, PHASH_DUPLICATE_DISTANCE
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+CHUNKS = 4
+CHUNK_BITS = HASH_BITS // CHUNKS
+SAMPLE_SIZE = 32
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    matrix = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix.astype(np.float32)
+
+
+# Only the 8 lowest frequencies of each axis are kept, so only those rows are needed
+_DCT = _dct_matrix(SAMPLE_SIZE)[:8]
+_BIT_WEIGHTS = 1 << np.arange(HASH_BITS - 1, -1, -1, dtype=np.uint64)
+
+
+def _thumbnail(image: np.ndarray) -> np.ndarray:
+    if isinstance(image, TiledImage):
+        image = image.overview(SAMPLE_SIZE * 4)[0]
+    if image.ndim == 3:
+        image = cv2.cvtColor(image[:, :, :3], cv2.COLOR_BGR2GRAY)
+    return cv2.resize(image, (SAMPLE_SIZE, SAMPLE_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def _pack(bits: np.ndarray) -> List[int]:
+    return [int(value) for value in (bits.reshape(len(bits), -1).astype(np.uint64) * _BIT_WEIGHTS).sum(axis=1)]
+
+
+def phash_batch(images: Sequence[np.ndarray]) -> List[int]:
+    """64-bit DCT hashes of several images, with the transform done as one batched matrix product."""
+    if not images:
+        return []
+    thumbnails = np.stack([_thumbnail(image) for image in images])
+    low = _DCT @ thumbnails @ _DCT.T  # (N, 8, 8) lowest frequencies
+    flat = low.reshape(len(images), -1)
+    # The DC term only carries overall brightness, so it is left out of the median
+    median = np.median(flat[:, 1:], axis=1, keepdims=True)
+    return _pack(flat > median)
+
+
+def phash(image: np.ndarray) -> int:
+    return phash_batch([image])[0]
+
+
+def quad_hash(image: np.ndarray, points: Sequence[Tuple[float, float]]) -> int:
+    """Hash of a source quad region, comparable with the hash of the texture extracted from it."""
+    # Quad corners are pixel centres, so a warp straight to the sample size would be stretched by half a
+    # sample relative to an area-reduced texture; warping at 4x first keeps that below an eighth
+    size = SAMPLE_SIZE * 4
+    return phash(ImageProcessor.extract_texture(image, np.array(points, dtype=np.float32), size, size))
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _chunks(value: int) -> List[int]:
+    mask = (1 << CHUNK_BITS) - 1
+    return [(value >> (CHUNK_BITS * i)) & mask for i in range(CHUNKS)]
+
+
+def _neighbours(chunk: int, radius: int) -> Iterable[int]:
+    yield chunk
+    for distance in range(1, radius + 1):
+        for positions in combinations(range(CHUNK_BITS), distance):
+            flipped = chunk
+            for position in positions:
+                flipped ^= 1 << position
+            yield flipped
+
+
+class HashIndex:
+    """Perceptual hashes with metadata, searchable by Hamming distance."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = str(path or PHASH_INDEX_PATH)
+        self.entries: List[Optional[dict]] = []  # Replaced entries leave a None behind
+        self.tables: List[Dict[int, List[int]]] = [{} for _ in range(CHUNKS)]
+        self._ids: Dict[Tuple[str, str], int] = {}
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "HashIndex":
+        index = cls(path)
+        try:
+            with open(index.path, 'r') as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            entries = []
+        for entry in entries:
+            index._insert(dict(entry, hash=int(entry["hash"], 16)))
+        return index
+
+    def save(self) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump([dict(entry, hash=f"{entry['hash']:016x}") for entry in self.entries if entry], f)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _insert(self, entry: dict) -> None:
+        key = (entry["kind"], entry["path"])
+        if key in self._ids:
+            old_id = self._ids[key]
+            for table, chunk in zip(self.tables, _chunks(self.entries[old_id]["hash"])):
+                table[chunk].remove(old_id)
+            self.entries[old_id] = None
+        entry_id = len(self.entries)
+        self.entries.append(entry)
+        self._ids[key] = entry_id
+        for table, chunk in zip(self.tables, _chunks(entry["hash"])):
+            table.setdefault(chunk, []).append(entry_id)
+
+    def add(self, value: int, path: str, kind: str = "texture", **metadata) -> dict:
+        """Index a hash; a later add with the same kind and path replaces the earlier entry."""
+        entry = {"hash": value, "path": path, "kind": kind, **metadata}
+        self._insert(entry)
+        return entry
+
+    def query(self, value: int, max_distance: int = PHASH_DUPLICATE_DISTANCE,
+              kind: Optional[str] = None) -> List[Tuple[int, dict]]:
+        """Entries within max_distance bits of value, nearest first."""
+        # If two hashes differ in at most max_distance bits, one of the chunks differs in at most
+        # max_distance // CHUNKS bits, so probing that neighbourhood of every chunk finds all matches
+        radius = max_distance // CHUNKS
+        candidates = set()
+        for table, chunk in zip(self.tables, _chunks(value)):
+            for probe in _neighbours(chunk, radius):
+                candidates.update(table.get(probe, ()))
+
+        matches = []
+        for entry_id in candidates:
+            entry = self.entries[entry_id]
+            distance = hamming(value, entry["hash"])
+            if distance <= max_distance and (kind is None or entry["kind"] == kind):
+                matches.append((distance, entry))
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    def find_duplicate(self, value: int, max_distance: int = PHASH_DUPLICATE_DISTANCE, kind: Optional[str] = None,
+                       exclude_path: Optional[str] = None) -> Optional[dict]:
+        for _, entry in self.query(value, max_distance, kind):
+            if entry["path"] != exclude_path:
+                return entry
+        return None
@@ -0,0 +1,194 @@
+# src/core/postprocess.py
+#
+# Post-processing applied to the warp output before it is shown or saved: white
+# balance, flat-field (vignette/illumination) removal, sharpening and alpha
+# masking. A chain converts the texture once into a float32 working buffer, runs
+# every stage in place on it and writes the result back into the texture, so no
+# stage allocates a full-size image of its own. Working buffers are kept per
+# thread and reused while the output size stays the same, as it does for the
+# stream of previews while a selection is dragged.
+#
+# Sizes are given at full resolution; apply(scale=...) runs the same chain on a
+# preview so it looks like the saved texture.
+
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from src.config.performance import performance
+from src.config.settings import POSTPROCESS_PRESETS
+from src.utils.profiler import traced
+
+logger = logging.getLogger(__name__)
+
+
+class StageContext:
+    """Working buffers of one apply call: color is (H, W, C) float32, alpha (H, W) float32 or None."""
+
+    def __init__(self, chain: "PostProcessChain", color: np.ndarray, alpha: Optional[np.ndarray], scale: float,
+                 peak: float):
+        self.chain = chain
+        self.color = color
+        self.alpha = alpha
+        self.scale = scale
+        self.peak = peak
+
+    def scratch(self, name: str, shape: Tuple[int, ...]) -> np.ndarray:
+        return self.chain._buffer(name, shape)
+
+
+def white_balance(ctx: StageContext, method: str = "gray_world", strength: float = 1.0) -> None:
+    """Equalise the channel means (gray_world) or their 99th percentiles (white_patch)."""
+    if ctx.color.shape[2] < 3:
+        return
+    if method == "gray_world":
+        stats = np.array(cv2.mean(ctx.color)[:3])
+    elif method == "white_patch":
+        stats = np.percentile(ctx.color[::4, ::4].reshape(-1, 3), 99, axis=0)
+    else:
+        raise ValueError(f"Unknown white balance method: {method}")
+    gains = 1 + strength * (stats.mean() / np.maximum(stats, 1e-6) - 1)
+    ctx.color *= gains.astype(np.float32)
+
+
+def flat_field(ctx: StageContext, strength: float = 1.0, degree: int = 2) -> None:
+    """Divide out smooth illumination falloff, modelled as a 2D polynomial fitted to a thumbnail."""
+    h, w = ctx.color.shape[:2]
+    factor = 64 / max(h, w)
+    thumbnail = cv2.resize(ctx.color, (max(round(w * factor), 1), max(round(h * factor), 1)),
+                           interpolation=cv2.INTER_AREA)
+    luminance = thumbnail.mean(axis=2) if thumbnail.ndim == 3 else thumbnail
+    y, x = np.mgrid[-1:1:luminance.shape[0] * 1j, -1:1:luminance.shape[1] * 1j]
+    terms = np.stack([x ** i * y ** j for i in range(degree + 1) for j in range(degree + 1 - i)], axis=-1)
+    coefficients = np.linalg.lstsq(terms.reshape(-1, terms.shape[-1]), luminance.ravel(), rcond=None)[0]
+    illumination = terms @ coefficients
+    gain_small = 1 + strength * (float(luminance.mean()) / np.maximum(illumination, 1e-3) - 1)
+    gain = ctx.scratch("gain", (h, w))
+    cv2.resize(gain_small.astype(np.float32), (w, h), dst=gain, interpolation=cv2.INTER_LINEAR)
+    ctx.color *= gain[:, :, None]
+
+
+def sharpen(ctx: StageContext, amount: float = 0.5, radius: float = 1.0) -> None:
+    """Unsharp mask with a Gaussian of radius full-resolution pixels."""
+    blurred = ctx.scratch("blur", ctx.color.shape)
+    cv2.GaussianBlur(ctx.color, (0, 0), max(radius * ctx.scale, 0.1), dst=blurred)
+    cv2.addWeighted(ctx.color, 1 + amount, blurred, -amount, 0, dst=ctx.color)
+
+
+def alpha_mask(ctx: StageContext, key: Sequence[float] = (255, 255, 255), tolerance: float = 0.1,
+               feather: float = 0.05) -> None:
+    """Make pixels within tolerance of the key colour (BGR, 0-255) transparent, fading out over feather.
+
+    Distances are measured in colour space scaled to 0-1 per channel.
+    """
+    if ctx.alpha is None:
+        raise ValueError("alpha_mask needs an alpha buffer")
+    channels = ctx.color.shape[2]
+    key = np.asarray(key, dtype=np.float32)[:channels] * (ctx.peak / 255)
+    difference = ctx.scratch("difference", ctx.color.shape)
+    np.subtract(ctx.color, key, out=difference)
+    np.multiply(difference, difference, out=difference)
+    distance = ctx.scratch("distance", ctx.alpha.shape)
+    np.sum(difference, axis=2, out=distance)
+    np.sqrt(distance, out=distance)
+    # (distance / peak - tolerance) / feather, clipped to 0..1, is the opacity kept
+    distance *= 1 / (ctx.peak * max(feather, 1e-6))
+    distance -= tolerance / max(feather, 1e-6)
+    np.clip(distance, 0, 1, out=distance)
+    ctx.alpha *= distance
+
+
+STAGES: Dict[str, Callable[..., None]] = {
+    "white_balance": white_balance,
+    "flat_field": flat_field,
+    "sharpen": sharpen,
+    "alpha_mask": alpha_mask,
+}
+
+
+def _peak(dtype: np.dtype) -> float:
+    return float(np.iinfo(dtype).max) if np.issubdtype(dtype, np.integer) else 1.0
+
+
+class PostProcessChain:
+    """An ordered list of stages, each a dict {"stage": name, **parameters}."""
+
+    def __init__(self, stages: Sequence[dict] = ()):
+        self.stages = [dict(stage) for stage in stages]
+        for stage in self.stages:
+            if stage.get("stage") not in STAGES:
+                raise ValueError(f"Unknown post-processing stage: {stage.get('stage')}")
+        self._local = threading.local()
+
+    @classmethod
+    def from_preset(cls, name: str) -> Optional["PostProcessChain"]:
+        """The named preset from settings, or None for an empty one."""
+        if name not in POSTPROCESS_PRESETS:
+            raise ValueError(f"Unknown post-processing preset: {name}")
+        return cls(POSTPROCESS_PRESETS[name]) if POSTPROCESS_PRESETS[name] else None
+
+    def to_list(self) -> List[dict]:
+        return [dict(stage) for stage in self.stages]
+
+    @property
+    def adds_alpha(self) -> bool:
+        return any(stage["stage"] == "alpha_mask" for stage in self.stages)
+
+    def _buffer(self, name: str, shape: Tuple[int, ...]) -> np.ndarray:
+        buffers = self._local.__dict__.setdefault("buffers", {})
+        buffer = buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = buffers[name] = np.empty(shape, dtype=np.float32)
+        return buffer
+
+    def release_buffers(self) -> None:
+        """Drop the scratch buffers of every thread; threads in the middle of apply keep theirs until it returns."""
+        self._local = threading.local()
+
+    @traced
+    def apply(self, image: np.ndarray, scale: float = 1.0) -> np.ndarray:
+        """Run the chain on image in place and return it (a new BGRA array if a stage adds alpha to BGR)."""
+        if not self.stages:
+            return image
+        h, w = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        color_channels = 3 if channels >= 3 else 1
+        has_alpha = channels in (2, 4)
+        pixels = image.reshape(h, w, channels)
+        peak = _peak(image.dtype)
+
+        color = self._buffer("color", (h, w, color_channels))
+        np.copyto(color, pixels[:, :, :color_channels])
+        alpha = None
+        if has_alpha or self.adds_alpha:
+            alpha = self._buffer("alpha", (h, w))
+            if has_alpha:
+                np.copyto(alpha, pixels[:, :, -1])
+            else:
+                alpha.fill(peak)
+
+        ctx = StageContext(self, color, alpha, scale, peak)
+        for stage in self.stages:
+            parameters = {key: value for key, value in stage.items() if key != "stage"}
+            STAGES[stage["stage"]](ctx, **parameters)
+
+        if alpha is not None and not has_alpha:
+            output = np.empty((h, w, color_channels + 1), dtype=image.dtype)
+        else:
+            output = pixels
+        for source, target in ((color, output[:, :, :color_channels]),
+                               (alpha, output[:, :, -1] if alpha is not None else None)):
+            if source is None:
+                continue
+            np.clip(source, 0, peak, out=source)
+            if peak > 1:
+                np.rint(source, out=source)
+            np.copyto(target, source.reshape(target.shape), casting="unsafe")
+
+        if h * w > performance().postprocess_cache_pixels:
+            # Keep buffers for preview-sized outputs only; full-size saves would pin hundreds of MB per thread
+            self._local.buffers = {}
+        return output if output is not pixels else image
@@ -0,0 +1,384 @@
+# src/core/project.py
+#
+# Project files persist every selection (source content hash, quad, aspect mode,
+# resolution, quality and orientation) so a whole texture library can be
+# re-exported without redoing selections. Re-export is make-style: an output is
+# only rendered again when the hash of its inputs and settings changed.
+
+import hashlib
+import json
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.camera import CameraProfile, load_camera_profiles
+from src.core.engine import ExtractionSession, load_image, save_texture
+from src.core.postprocess import PostProcessChain
+from src.core.scheduler import JobEstimate, dispatch, estimate_quad, simulate
+from src.core.texture_pack import TexturePack, TexturePackError
+from src.core.tiled_image import ImageInfo, cache_path, probe_image
+from src.config.performance import performance
+from src.config.settings import DEFAULT_QUALITY_PROFILE, DEFAULT_RESOLUTION, TILED_IMAGE_MIN_PIXELS, \
+    TEXTURE_PACK_COMPACT_RATIO
+from src.utils.exceptions import ImageLoadError, TextureExtractionError
+
+logger = logging.getLogger(__name__)
+
+PROJECT_VERSION = 1
+# Bump when the pixels produced for identical settings change, to invalidate every output
+RENDER_VERSION = 1
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class ExportTask:
+    source: str
+    output: str
+    key: str
+    quad: dict = field(repr=False)
+    source_hash: Optional[str] = None
+    camera: Optional[CameraProfile] = None  # Resolved once per export from the quad's camera name
+    error: Optional[str] = None  # Why the task cannot be rendered, e.g. a camera profile that no longer exists
+
+
+@dataclass
+class ReexportSummary:
+    rendered: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+
+    def __str__(self) -> str:
+        return f"{len(self.rendered)} rendered, {len(self.skipped)} up to date, {len(self.failed)} failed"
+
+
+def configure_session(session: ExtractionSession, quad: dict, camera: Optional[CameraProfile] = None) -> None:
+    session.set_resolution(quad["resolution"])
+    session.quality_profile = quad["quality"]
+    session.flip, session.flop, session.rotate = quad["flip"], quad["flop"], quad["rotate"]
+    session.aspect_mode = quad["aspect_mode"]
+    session.aspect_ratio = quad["aspect_ratio"]
+    session.camera = camera
+    session.postprocess = PostProcessChain(quad["postprocess"]) if quad.get("postprocess") else None
+    session.set_mesh(None)
+    session.set_points(quad["points"])
+    session.set_mesh(quad.get("mesh"))
+
+
+def render_source(source: str, tasks: List[ExportTask]) -> List[Tuple[str, str, Optional[str]]]:
+    """Render all stale outputs of one source image. Returns (output, key, error) per task."""
+    try:
+        image = load_image(source)
+    except Exception as e:
+        return [(task.output, task.key, str(e)) for task in tasks]
+
+    session = ExtractionSession(image)
+    session.preview_size = None
+    results = []
+    for task in tasks:
+        try:
+            if task.error:
+                raise TextureExtractionError(task.error)
+            configure_session(session, task.quad, task.camera)
+            save_texture(task.output, session.extract().oriented())
+            results.append((task.output, task.key, None))
+        except Exception as e:
+            results.append((task.output, task.key, str(e)))
+    return results
+
+
+def estimate_source(source: str, tasks: List[ExportTask]) -> JobEstimate:
+    """Cost and peak memory of render_source(source, tasks), from the image header and the quads alone."""
+    info = probe_image(source)
+    if info is None:
+        # Unknown to Pillow: assume about one byte of file per pixel
+        side = max(int(math.sqrt(os.path.getsize(source))), 1)
+        info = ImageInfo(side, side, 3, 8)
+    if info.pixels >= TILED_IMAGE_MIN_PIXELS:
+        # Converted to a tile pyramid once, then only the tiles under each quad are read
+        cost, memory = (0 if os.path.isdir(cache_path(source)) else info.pixels), 0
+    else:
+        cost, memory = info.pixels, info.nbytes
+    session = ExtractionSession()
+    quad_memory = 0
+    for task in tasks:
+        configure_session(session, task.quad, task.camera)
+        quad_cost, peak = estimate_quad(info, session)
+        cost += quad_cost
+        quad_memory = max(quad_memory, peak)  # Quads of one source are rendered one after another
+    return JobEstimate(os.path.basename(source), cost, memory + quad_memory, (source, tasks))
+
+
+class Project:
+    def __init__(self, path: str, data: Optional[dict] = None):
+        self.path = Path(path).resolve()
+        self.data = data or {
+            "version": PROJECT_VERSION,
+            "output_dir": ".",
+            "defaults": {"resolution": DEFAULT_RESOLUTION, "quality": DEFAULT_QUALITY_PROFILE},
+            "sources": [],
+            "build": {},
+        }
+
+    @classmethod
+    def load(cls, path: str) -> "Project":
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if data.get("version", 0) > PROJECT_VERSION:
+            raise ValueError(f"Project version {data['version']} is newer than supported ({PROJECT_VERSION})")
+        data.setdefault("build", {})
+        return cls(path, data)
+
+    @classmethod
+    def load_or_create(cls, path: str) -> "Project":
+        return cls.load(path) if os.path.exists(path) else cls(path)
+
+    def save(self) -> None:
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def root(self) -> Path:
+        return self.path.parent
+
+    def resolve(self, relative: str) -> str:
+        return str((self.root / relative).resolve())
+
+    def relative(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.root)
+
+    def source_entry(self, source_path: str) -> dict:
+        relative = self.relative(source_path)
+        for entry in self.data["sources"]:
+            if entry["path"] == relative:
+                return entry
+        entry = {"path": relative, "hash": None, "size": None, "mtime_ns": None, "quads": []}
+        self.data["sources"].append(entry)
+        return entry
+
+    def refresh_hash(self, entry: dict) -> str:
+        """Re-hash a source only when its size or modification time changed."""
+        stat = os.stat(self.resolve(entry["path"]))
+        if entry.get("hash") is None or entry.get("size") != stat.st_size or entry.get("mtime_ns") != stat.st_mtime_ns:
+            entry["hash"] = file_hash(self.resolve(entry["path"]))
+            entry["size"], entry["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+        return entry["hash"]
+
+    def add_selection(self, source_path: str, session: ExtractionSession, output: Optional[str] = None) -> dict:
+        entry = self.source_entry(source_path)
+        self.refresh_hash(entry)
+        if output is None:
+            output = self._default_output(Path(source_path).stem)
+        quad = {
+            "points": [list(point) for point in session.points],
+            "aspect_mode": session.aspect_mode,
+            "aspect_ratio": session.aspect_ratio,
+            "resolution": self._resolution_name(session),
+            "quality": session.quality_profile,
+            "flip": session.flip,
+            "flop": session.flop,
+            "rotate": session.rotate,
+            "camera": session.camera.name if session.camera else None,
+            "mesh": None if session.mesh is None else session.mesh.tolist(),
+            "postprocess": session.postprocess.to_list() if session.postprocess else None,
+            "output": output if not os.path.isabs(output) else self.relative(output),
+        }
+        entry["quads"].append(quad)
+        return quad
+
+    def _default_output(self, stem: str) -> str:
+        """First free stem_N.png in the output folder. Numbered across the whole project, so sources with the same
+        name in different folders do not overwrite each other's outputs."""
+        taken = {os.path.normcase(os.path.normpath(quad["output"]))
+                 for entry in self.data["sources"] for quad in entry["quads"]}
+        n = 1
+        while True:
+            output = os.path.join(self.data["output_dir"], f"{stem}_{n}.png")
+            if os.path.normcase(os.path.normpath(output)) not in taken:
+                return output
+            n += 1
+
+    @staticmethod
+    def _resolution_name(session: ExtractionSession) -> str:
+        if session.output_resolution:
+            return "{}x{}".format(*session.output_resolution)
+        return session.sizing_policy
+
+    def resolved_quad(self, quad: dict, overrides: Optional[dict] = None) -> dict:
+        resolved = dict(self.data["defaults"])
+        resolved.update({key: value for key, value in quad.items() if value is not None})
+        resolved.update(overrides or {})
+        return resolved
+
+    @staticmethod
+    def task_key(source_hash: str, quad: dict, camera: Optional[CameraProfile] = None) -> str:
+        settings = {key: value for key, value in quad.items() if key != "output"}
+        if camera is not None:
+            # Recalibrating a camera changes the pixels, so its coefficients are part of the key
+            settings["camera"] = camera.to_dict()
+        payload = json.dumps({"render": RENDER_VERSION, "source": source_hash, "settings": settings}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def tasks(self, overrides: Optional[dict] = None) -> List[ExportTask]:
+        tasks = []
+        cameras: Optional[Dict[str, CameraProfile]] = None
+        for entry in self.data["sources"]:
+            source_hash = self.refresh_hash(entry)
+            for quad in entry["quads"]:
+                resolved = self.resolved_quad(quad, overrides)
+                camera, error = None, None
+                if resolved.get("camera"):
+                    if cameras is None:
+                        cameras = load_camera_profiles()
+                    camera = cameras.get(resolved["camera"])
+                    if camera is None:
+                        error = f"Unknown camera profile: {resolved['camera']}"
+                tasks.append(ExportTask(self.resolve(entry["path"]), self.resolve(resolved["output"]),
+                                        self.task_key(source_hash, resolved, camera), resolved, source_hash, camera,
+                                        error))
+        return tasks
+
+    def render(self, overrides: Optional[dict] = None) -> Iterator[Tuple[ExportTask, np.ndarray]]:
+        """Render every quad in memory (oriented BGR buffers), loading each source only once."""
+        by_source: Dict[str, List[ExportTask]] = {}
+        for task in self.tasks(overrides):
+            by_source.setdefault(task.source, []).append(task)
+        for source, tasks in by_source.items():
+            session = ExtractionSession(load_image(source))
+            session.preview_size = None
+            for task in tasks:
+                if task.error:
+                    logger.error(f"Skipped {task.output}: {task.error}")
+                    continue
+                configure_session(session, task.quad, task.camera)
+                yield task, session.extract().oriented()
+
+    def is_stale(self, task: ExportTask) -> bool:
+        return self.data["build"].get(self.relative(task.output)) != task.key or not os.path.exists(task.output)
+
+    def stale_tasks(self, force: bool = False, overrides: Optional[dict] = None,
+                    summary: Optional[ReexportSummary] = None) -> Dict[str, List[ExportTask]]:
+        """Tasks that need rendering, grouped per source; up-to-date outputs are added to summary.skipped."""
+        by_source: Dict[str, List[ExportTask]] = {}
+        for task in self.tasks(overrides):
+            if task.error:
+                logger.error(f"Cannot render {task.output}: {task.error}")
+                if summary is not None:
+                    summary.failed[task.output] = task.error
+            elif force or self.is_stale(task):
+                by_source.setdefault(task.source, []).append(task)
+            elif summary is not None:
+                summary.skipped.append(task.output)
+        return by_source
+
+    def record_results(self, results: List[Tuple[str, str, Optional[str]]], summary: ReexportSummary) -> None:
+        """Merge (output, key, error) results of render_source into the build map."""
+        for output, key, error in results:
+            if error is None:
+                self.data["build"][self.relative(output)] = key
+                summary.rendered.append(output)
+            else:
+                self.data["build"].pop(self.relative(output), None)
+                summary.failed[output] = error
+                logger.error(f"Failed to render {output}: {error}")
+
+    def reexport(self, workers: Optional[int] = None, force: bool = False, overrides: Optional[dict] = None,
+                 dry_run: bool = False) -> ReexportSummary:
+        summary = ReexportSummary()
+        by_source = self.stale_tasks(force, overrides, summary)
+
+        if dry_run:
+            summary.rendered = [task.output for tasks in by_source.values() for task in tasks]
+            return summary
+
+        workers = workers or performance().process_workers
+        if workers == 1 or len(by_source) <= 1:
+            results = [render_source(source, tasks) for source, tasks in by_source.items()]
+        else:
+            jobs = [estimate_source(source, tasks) for source, tasks in by_source.items()]
+            budget = performance().batch_memory_mb * 1024 * 1024
+            largest_first, in_order = simulate(jobs, workers, budget), simulate(jobs, workers, budget, False)
+            logger.info(f"Rendering {len(jobs)} sources largest first on {workers} processes; estimated makespan "
+                        f"{largest_first / max(in_order, 1):.0%} of submission order")
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = [future.result() for _, future in dispatch(executor, render_source, jobs, workers, budget)]
+
+        for source_results in results:
+            self.record_results(source_results, summary)
+
+        self.save()
+        logger.info(f"Re-export finished: {summary}")
+        return summary
+
+    def pack_name(self, task: ExportTask) -> str:
+        """Name of a task's texture in a pack: its output path relative to the project, with forward slashes.
+        Outputs outside the project folder have no such name and are rejected."""
+        try:
+            name = Path(self.relative(task.output)).as_posix()
+        except ValueError:  # On another drive
+            name = None
+        if name is None or name == ".." or name.startswith("../"):
+            raise TexturePackError(f"{task.output} is outside the project folder and cannot be packed")
+        return name
+
+    def export_pack(self, path: str, format: str = "raw", force: bool = False,
+                    overrides: Optional[dict] = None) -> ReexportSummary:
+        """Render every quad into the texture pack at path instead of separate files. Like reexport, textures
+        whose key (source hash and settings) and format are unchanged in the pack are skipped."""
+        summary = ReexportSummary()
+        with TexturePack(path, "a") as pack:
+            by_source: Dict[str, List[Tuple[ExportTask, str]]] = {}
+            for task in self.tasks(overrides):
+                try:
+                    if task.error:
+                        raise TexturePackError(f"Cannot render {task.output}: {task.error}")
+                    name = self.pack_name(task)
+                except TexturePackError as e:
+                    summary.failed[task.output] = str(e)
+                    logger.error(str(e))
+                    continue
+                entry = pack.entry(name) if name in pack else None
+                if force or entry is None or entry.key != task.key or entry.format != format:
+                    by_source.setdefault(task.source, []).append((task, name))
+                else:
+                    summary.skipped.append(name)
+
+            for source, tasks in by_source.items():
+                try:
+                    session = ExtractionSession(load_image(source))
+                    session.preview_size = None
+                except Exception as e:
+                    session, error = None, str(e)
+                for task, name in tasks:
+                    try:
+                        if session is None:
+                            raise ImageLoadError(error)
+                        configure_session(session, task.quad, task.camera)
+                        pack.append(name, session.extract().oriented(), format, task.source_hash, task.key,
+                                    task.quad["points"])
+                        summary.rendered.append(name)
+                    except Exception as e:
+                        summary.failed[name] = str(e)
+                        logger.error(f"Failed to render {name}: {e}")
+            pack.flush()
+            if pack.dead_bytes > TEXTURE_PACK_COMPACT_RATIO * pack.size:
+                try:
+                    pack.compact()
+                except TexturePackError as e:
+                    logger.warning(f"{e}; the pack was not compacted")
+        logger.info(f"Pack export to {path} finished: {summary}")
+        return summary
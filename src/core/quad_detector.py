@@ -0,0 +1,188 @@
+# src/core/quad_detector.py
+#
+# Finds rectangular samples on a contrasting backdrop so selections can be made
+# without clicking. Candidates come from contours of an Otsu mask and of a Canny
+# edge map on a small pyramid level, are ranked by how rectangular they are and
+# how strong their boundary edges are, and only the winners are refined to
+# sub-pixel corners at full resolution.
+
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.core.tiled_image import TiledImage
+from src.config.settings import AUTO_DETECT_WORKING_SIZE, AUTO_DETECT_MIN_AREA, AUTO_DETECT_MAX_QUADS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DetectedQuad:
+    points: List[Tuple[float, float]]  # Full-resolution corners, clockwise from top-left
+    confidence: float
+    area_fraction: float
+
+
+def order_corners(points: np.ndarray) -> np.ndarray:
+    """Sort four corners clockwise starting from the top-left one."""
+    center = points.mean(axis=0)
+    angles = np.arctan2(points[:, 1] - center[1], points[:, 0] - center[0])
+    points = points[np.argsort(angles)]
+    start = np.argmin(points.sum(axis=1))
+    return np.roll(points, -start, axis=0)
+
+
+def _working_level(gray: np.ndarray, working_size: int) -> Tuple[np.ndarray, float]:
+    scale = 1.0
+    while max(gray.shape) > working_size * 2:
+        gray = cv2.pyrDown(gray)
+        scale *= 2
+    if max(gray.shape) > working_size:
+        factor = max(gray.shape) / working_size
+        gray = cv2.resize(gray, (round(gray.shape[1] / factor), round(gray.shape[0] / factor)),
+                          interpolation=cv2.INTER_AREA)
+        scale *= factor
+    return gray, scale
+
+
+def _candidate_masks(gray: np.ndarray) -> List[np.ndarray]:
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    _, otsu = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    median = float(np.median(blurred))
+    edges = cv2.Canny(blurred, 0.66 * median, 1.33 * median + 20)
+    edges = cv2.dilate(edges, np.ones((3, 3), np.uint8))
+    return [otsu, cv2.bitwise_not(otsu), edges]
+
+
+def _corner_score(quad: np.ndarray) -> float:
+    """1 for right angles, falling to 0 as the most skewed corner approaches 45 degrees."""
+    worst = 0.0
+    for i in range(4):
+        a, b = quad[i - 1] - quad[i], quad[(i + 1) % 4] - quad[i]
+        cosine = abs(np.dot(a, b)) / max(np.linalg.norm(a) * np.linalg.norm(b), 1e-9)
+        worst = max(worst, cosine)
+    return max(0.0, 1.0 - worst / np.cos(np.pi / 4))
+
+
+def _edge_score(gradient: np.ndarray, quad: np.ndarray, samples: int = 32) -> float:
+    """Mean gradient magnitude along the quad outline relative to the strongest gradients in the image."""
+    t = np.linspace(0, 1, samples, endpoint=False)[:, None]
+    outline = np.concatenate([quad[i] + t * (quad[(i + 1) % 4] - quad[i]) for i in range(4)])
+    x = np.clip(np.rint(outline[:, 0]).astype(int), 0, gradient.shape[1] - 1)
+    y = np.clip(np.rint(outline[:, 1]).astype(int), 0, gradient.shape[0] - 1)
+    reference = max(float(np.percentile(gradient, 99)), 1e-6)
+    return min(1.0, float(gradient[y, x].mean()) / reference)
+
+
+def _overlap(a: np.ndarray, b: np.ndarray) -> float:
+    intersection, _ = cv2.intersectConvexConvex(a.astype(np.float32), b.astype(np.float32))
+    return intersection / max(min(cv2.contourArea(a), cv2.contourArea(b)), 1e-9)
+
+
+def _refine_corners(gray: np.ndarray, corners: np.ndarray, scale: float, samples: int = 48) -> np.ndarray:
+    """Re-fit each side to the strongest full-resolution edge near it and intersect neighbouring sides."""
+    reach = max(2.0, 2 * scale)
+    offsets = np.linspace(-reach, reach, int(2 * reach) * 2 + 1, dtype=np.float32)
+    lines = []
+    for i in range(4):
+        start, end = corners[i], corners[(i + 1) % 4]
+        direction = (end - start) / max(np.linalg.norm(end - start), 1e-9)
+        normal = np.array([-direction[1], direction[0]], dtype=np.float32)
+        # Stay clear of the corners, where the neighbouring side's edge competes
+        t = np.linspace(0.1, 0.9, samples, dtype=np.float32)[:, None]
+        along = start + t * (end - start)
+        grid = along[:, None, :] + offsets[None, :, None] * normal
+        profile = cv2.remap(gray, grid[..., 0], grid[..., 1], cv2.INTER_LINEAR,
+                            borderMode=cv2.BORDER_REPLICATE).astype(np.float32)
+        # Best two-level step fit per profile: unlike the steepest gradient, texture detail just inside
+        # the sample does not split the profile into two homogeneous halves
+        n = profile.shape[1]
+        k = np.arange(1, n, dtype=np.float32)
+        cumulative = np.cumsum(profile, axis=1)[:, :-1]
+        contrast = np.abs(cumulative / k - (profile.sum(axis=1, keepdims=True) - cumulative) / (n - k))
+        score = contrast * np.sqrt(k * (n - k) / n)
+        split = score.argmax(axis=1)
+        strength = contrast[np.arange(samples), split]
+        strong = strength > 0.5 * np.median(strength)
+        if strong.sum() < samples // 4:
+            return corners
+        found = along + ((offsets[split] + offsets[split + 1]) / 2)[:, None] * normal
+        vx, vy, x0, y0 = cv2.fitLine(found[strong], cv2.DIST_HUBER, 0, 0.01, 0.01).ravel()
+        lines.append((np.array([x0, y0]), np.array([vx, vy])))
+
+    refined = []
+    for i in range(4):
+        (p1, d1), (p2, d2) = lines[i - 1], lines[i]
+        denominator = d1[0] * d2[1] - d1[1] * d2[0]
+        if abs(denominator) < 1e-6:
+            return corners
+        u = ((p2[0] - p1[0]) * d2[1] - (p2[1] - p1[1]) * d2[0]) / denominator
+        refined.append(p1 + u * d1)
+    refined = np.array(refined, dtype=np.float32)
+    # Keep the coarse corners when the fit wandered off to some other feature
+    if np.linalg.norm(refined - corners, axis=1).max() > 3 * scale:
+        return corners
+    return refined
+
+
+def detect_quads(image: np.ndarray, max_quads: int = AUTO_DETECT_MAX_QUADS,
+                 working_size: int = AUTO_DETECT_WORKING_SIZE, min_area: float = AUTO_DETECT_MIN_AREA,
+                 refine: bool = True) -> List[DetectedQuad]:
+    """Return up to max_quads candidate quads in image, best first."""
+    if isinstance(image, TiledImage):
+        # Detection runs on a small level anyway, so take one from the stored pyramid and scale the corners up
+        overview, scale = image.overview(working_size * 2)
+        quads = detect_quads(overview, max_quads, working_size, min_area, refine)
+        for quad in quads:
+            quad.points = [(x / scale, y / scale) for x, y in quad.points]
+        return quads
+    gray = image if image.ndim == 2 else cv2.cvtColor(image[:, :, :3], cv2.COLOR_BGR2GRAY)
+    if gray.dtype != np.uint8:
+        gray = cv2.normalize(gray, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    small, scale = _working_level(gray, working_size)
+    image_area = small.shape[0] * small.shape[1]
+    gradient = cv2.magnitude(cv2.Sobel(small, cv2.CV_32F, 1, 0), cv2.Sobel(small, cv2.CV_32F, 0, 1))
+
+    candidates = []
+    for mask in _candidate_masks(small):
+        contours, _ = cv2.findContours(mask, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            if area < min_area * image_area or area > 0.98 * image_area:
+                continue
+            hull = cv2.convexHull(contour)
+            quad = cv2.approxPolyDP(hull, 0.02 * cv2.arcLength(hull, True), True)
+            if len(quad) != 4:
+                continue
+            quad = order_corners(quad.reshape(4, 2).astype(np.float32))
+            quad_area = cv2.contourArea(quad)
+            fill = min(area, quad_area) / max(area, quad_area, 1e-9)
+            confidence = fill * _corner_score(quad) * (0.5 + 0.5 * _edge_score(gradient, quad))
+            candidates.append((confidence, quad, quad_area / image_area))
+
+    candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+    selected: List[Tuple[float, np.ndarray, float]] = []
+    for candidate in candidates:
+        if all(_overlap(candidate[1], kept[1]) < 0.8 for kept in selected):
+            selected.append(candidate)
+            if len(selected) == max_quads:
+                break
+
+    results = []
+    for confidence, quad, area_fraction in selected:
+        corners = quad * scale
+        if refine and scale > 1:
+            corners = _refine_corners(gray, corners, scale)
+        results.append(DetectedQuad([(float(x), float(y)) for x, y in corners], float(confidence), area_fraction))
+    logger.debug(f"Detected {len(results)} quad(s) from {len(candidates)} candidates at 1/{scale:.1f} scale")
+    return results
+
+
+def best_quad(image: np.ndarray, min_confidence: float) -> Optional[DetectedQuad]:
+    quads = detect_quads(image, max_quads=1)
+    if quads and quads[0].confidence >= min_confidence:
+        return quads[0]
+    return None
@@ -0,0 +1,121 @@
+# src/core/scheduler.py
+#
+# Cost-aware ordering of batch jobs. A batch mixing 2 MP and 150 MP sources is
+# slow when run in submission order: the last huge source ends up rendering
+# alone while every other core idles, and several huge sources at once can run
+# the machine out of memory. Each job's cost and peak memory are estimated from
+# the image header and the output sizes of its quads, without decoding
+# anything. Jobs are then started largest first (LPT), as long as the estimated
+# memory of everything running stays within a budget.
+
+import logging
+import math
+from concurrent.futures import Executor, FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from src.core.engine import ExtractionSession
+from src.core.tiled_image import ImageInfo
+from src.config.settings import QUALITY_PROFILES
+
+logger = logging.getLogger(__name__)
+
+# Relative cost per output pixel of each interpolation, against one pixel of decoding
+INTERPOLATION_COST = {"nearest": 1.0, "linear": 2.0, "cubic": 4.0, "lanczos": 8.0}
+MAP_BYTES_PER_PIXEL = 8  # Two float32 coordinate maps per warped pixel
+
+
+@dataclass
+class JobEstimate:
+    """A job with its estimated cost (in pixel operations) and peak memory (in bytes)."""
+    name: str
+    cost: float
+    memory: int
+    args: Tuple = field(default=(), repr=False)
+
+
+def estimate_quad(info: ImageInfo, session: ExtractionSession) -> Tuple[float, int]:
+    """(cost, peak memory) of extracting the quad a session is configured with from an image described by info.
+
+    The session needs no image: output sizes come from calculate_output_size as they would for the decoded one.
+    """
+    points = np.array(session.points, dtype=np.float32)
+    width, height = session.calculate_output_size(points, max(info.width, info.height))
+    profile = QUALITY_PROFILES[session.quality_profile]
+    warped = width * height * profile["supersample"] ** 2
+    pixel_bytes = info.channels * info.bit_depth // 8
+
+    # The source ROI is read (and reduced, when the output is much smaller) before remapping
+    x0, y0 = np.maximum(points.min(axis=0), 0)
+    x1, y1 = np.minimum(points.max(axis=0) + 1, (info.width, info.height))
+    roi = max(float(x1 - x0) * float(y1 - y0), 1.0)
+    area = cv2.contourArea(points)
+    scale = math.sqrt(area / warped) if warped else 1.0
+    reduced = profile["mipmaps"] and scale >= 2.0
+
+    cost = warped * INTERPOLATION_COST[profile["interpolation"]] + width * height + (roi if reduced else 0)
+    memory = warped * (pixel_bytes + MAP_BYTES_PER_PIXEL) + 2 * width * height * pixel_bytes
+    if reduced:
+        memory += int(roi * pixel_bytes * 4 / 3)
+    return cost, int(memory)
+
+
+def _next_job(pending: List[JobEstimate], free_memory: float, busy: bool) -> Optional[JobEstimate]:
+    """The first pending job that fits in free_memory. A job larger than the whole budget runs once nothing else
+    does, so it cannot wait forever."""
+    for job in pending:
+        if job.memory <= free_memory:
+            return job
+    return pending[0] if pending and not busy else None
+
+
+def plan(jobs: Sequence[JobEstimate], largest_first: bool = True) -> List[JobEstimate]:
+    return sorted(jobs, key=lambda job: job.cost, reverse=True) if largest_first else list(jobs)
+
+
+def simulate(jobs: Sequence[JobEstimate], workers: int, memory_budget: float, largest_first: bool = True) -> float:
+    """Estimated makespan (in cost units) of running jobs with dispatch's policy."""
+    pending = plan(jobs, largest_first)
+    running: List[Tuple[float, JobEstimate]] = []
+    now = in_use = 0.0
+    while pending or running:
+        while pending and len(running) < workers:
+            job = _next_job(pending, memory_budget - in_use, bool(running))
+            if job is None:
+                break
+            pending.remove(job)
+            running.append((now + job.cost, job))
+            in_use += job.memory
+        running.sort(key=lambda item: item[0])
+        now, job = running.pop(0)
+        in_use -= job.memory
+    return now
+
+
+def dispatch(executor: Executor, fn: Callable, jobs: Sequence[JobEstimate], workers: int,
+             memory_budget: float, largest_first: bool = True) -> Iterator[Tuple[JobEstimate, Future]]:
+    """Submit fn(*job.args) for every job, at most workers at a time and within memory_budget bytes of estimated
+    memory, largest first. Yields (job, future) as jobs finish."""
+    pending = plan(jobs, largest_first)
+    for job in pending:
+        if job.memory > memory_budget:
+            logger.warning(f"{job.name} needs about {job.memory / 2**20:.0f} MB, more than the batch memory budget; "
+                           f"it will run on its own")
+    running = {}
+    in_use = 0
+    while pending or running:
+        while pending and len(running) < workers:
+            job = _next_job(pending, memory_budget - in_use, bool(running))
+            if job is None:
+                break
+            pending.remove(job)
+            running[executor.submit(fn, *job.args)] = job
+            in_use += job.memory
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            job = running.pop(future)
+            in_use -= job.memory
+            yield job, future
@@ -0,0 +1,227 @@
+# src/core/sequence.py
+#
+# Rectifies the same planar region across every frame of a video or numbered
+# image sequence. Frames are read, warped and written one at a time, so memory
+# stays constant regardless of the sequence length.
+
+import glob
+import logging
+import os
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.core.camera import CameraProfile, camera_maps
+from src.core.engine import ExtractionSession
+from src.core.image_processor import ImageProcessor
+from src.core.postprocess import PostProcessChain
+from src.config.settings import DEFAULT_QUALITY_PROFILE, DEFAULT_RESOLUTION, SEQUENCE_DEFAULT_FPS
+from src.utils.exceptions import ImageLoadError, TextureSaveError
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v", ".webm")
+
+
+def list_sequence_files(source: str) -> Optional[List[str]]:
+    """Files of a directory or glob pattern, in name order. None for videos and printf patterns."""
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, name) for name in os.listdir(source)
+                      if os.path.splitext(name)[1].lower() in (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp"))
+    if glob.has_magic(source):
+        return sorted(glob.glob(source))
+    return None
+
+
+def read_frames(source: str) -> Iterator[np.ndarray]:
+    """Yield frames from a video file, a printf pattern (frame_%04d.png), a glob pattern or a directory."""
+    files = list_sequence_files(source)
+    if files is not None:
+        for file_path in files:
+            frame = cv2.imread(file_path, cv2.IMREAD_UNCHANGED)
+            if frame is None:
+                raise ImageLoadError(f"Failed to load frame: {file_path}")
+            yield frame
+        return
+
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ImageLoadError(f"Failed to open sequence: {source}")
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield frame
+    finally:
+        capture.release()
+
+
+def source_fps(source: str) -> float:
+    if list_sequence_files(source) is not None:
+        return SEQUENCE_DEFAULT_FPS
+    capture = cv2.VideoCapture(source)
+    fps = capture.get(cv2.CAP_PROP_FPS) if capture.isOpened() else 0
+    capture.release()
+    return fps or SEQUENCE_DEFAULT_FPS
+
+
+class SequenceWriter:
+    """Writes frames to a video file, or to numbered images for any other output path."""
+
+    def __init__(self, output: str, fps: float = SEQUENCE_DEFAULT_FPS):
+        self.output = output
+        self.fps = fps
+        self.video: Optional[cv2.VideoWriter] = None
+        self.index = 0
+        if os.path.splitext(output)[1].lower() in VIDEO_EXTENSIONS:
+            self.pattern = None
+        elif "%" in output:
+            self.pattern = output
+        else:
+            self.pattern = os.path.join(output, "frame_%06d.png")
+        directory = os.path.dirname(os.path.abspath(self.pattern or output))
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, frame: np.ndarray) -> None:
+        if self.pattern is not None:
+            if not cv2.imwrite(self.pattern % self.index, frame):
+                raise TextureSaveError(f"Failed to write frame {self.index} to {self.pattern}")
+        else:
+            if self.video is None:
+                height, width = frame.shape[:2]
+                self.video = cv2.VideoWriter(self.output, cv2.VideoWriter_fourcc(*"mp4v"), self.fps, (width, height))
+                if not self.video.isOpened():
+                    raise TextureSaveError(f"Failed to open video writer: {self.output}")
+            self.video.write(self.video_frame(frame))
+        self.index += 1
+
+    @staticmethod
+    def video_frame(frame: np.ndarray) -> np.ndarray:
+        """frame as the 8-bit BGR that VideoWriter takes: alpha dropped, grayscale expanded, deeper formats scaled."""
+        if frame.dtype != np.uint8:
+            frame = cv2.convertScaleAbs(frame, alpha=255.0 / np.iinfo(frame.dtype).max) \
+                if np.issubdtype(frame.dtype, np.integer) else cv2.convertScaleAbs(frame, alpha=255.0)
+        if frame.ndim == 2 or frame.shape[2] == 1:
+            return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        if frame.shape[2] == 4:
+            return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+        return frame
+
+    def close(self) -> None:
+        if self.video is not None:
+            self.video.release()
+            self.video = None
+
+    def __enter__(self) -> "SequenceWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class QuadTracker:
+    """Follows a quad through a moving-camera sequence with pyramidal Lucas-Kanade optical flow.
+
+    Features inside the quad are tracked between consecutive frames and a
+    frame-to-frame homography (RANSAC) moves the corners. When too few features
+    survive, the corners themselves are tracked instead.
+    """
+
+    def __init__(self, points: np.ndarray, max_features: int = 200, min_features: int = 8,
+                 window: Tuple[int, int] = (21, 21), pyramid_levels: int = 3):
+        self.points = np.asarray(points, dtype=np.float32).reshape(4, 2)
+        self.max_features = max_features
+        self.min_features = min_features
+        self.lk_params = dict(winSize=window, maxLevel=pyramid_levels,
+                              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 30, 0.01))
+        self.prev_gray: Optional[np.ndarray] = None
+        self.features: Optional[np.ndarray] = None
+
+    @staticmethod
+    def _gray(frame: np.ndarray) -> np.ndarray:
+        if frame.ndim == 2:
+            return frame
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+
+    def _detect(self, gray: np.ndarray) -> Optional[np.ndarray]:
+        mask = np.zeros(gray.shape, dtype=np.uint8)
+        cv2.fillConvexPoly(mask, self.points.astype(np.int32), 255)
+        return cv2.goodFeaturesToTrack(gray, self.max_features, 0.01, 7, mask=mask)
+
+    def update(self, frame: np.ndarray) -> np.ndarray:
+        gray = self._gray(frame)
+        if self.prev_gray is not None:
+            self.points = self._track(self.prev_gray, gray)
+        self.prev_gray = gray
+        if self.features is None or len(self.features) < self.min_features:
+            self.features = self._detect(gray)
+        return self.points
+
+    def _track(self, prev_gray: np.ndarray, gray: np.ndarray) -> np.ndarray:
+        if self.features is not None and len(self.features) >= self.min_features:
+            moved, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, self.features, None, **self.lk_params)
+            good = status.ravel() == 1
+            if good.sum() >= self.min_features:
+                H, inliers = cv2.findHomography(self.features[good], moved[good], cv2.RANSAC, 3.0)
+                if H is not None:
+                    self.features = moved[good][inliers.ravel() == 1].reshape(-1, 1, 2)
+                    return cv2.perspectiveTransform(self.points.reshape(-1, 1, 2), H).reshape(4, 2)
+        self.features = None
+        corners, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, self.points.reshape(-1, 1, 2), None,
+                                                      **self.lk_params)
+        if status.all():
+            return corners.reshape(4, 2)
+        logger.warning("Lost track of the quad; keeping the last known corners")
+        return self.points
+
+
+def extract_sequence(source: str, output: str, points: List[Tuple[float, float]],
+                     resolution: str = DEFAULT_RESOLUTION, quality: str = DEFAULT_QUALITY_PROFILE,
+                     aspect_mode: str = "Estimated", aspect_ratio: Optional[float] = None, track: bool = False,
+                     fps: Optional[float] = None, progress: Optional[Callable[[int], None]] = None,
+                     camera: Optional[CameraProfile] = None, postprocess: Optional[PostProcessChain] = None) -> int:
+    """Rectify points in every frame of source and write the result to output. Returns the frame count."""
+    frames = read_frames(source)
+    try:
+        first = next(frames)
+    except StopIteration:
+        raise ImageLoadError(f"Sequence is empty: {source}")
+
+    # Size the output once from the first frame, exactly like a single extraction
+    session = ExtractionSession(first)
+    session.set_resolution(resolution)
+    session.quality_profile = quality
+    session.set_aspect_mode(aspect_mode, aspect_ratio)
+    session.set_points(points)
+    width, height = session.output_size()
+
+    tracker = QuadTracker(np.array(points, dtype=np.float32)) if track else None
+    # A static quad maps every frame through the same fixed-point tables
+    if track:
+        maps = None
+    elif camera is not None:
+        maps = camera_maps(camera, first.shape, points, width, height, quality)
+    else:
+        maps = ImageProcessor.perspective_maps(first.shape, points, width, height, quality)
+
+    count = 0
+    with SequenceWriter(output, fps or source_fps(source)) as writer:
+        frame = first
+        while frame is not None:
+            if tracker is not None:
+                quad = tracker.update(frame)
+                warped = ImageProcessor.extract_texture(frame, quad, width, height, quality=quality, camera=camera)
+            else:
+                warped = maps.apply(frame)
+            if postprocess is not None:
+                warped = postprocess.apply(warped)
+            writer.write(warped)
+            count += 1
+            if progress is not None:
+                progress(count)
+            frame = next(frames, None)
+
+    logger.info(f"Rectified {count} frames from {source} to {output}")
+    return count
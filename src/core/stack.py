@@ -0,0 +1,250 @@
+# src/core/stack.py
+#
+# Multi-photo stacking: the same surface, selected in several photos, is warped
+# into one output frame per photo and the frames are combined to average out
+# sensor noise (and, with the robust methods, passers-by, reflections and other
+# things that only appear in some shots). Frames are warped and accumulated one
+# at a time and each photo is released before the next is loaded, so memory
+# grows with the output size, not with the number of photos:
+#
+#   mean        running mean (Welford), two float32 buffers
+#   median      remedian: medians of groups of STACK_MEDIAN_BASE frames, then of
+#               groups of those, combined by a weighted median at the end
+#   sigma-clip  running mean of the values within kappa standard deviations of
+#               the running statistics; the first frames are always accepted
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from src.core.camera import CameraProfile
+from src.core.engine import load_image
+from src.core.image_processor import ImageProcessor
+from src.core.tiled_image import TiledImage
+from src.config.settings import DEFAULT_QUALITY_PROFILE, STACK_METHODS, STACK_MEDIAN_BASE, STACK_SIGMA_KAPPA, \
+    STACK_SIGMA_MIN_FRAMES
+from src.utils.exceptions import TextractorError
+
+logger = logging.getLogger(__name__)
+
+Point = Tuple[float, float]
+
+
+class MeanAccumulator:
+    """Running per-pixel mean and variance of the frames added so far."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean: Optional[np.ndarray] = None
+        self._m2: Optional[np.ndarray] = None
+
+    def add(self, frame: np.ndarray) -> None:
+        frame = frame.astype(np.float32)
+        self.count += 1
+        if self.mean is None:
+            self.mean, self._m2 = frame, np.zeros_like(frame)
+            return
+        delta = frame - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (frame - self.mean)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self._m2 / max(self.count - 1, 1))
+
+    def result(self) -> np.ndarray:
+        return self.mean
+
+
+class SigmaClipAccumulator(MeanAccumulator):
+    """Mean of the values within kappa standard deviations of the running mean, per pixel. One pass only: each
+    frame is tested against the statistics of the frames before it, so the first min_frames are kept as they are."""
+
+    def __init__(self, kappa: float = STACK_SIGMA_KAPPA, min_frames: int = STACK_SIGMA_MIN_FRAMES):
+        super().__init__()
+        self.kappa = kappa
+        self.min_frames = min_frames
+        self._sum: Optional[np.ndarray] = None
+        self._kept: Optional[np.ndarray] = None
+
+    def add(self, frame: np.ndarray) -> None:
+        frame = frame.astype(np.float32)
+        if self.count < self.min_frames:
+            keep = np.ones(frame.shape, dtype=bool)
+        else:
+            # A pixel is only as noisy as its channels together; clip whole pixels, not single channels
+            deviation = np.abs(frame - self.mean) - self.kappa * self.std
+            keep = deviation <= 0 if frame.ndim == 2 else np.broadcast_to((deviation <= 0).all(axis=2, keepdims=True),
+                                                                           frame.shape)
+        if self._sum is None:
+            self._sum, self._kept = np.zeros_like(frame), np.zeros(frame.shape, dtype=np.uint16)
+        self._sum += np.where(keep, frame, 0)
+        self._kept += keep
+        super().add(frame)
+
+    @property
+    def rejected(self) -> float:
+        """Fraction of pixel values clipped so far."""
+        return 1.0 - float(self._kept.mean()) / self.count if self.count else 0.0
+
+    def result(self) -> np.ndarray:
+        # Pixels where every frame after the first few was clipped fall back to the plain mean
+        return np.where(self._kept > 0, self._sum / np.maximum(self._kept, 1), self.mean)
+
+
+def weighted_median(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Per-element weighted median along axis 0 of values, with one weight per entry along that axis; the two
+    middle values are averaged when the weights split evenly between them."""
+    order = np.argsort(values, axis=0, kind="stable")
+    ordered = np.take_along_axis(values, order, axis=0)
+    cumulative = np.cumsum(weights.astype(np.float64)[order], axis=0)
+    half = cumulative[-1] / 2
+    lower = np.take_along_axis(ordered, np.argmax(cumulative >= half, axis=0)[None], axis=0)[0]
+    upper = np.take_along_axis(ordered, np.argmax(cumulative > half, axis=0)[None], axis=0)[0]
+    return (lower.astype(np.float32) + upper) / 2
+
+
+class MedianAccumulator:
+    """Approximate per-pixel median (the remedian). Every base frames are reduced to their median, every base of
+    those medians to theirs, and so on, so at most base frames per level are kept in their original bit depth.
+    Up to base frames the result is the exact median."""
+
+    def __init__(self, base: int = STACK_MEDIAN_BASE):
+        if base < 2:
+            raise ValueError("The remedian base must be at least 2")
+        self.base = base
+        self.count = 0
+        self.levels: List[List[np.ndarray]] = []
+
+    def add(self, frame: np.ndarray) -> None:
+        self.count += 1
+        level = 0
+        while True:
+            if level == len(self.levels):
+                self.levels.append([])
+            self.levels[level].append(frame)
+            if len(self.levels[level]) < self.base:
+                return
+            frame = np.median(np.stack(self.levels[level]), axis=0).astype(np.float32)
+            self.levels[level] = []
+            level += 1
+
+    def result(self) -> np.ndarray:
+        # Frames still waiting at each level stand for base ** level inputs
+        values = [frame.astype(np.float32) for frames in self.levels for frame in frames]
+        weights = np.array([self.base ** level for level, frames in enumerate(self.levels) for _ in frames])
+        if len(values) == 1:
+            return values[0]
+        return weighted_median(np.stack(values), weights)
+
+
+ACCUMULATORS = {"mean": MeanAccumulator, "median": MedianAccumulator, "sigma-clip": SigmaClipAccumulator}
+
+
+def make_accumulator(method: str):
+    if method not in STACK_METHODS:
+        raise ValueError(f"Unknown stacking method: {method}")
+    return ACCUMULATORS[method]()
+
+
+def frame_shift(reference: np.ndarray, frame: np.ndarray) -> Tuple[float, float, float]:
+    """(dx, dy, response): how far frame's content is displaced from reference's."""
+    patches = []
+    for image in (reference, frame):
+        image = image.astype(np.float32)
+        patches.append(image.mean(axis=2) if image.ndim == 3 else image)
+    window = cv2.createHanningWindow(patches[0].shape[::-1], cv2.CV_32F)
+    (dx, dy), response = cv2.phaseCorrelate(patches[0], patches[1], window)
+    return dx, dy, response
+
+
+def align_frame(reference: np.ndarray, frame: np.ndarray, min_response: float = 0.1) -> np.ndarray:
+    """frame moved onto reference, for selections that were placed a little differently in each photo."""
+    dx, dy, response = frame_shift(reference, frame)
+    if response < min_response:
+        logger.info(f"No reliable match for alignment (response {response:.2f}); frame left as it is")
+        return frame
+    matrix = np.float32([[1, 0, -dx], [0, 1, -dy]])
+    return cv2.warpAffine(frame, matrix, frame.shape[1::-1], flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+def to_dtype(image: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        image = np.clip(np.rint(image), info.min, info.max)
+    return image.astype(dtype)
+
+
+def stack_frames(frames: Iterable[np.ndarray], method: str = "median", align: bool = False) -> np.ndarray:
+    """Combine same-sized frames, consuming them one at a time. The result has the frames' dtype."""
+    accumulator = make_accumulator(method)
+    reference, dtype = None, None
+    for frame in frames:
+        if reference is None:
+            reference, dtype = frame, frame.dtype
+        elif frame.shape != reference.shape:
+            raise TextractorError(f"Stacked frames must all be {reference.shape[1]}x{reference.shape[0]}, "
+                                  f"got {frame.shape[1]}x{frame.shape[0]}")
+        elif align:
+            frame = align_frame(reference, frame)
+        accumulator.add(frame)
+    if reference is None:
+        raise TextractorError("Stacking needs at least one frame")
+    if isinstance(accumulator, SigmaClipAccumulator):
+        logger.info(f"Sigma clipping rejected {accumulator.rejected:.1%} of the pixel values")
+    return to_dtype(accumulator.result(), dtype)
+
+
+@dataclass
+class StackFrame:
+    """The surface's quad in one photo; image is a path (loaded when its turn comes) or an image."""
+    image: Union[str, np.ndarray, TiledImage]
+    points: Sequence[Point]
+
+
+def output_size(frames: Sequence[StackFrame]) -> Tuple[int, int]:
+    """Output size keeping the pixel density of the most detailed selection."""
+    points = np.array([frame.points for frame in frames], dtype=np.float32)
+    edges = np.linalg.norm(points - np.roll(points, -1, axis=1), axis=2)  # top, right, bottom, left
+    width = max(edges[:, [0, 2]].mean(axis=1).max(), 1.0)
+    height = max(edges[:, [1, 3]].mean(axis=1).max(), 1.0)
+    return int(round(width)), int(round(height))
+
+
+def warped_frames(frames: Sequence[StackFrame], width: int, height: int, quality: str = DEFAULT_QUALITY_PROFILE,
+                  camera: Optional[CameraProfile] = None) -> Iterable[np.ndarray]:
+    """Each frame's quad rectified to width x height, loading one photo at a time."""
+    for i, frame in enumerate(frames):
+        image = load_image(frame.image) if isinstance(frame.image, str) else frame.image
+        warped = ImageProcessor.extract_texture(image, list(frame.points), width, height, quality, camera)
+        del image
+        logger.debug(f"Warped frame {i + 1} of {len(frames)}")
+        yield warped
+
+
+def stack_quads(frames: Sequence[StackFrame], width: Optional[int] = None, height: Optional[int] = None,
+                method: str = "median", quality: str = DEFAULT_QUALITY_PROFILE,
+                camera: Optional[CameraProfile] = None, align: bool = False) -> np.ndarray:
+    """Warp the same surface out of every frame into one width x height texture and stack the results."""
+    if not frames:
+        raise TextractorError("Stacking needs at least one frame")
+    if not width or not height:
+        width, height = output_size(frames)
+    stacked = stack_frames(warped_frames(frames, width, height, quality, camera), method, align)
+    logger.info(f"Stacked {len(frames)} frames into {width}x{height} ({method})")
+    return stacked
+
+
+def load_stack_spec(spec: dict, base_dir: str = ".") -> Tuple[List[StackFrame], Optional[int], Optional[int]]:
+    """Frames and output size from a stack description.
+
+    {"width": W, "height": H, "frames": [{"image": path, "points": [[x, y] x 4]}]}
+    Image paths are relative to base_dir; width and height default to the size of the most detailed selection.
+    """
+    frames = [StackFrame(os.path.join(base_dir, entry["image"]), [tuple(point) for point in entry["points"]])
+              for entry in spec["frames"]]
+    return frames, spec.get("width"), spec.get("height")
@@ -0,0 +1,344 @@
+# src/core/stitch.py
+#
+# Planar stitching: several overlapping shots of a wall or floor are mapped into
+# one output plane and warped straight into a single texture. Every piece is a
+# quad in its own photo plus the place its corners occupy in the output, which
+# gives one homography from output pixels to source pixels per piece.
+#
+# The mosaic is rendered tile by tile. Each piece is warped into a tile with the
+# same ROI and pyramid handling as a plain extraction, so tiled sources only
+# read the tiles they need. The pieces are then blended, either by feathering
+# (weights ramping up from each piece's edges) or by a multi-band blend, which
+# joins low frequencies over a wide seam and detail over a narrow one. Multi-band
+# tiles are rendered with a margin so the seams line up across tile boundaries.
+
+import logging
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from src.core.engine import load_image, save_texture
+from src.core.image_processor import INTERPOLATION_FLAGS, ImageProcessor, WarpMaps
+from src.core.tiled_image import TiledImage
+from src.config.settings import DEFAULT_QUALITY_PROFILE, QUALITY_PROFILES, STITCH_BLEND_MODES, STITCH_TILE_SIZE, \
+    STITCH_FEATHER, STITCH_BANDS
+from src.utils.exceptions import TextractorError
+
+logger = logging.getLogger(__name__)
+
+Point = Tuple[float, float]
+
+
+def plane_rect(x: float, y: float, width: float, height: float) -> List[Point]:
+    """Corners of a width x height output rectangle at (x, y), in the order of a selection's points."""
+    return [(x, y), (x + width - 1, y), (x + width - 1, y + height - 1), (x, y + height - 1)]
+
+
+@dataclass
+class StitchPiece:
+    """A quad in one source image and the output-plane points its corners map to (both clockwise from top-left)."""
+    image: Union[np.ndarray, TiledImage]
+    points: Sequence[Point]
+    plane: Sequence[Point]
+    name: Optional[str] = None
+    homography: np.ndarray = field(init=False, repr=False)  # Output pixel -> source pixel
+
+    def __post_init__(self):
+        self.points = [(float(x), float(y)) for x, y in self.points]
+        self.plane = [(float(x), float(y)) for x, y in self.plane]
+        self.homography = cv2.getPerspectiveTransform(np.array(self.plane, dtype=np.float32),
+                                                      np.array(self.points, dtype=np.float32)).astype(np.float64)
+
+    def bounds(self) -> Tuple[int, int, int, int]:
+        """Output pixels (x0, y0, x1, y1) covered by the piece, end exclusive."""
+        plane = np.array(self.plane)
+        x0, y0 = np.floor(plane.min(axis=0)).astype(int)
+        x1, y1 = np.ceil(plane.max(axis=0)).astype(int) + 1
+        return int(x0), int(y0), int(x1), int(y1)
+
+    def pyramid_level(self) -> int:
+        """Pyramid level matching the source-to-output density, as mesh_maps picks it per cell."""
+        scale = np.sqrt(cv2.contourArea(np.array(self.points, dtype=np.float32)) /
+                        max(cv2.contourArea(np.array(self.plane, dtype=np.float32)), 1e-9))
+        return int(np.floor(np.log2(scale))) if scale >= 2.0 else 0
+
+    def translate(self, dx: float, dy: float) -> None:
+        self.plane = [(x + dx, y + dy) for x, y in self.plane]
+        self.__post_init__()
+
+
+def edge_weights(piece: StitchPiece, x0: int, y0: int, x1: int, y1: int, feather: float) -> np.ndarray:
+    """Weight of the piece at every output pixel of the rectangle: 0 outside, ramping to 1 over feather pixels.
+
+    The distance to a convex quad's boundary is the smallest distance to its edge lines, so it is evaluated
+    analytically and does not depend on where the tile boundaries fall.
+    """
+    u = np.arange(x0, x1, dtype=np.float32)[None, :]
+    v = np.arange(y0, y1, dtype=np.float32)[:, None]
+    plane = np.array(piece.plane, dtype=np.float64)
+    distance = None
+    for p, q in zip(plane, np.roll(plane, -1, axis=0)):
+        # Inward normal of a clockwise (in y-down coordinates) edge
+        nx, ny = -(q[1] - p[1]), q[0] - p[0]
+        length = np.hypot(nx, ny)
+        d = (u - p[0]) * np.float32(nx / length) + (v - p[1]) * np.float32(ny / length)
+        distance = d if distance is None else np.minimum(distance, d)
+    # Corner points are pixel centres, so boundary pixels get half a pixel of weight
+    return np.clip((distance + 0.5) / max(feather, 1.0), 0, 1).astype(np.float32)
+
+
+def piece_maps(piece: StitchPiece, x0: int, y0: int, x1: int, y1: int,
+               quality: str = DEFAULT_QUALITY_PROFILE) -> WarpMaps:
+    """Remap tables from output pixels [y0:y1, x0:x1] into the piece's source image."""
+    H = piece.homography
+    u = np.arange(x0, x1, dtype=np.float64)[None, :]
+    v = np.arange(y0, y1, dtype=np.float64)[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w = H[2, 0] * u + H[2, 1] * v + H[2, 2]
+        map_x = (H[0, 0] * u + H[0, 1] * v + H[0, 2]) / w
+        map_y = (H[1, 0] * u + H[1, 1] * v + H[1, 2]) / w
+    # Pixels outside the quad get zero weight, so their coordinates are clamped to the source box of the quad (and
+    # the half pixel of feather around it) to keep them from widening the ROI. The homography maps the convex
+    # box onto a convex quad, so the box's corners bound every coordinate that matters.
+    plane = np.array(piece.plane, dtype=np.float64)
+    (px0, py0), (px1, py1) = plane.min(axis=0) - 1, plane.max(axis=0) + 1
+    corners = np.array([[[px0, py0], [px1, py0], [px1, py1], [px0, py1]]], dtype=np.float64)
+    box = cv2.perspectiveTransform(corners, H)[0]
+    height, width = piece.image.shape[:2]
+    lo = np.maximum(np.floor(box.min(axis=0)), 0)
+    hi = np.minimum(np.ceil(box.max(axis=0)), (width - 1, height - 1))
+    map_x = np.clip(np.nan_to_num(map_x), lo[0], hi[0]).astype(np.float32)
+    map_y = np.clip(np.nan_to_num(map_y), lo[1], hi[1]).astype(np.float32)
+    profile = QUALITY_PROFILES[quality]
+    level = piece.pyramid_level() if profile["mipmaps"] else 0
+    return ImageProcessor.fit_maps(piece.image.shape, map_x, map_y, level, (x1 - x0, y1 - y0), 1,
+                                   INTERPOLATION_FLAGS[profile["interpolation"]])
+
+
+def render_piece(piece: StitchPiece, x0: int, y0: int, x1: int, y1: int,
+                 quality: str = DEFAULT_QUALITY_PROFILE) -> np.ndarray:
+    """The piece warped into output pixels [y0:y1, x0:x1] (values outside its quad are undefined)."""
+    return piece_maps(piece, x0, y0, x1, y1, quality).apply(piece.image)
+
+
+def _as_float(image: np.ndarray) -> np.ndarray:
+    image = image.astype(np.float32)
+    return image[:, :, None] if image.ndim == 2 else image
+
+
+def feather_blend(images: Sequence[np.ndarray], weights: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Weighted average of the pieces and the total weight per pixel."""
+    total = np.zeros(weights[0].shape, dtype=np.float32)
+    blended = np.zeros(images[0].shape, dtype=np.float32)
+    for image, weight in zip(images, weights):
+        blended += image * weight[:, :, None]
+        total += weight
+    blended /= np.maximum(total, 1e-6)[:, :, None]
+    return blended, total
+
+
+def multiband_blend(images: Sequence[np.ndarray], weights: Sequence[np.ndarray], bands: int) -> np.ndarray:
+    """Burt-Adelson blend: every pixel belongs to the piece with the largest weight, and the seams between the
+    resulting masks are smoothed over a width that grows with each band's scale."""
+    feathered, total = feather_blend(images, weights)
+    covered = total > 0
+    owner = np.argmax(np.stack(weights), axis=0)
+    bands = max(min(bands, int(np.log2(max(min(total.shape), 1)))), 1)
+    sizes = [total.shape[::-1]]
+    for _ in range(bands - 1):
+        sizes.append(((sizes[-1][0] + 1) // 2, (sizes[-1][1] + 1) // 2))
+
+    numerators = [0.0] * bands
+    denominators = [0.0] * bands
+    for i, (image, weight) in enumerate(zip(images, weights)):
+        inside = weight > 0
+        # Outside its own quad a piece takes the feathered mosaic, so its pyramid has no edge there
+        image = np.where(inside[:, :, None], image, feathered)
+        mask = ((owner == i) & inside).astype(np.float32)
+        gaussian = image
+        for k in range(bands):
+            if k < bands - 1:
+                smaller = cv2.pyrDown(gaussian)
+                band = gaussian - _as_float(cv2.pyrUp(smaller, dstsize=sizes[k]))
+            else:
+                band = gaussian
+            numerators[k] = numerators[k] + band * mask[:, :, None]
+            denominators[k] = denominators[k] + mask
+            if k < bands - 1:
+                gaussian, mask = _as_float(smaller), cv2.pyrDown(mask)
+
+    blended = numerators[-1] / np.maximum(denominators[-1], 1e-6)[:, :, None]
+    for k in range(bands - 2, -1, -1):
+        blended = _as_float(cv2.pyrUp(blended, dstsize=sizes[k]))
+        blended += numerators[k] / np.maximum(denominators[k], 1e-6)[:, :, None]
+    return np.where(covered[:, :, None], blended, 0)
+
+
+class Stitcher:
+    """Renders the mosaic of pieces into a width x height output, one tile at a time."""
+
+    def __init__(self, pieces: Sequence[StitchPiece], width: Optional[int] = None, height: Optional[int] = None,
+                 blend: str = "multiband", quality: str = DEFAULT_QUALITY_PROFILE, tile: int = STITCH_TILE_SIZE,
+                 feather: float = STITCH_FEATHER, bands: int = STITCH_BANDS):
+        if not pieces:
+            raise TextractorError("Stitching needs at least one piece")
+        if blend not in STITCH_BLEND_MODES:
+            raise ValueError(f"Unknown blend mode: {blend}")
+        self.pieces = list(pieces)
+        bounds = np.array([piece.bounds() for piece in self.pieces])
+        self.width = width or int(bounds[:, 2].max())
+        self.height = height or int(bounds[:, 3].max())
+        self.blend = blend
+        self.quality = quality
+        self.tile = tile
+        self.feather = feather
+        self.bands = bands
+        channels = {1 if piece.image.ndim == 2 else piece.image.shape[2] for piece in self.pieces}
+        dtypes = {np.dtype(piece.image.dtype) for piece in self.pieces}
+        if len(channels) != 1 or len(dtypes) != 1:
+            raise TextractorError("All stitched images need the same channel count and bit depth")
+        self.channels, self.dtype = channels.pop(), dtypes.pop()
+
+    @property
+    def margin(self) -> int:
+        # Context around each tile for the pyramid filters of the coarsest band
+        return 2 ** (self.bands + 1) if self.blend == "multiband" else 0
+
+    def render_tile(self, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        margin = self.margin
+        rx0, ry0 = max(x0 - margin, 0), max(y0 - margin, 0)
+        rx1, ry1 = min(x1 + margin, self.width), min(y1 + margin, self.height)
+        images, weights = [], []
+        for piece in self.pieces:
+            px0, py0, px1, py1 = piece.bounds()
+            if px0 >= rx1 or py0 >= ry1 or px1 <= rx0 or py1 <= ry0:
+                continue
+            weight = edge_weights(piece, rx0, ry0, rx1, ry1, self.feather)
+            if not weight.any():
+                continue
+            images.append(_as_float(render_piece(piece, rx0, ry0, rx1, ry1, self.quality)))
+            weights.append(weight)
+
+        shape = (y1 - y0, x1 - x0) + ((self.channels,) if self.channels > 1 else ())
+        if not images:
+            return np.zeros(shape, dtype=self.dtype)
+        if self.blend == "multiband" and len(images) > 1:
+            blended = multiband_blend(images, weights, self.bands)
+        else:
+            blended = feather_blend(images, weights)[0]
+        blended = blended[y0 - ry0:y1 - ry0, x0 - rx0:x1 - rx0]
+        if np.issubdtype(self.dtype, np.integer):
+            info = np.iinfo(self.dtype)
+            blended = np.clip(np.rint(blended), info.min, info.max)
+        return blended.astype(self.dtype).reshape(shape)
+
+    def tiles(self) -> Iterator[Tuple[int, int, np.ndarray]]:
+        """(x, y, pixels) of every output tile, row by row."""
+        for y0 in range(0, self.height, self.tile):
+            for x0 in range(0, self.width, self.tile):
+                yield x0, y0, self.render_tile(x0, y0, min(x0 + self.tile, self.width),
+                                               min(y0 + self.tile, self.height))
+
+    def write(self, path: str) -> None:
+        """Write the mosaic to path. .npy outputs are filled tile by tile through a memory map; other formats
+        are assembled in a memory-mapped scratch file, so the page cache rather than the heap holds the mosaic
+        while OpenCV encodes it."""
+        shape = (self.height, self.width) + ((self.channels,) if self.channels > 1 else ())
+        if path.lower().endswith(".npy"):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._fill(np.lib.format.open_memmap(path, mode="w+", dtype=self.dtype, shape=shape))
+            return
+        with tempfile.TemporaryDirectory(prefix="stitch-") as scratch:
+            mosaic = np.lib.format.open_memmap(os.path.join(scratch, "mosaic.npy"), mode="w+", dtype=self.dtype,
+                                               shape=shape)
+            self._fill(mosaic)
+            save_texture(path, mosaic)
+            del mosaic
+
+    def _fill(self, mosaic: np.ndarray) -> None:
+        for x0, y0, tile in self.tiles():
+            mosaic[y0:y0 + tile.shape[0], x0:x0 + tile.shape[1]] = tile
+        if isinstance(mosaic, np.memmap):
+            mosaic.flush()
+        logger.info(f"Stitched {len(self.pieces)} pieces into {self.width}x{self.height} ({self.blend})")
+
+
+def _largest_overlap(pieces: Sequence[StitchPiece], i: int) -> Tuple[int, Tuple[int, int, int, int]]:
+    """The earlier piece overlapping piece i the most, and the overlapping output rectangle."""
+    best = None
+    ax0, ay0, ax1, ay1 = pieces[i].bounds()
+    for j in range(i):
+        bx0, by0, bx1, by1 = pieces[j].bounds()
+        overlap = (max(ax0, bx0), max(ay0, by0), min(ax1, bx1), min(ay1, by1))
+        area = max(overlap[2] - overlap[0], 0) * max(overlap[3] - overlap[1], 0)
+        if best is None or area > best[0]:
+            best = (area, j, overlap)
+    return best[1], best[2]
+
+
+def _overlap_shift(reference: StitchPiece, piece: StitchPiece, rect: Tuple[int, int, int, int],
+                   scale: float) -> Tuple[float, float, float]:
+    """(dx, dy, response): how far piece's content is displaced from reference's within rect, in output pixels."""
+    x0, y0, x1, y1 = rect
+    patches = []
+    for source in (reference, piece):
+        patch = _as_float(render_piece(source, x0, y0, x1, y1, "Balanced")).mean(axis=2)
+        if scale != 1.0:
+            patch = cv2.resize(patch, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        patches.append(patch)
+    window = cv2.createHanningWindow(patches[0].shape[::-1], cv2.CV_32F)
+    (dx, dy), response = cv2.phaseCorrelate(patches[0], patches[1], window)
+    return dx / scale, dy / scale, response
+
+
+def register_pieces(pieces: Sequence[StitchPiece], scale: float = 0.25, min_overlap: int = 32,
+                    min_response: float = 0.1, refine_size: int = 512) -> List[Tuple[float, float]]:
+    """Correct small placement errors: every piece after the first is shifted so its overlap with the
+    largest-overlapping earlier piece lines up. The shift is found by phase correlation of the overlap at scale,
+    then refined at full resolution on at most refine_size pixels square of it. Returns the shifts."""
+    shifts = [(0.0, 0.0)]
+    for i in range(1, len(pieces)):
+        piece = pieces[i]
+        total_x = total_y = 0.0
+        for pass_scale in ((scale, 1.0) if scale < 1.0 else (1.0,)):
+            j, (x0, y0, x1, y1) = _largest_overlap(pieces, i)
+            if min(x1 - x0, y1 - y0) < min_overlap:
+                break
+            if pass_scale == 1.0 and scale < 1.0:
+                cx, cy, half = (x0 + x1) // 2, (y0 + y1) // 2, refine_size // 2
+                x0, y0, x1, y1 = max(x0, cx - half), max(y0, cy - half), min(x1, cx + half), min(y1, cy + half)
+            dx, dy, response = _overlap_shift(pieces[j], piece, (x0, y0, x1, y1), pass_scale)
+            if response < min_response:
+                logger.info(f"Piece {piece.name or i}: no reliable overlap match (response {response:.2f})")
+                break
+            # The content of piece i appears displaced by (dx, dy) relative to piece j, so move its placement back
+            piece.translate(-dx, -dy)
+            total_x, total_y = total_x - dx, total_y - dy
+        if total_x or total_y:
+            logger.info(f"Piece {piece.name or i}: moved by ({total_x:.1f}, {total_y:.1f})")
+        shifts.append((total_x, total_y))
+    return shifts
+
+
+def load_stitch_spec(spec: dict, base_dir: str = ".") -> Tuple[List[StitchPiece], Optional[int], Optional[int]]:
+    """Pieces and output size from a stitch description.
+
+    {"width": W, "height": H, "pieces": [{"image": path, "points": [[x, y] x 4],
+                                          "plane": [[x, y] x 4] or {"x", "y", "width", "height"}}]}
+    Image paths are relative to base_dir; width and height default to the extent of the pieces.
+    """
+    pieces = []
+    images = {}
+    for entry in spec["pieces"]:
+        path = os.path.join(base_dir, entry["image"])
+        if path not in images:
+            images[path] = load_image(path)
+        plane = entry["plane"]
+        if isinstance(plane, dict):
+            plane = plane_rect(plane["x"], plane["y"], plane["width"], plane["height"])
+        pieces.append(StitchPiece(images[path], entry["points"], plane, name=entry.get("name", entry["image"])))
+    return pieces, spec.get("width"), spec.get("height")
@@ -1,51 +1,78 @@
 # src/core/textractor.py
 
-import cv2
+import os
 import numpy as np
 import tkinter as tk
 from tkinter import filedialog
-from PIL import Image, ImageTk, ImageOps
-import threading
-import queue
+from PIL import Image
+from concurrent.futures import Future, ThreadPoolExecutor
 import logging
-import os
 from typing import List, Tuple, Optional
 
 from src.ui.ui_manager import UIManager
+from src.ui.overlay import SelectionOverlay
+from src.ui.loupe import Loupe
 from src.core.image_processor import ImageProcessor
+from src.core.engine import ExtractionSession, apply_orientation, estimate_aspect_ratio, load_image, \
+    parse_resolution, save_texture, scale_for_preview, to_rgb
+from src.core.project import Project
+from src.core.export_set import export_preset
+from src.core.quad_detector import detect_quads
+from src.core.phash_index import HashIndex, phash
+from src.core.camera import clear_map_cache, load_camera_profiles
+from src.core.memory import MemoryGovernor, format_bytes
+from src.core.mesh_warp import mesh_aspect_ratio, mesh_from_quad
+from src.core.postprocess import PostProcessChain
+from src.core.tiled_image import TiledImage, open_tiled, probe_image
 from src.utils.file_utils import load_recent_files, save_recent_files
-from src.utils.exceptions import ImageLoadError, TextureExtractionError
+from src.utils.exceptions import TextureExtractionError
+from src.utils.profiler import traced
+from src.config.performance import performance
+from src.config.settings import STATUS_MESSAGES, SAVE_IMAGE_TYPES, EXPORT_PRESETS, AUTO_DETECT_ON_LOAD, \
+    AUTO_DETECT_MIN_CONFIDENCE, NO_CAMERA, MESH_OFF, MEMORY_MIN_PREVIEW_SIZE, MEMORY_UNDO_KEEP
 
 logger = logging.getLogger(__name__)
 
 
 class Textractor:
-    def __init__(self, master: tk.Tk):
+    def __init__(self, master: tk.Tk, ui_factory=None, hash_index_path: Optional[str] = None):
         self.recent_files: List[str] = load_recent_files()
 
         self.image_processor = ImageProcessor()
-        self.ui = UIManager(master, self)
+        # All extraction state lives in the GUI-free session; this class only maps UI events onto it
+        self.session = ExtractionSession(image_processor=self.image_processor)
+        # ui_factory builds the widgets (UIManager, looked up here so tests can patch it); replays pass a headless
+        # stand-in (see src.ui.headless)
+        self.ui = (ui_factory or UIManager)(master, self)
+        self.overlay = SelectionOverlay(self.ui.canvas)
+        self.loupe = Loupe(self.ui.canvas, create_photo=self.ui.create_photo)
+        self._loupe_pointer: Optional[Tuple[float, float]] = None
 
         self.points: List[Tuple[float, float]] = []
-        self.original_points: List[Tuple[float, float]] = []
-        self.image: Optional[np.ndarray] = None
+        self.image_path: Optional[str] = None
         self.original_image_size: Optional[Tuple[int, int]] = None
         self.image_scale_factor: float = 1.0
+        self.display_scale: float = 1.0  # display_image size relative to the source (below 1 for tiled sources)
         self.dragging_index: Optional[int] = None
-        self.aspect_ratio: float = 1.0
+        self.dragging_node: Optional[Tuple[int, int]] = None  # (row, column) of a mesh control point
+
+        # Saved textures are checked against and added to this duplicate index (PHASH_INDEX_PATH by default)
+        self.hash_index = HashIndex.load(hash_index_path)
 
         self.undo_stack: List[dict] = []
         self.redo_stack: List[dict] = []
 
-        self.queue: queue.Queue = queue.Queue()
-        self.thread: Optional[threading.Thread] = None
+        self.future: Optional[Future] = None
+        self._poll_scheduled = False
+        # Export sets wait on the shared extraction pool, so they are driven from their own thread
+        self._export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+        self.export_future: Optional[Future] = None
 
         self.pan_start_x = 0
         self.pan_start_y = 0
         self.zoom_factor = 1.0
 
-        self.output_resolution: Optional[Tuple[int, int]] = None
-
+        self.setup_memory_governor()
         self.setup_ui_commands()
         self.setup_keyboard_shortcuts()
         self.ui.setup_bindings(
@@ -56,11 +83,130 @@ class Textractor:
             self.on_resize,
             self.on_closing
         )
+        self.ui.canvas.bind("<Leave>", lambda e: self.hide_loupe())
+
+    @property
+    def image(self) -> Optional[np.ndarray]:
+        return self.session.image
+
+    @image.setter
+    def image(self, value: Optional[np.ndarray]) -> None:
+        self.session.image = value
+
+    @property
+    def original_points(self) -> List[Tuple[float, float]]:
+        return self.session.points
+
+    @original_points.setter
+    def original_points(self, value: List[Tuple[float, float]]) -> None:
+        self.session.points = value
+
+    @property
+    def aspect_ratio(self) -> float:
+        return self.session.aspect_ratio
+
+    @aspect_ratio.setter
+    def aspect_ratio(self, value: float) -> None:
+        self.session.aspect_ratio = value
+
+    @property
+    def output_resolution(self) -> Optional[Tuple[int, int]]:
+        return self.session.output_resolution
+
+    @output_resolution.setter
+    def output_resolution(self, value: Optional[Tuple[int, int]]) -> None:
+        self.session.output_resolution = value
+
+    @property
+    def sizing_policy(self) -> str:
+        return self.session.sizing_policy
+
+    @sizing_policy.setter
+    def sizing_policy(self, value: str) -> None:
+        self.session.sizing_policy = value
+
+    @property
+    def quality_profile(self) -> str:
+        return self.session.quality_profile
+
+    @quality_profile.setter
+    def quality_profile(self, value: str) -> None:
+        self.session.quality_profile = value
+
+    def setup_memory_governor(self) -> None:
+        """Account the pixel buffers below against the memory budget, degrading in this order near the limit."""
+        self.memory = MemoryGovernor(performance().memory_budget_mb * 1024 * 1024,
+                                     on_change=lambda governor: self.ui.update_memory(governor.summary()))
+        self.memory.add_relief("dropped caches", self.drop_caches)
+        self.memory.add_relief("reduced the preview resolution", self.reduce_preview, self.restore_preview)
+        self.memory.add_relief("moved the source into a tile pyramid", self.switch_to_tiles)
+
+    def account_memory(self) -> None:
+        """Register the pixel buffers currently alive and let the governor degrade if they are over budget."""
+        seen = set()
+        for name in ("image", "display_image", "scaled_display_image", "photo", "warped", "preview_warped",
+                     "preview_photo"):
+            buffer = getattr(self, name, None)
+            # The scaled display image is the display image itself when no scaling was needed
+            self.memory.track(name, None if id(buffer) in seen else buffer)
+            seen.add(id(buffer))
+        self.memory.track("undo history", [state['mesh'] for state in self.undo_stack + self.redo_stack])
+        self.memory.rebalance()
+        logger.debug(f"{self.memory.summary()} ({self.memory.breakdown()})")
+
+    def drop_caches(self) -> bool:
+        clear_map_cache()
+        if self.session.postprocess is not None:
+            self.session.postprocess.release_buffers()
+        self.undo_stack[:] = self.undo_stack[-MEMORY_UNDO_KEEP:]
+        self.redo_stack[:] = self.redo_stack[-MEMORY_UNDO_KEEP:]
+        self.memory.track("undo history", [state['mesh'] for state in self.undo_stack + self.redo_stack])
+        return True
+
+    def reduce_preview(self) -> bool:
+        size = max((self.session.preview_size or performance().preview_size) // 2, MEMORY_MIN_PREVIEW_SIZE)
+        if size == self.session.preview_size:
+            return False
+        self.session.preview_size = size
+        if hasattr(self, 'preview_warped'):
+            self.preview_warped = scale_for_preview(self.preview_warped, size)
+            self.memory.track("preview_warped", self.preview_warped)
+        return True
+
+    def restore_preview(self) -> None:
+        self.session.preview_size = performance().preview_size
+
+    def switch_to_tiles(self) -> bool:
+        """Replace an in-memory source by its tile pyramid; extraction then reads only the tiles under the quad."""
+        if self.image is None or isinstance(self.image, TiledImage) or self.image_path is None:
+            return False
+        self.image = open_tiled(self.image_path, self.image)
+        overview, self.display_scale = self.image.overview(performance().tiled_display_size)
+        self.display_image = to_rgb(overview)
+        self.scale_image()
+        self.draw_image()
+        self.draw_polygon()
+        return True
+
+    def tiled_load_threshold(self, file_path: str) -> Optional[int]:
+        """0 to load file_path as tiles straight away when decoding it would not fit in the budget, else None."""
+        info = probe_image(file_path)
+        if info is None:
+            return None
+        # The new source and its display copy replace the current ones
+        replaced = sum(self.memory.buffers.get(name, 0) for name in ("image", "display_image", "scaled_display_image",
+                                                                      "photo"))
+        if self.memory.fits(2 * info.nbytes - replaced):
+            return None
+        logger.info(f"Loading {file_path} as tiles: decoding it needs {format_bytes(info.nbytes)}, "
+                    f"{self.memory.summary().lower()}")
+        return 0
 
     def setup_ui_commands(self) -> None:
         self.ui.load_button.config(command=self.load_image)
         self.ui.clear_button.config(command=self.clear_selection)
         self.ui.save_button.config(command=self.save_texture)
+        self.ui.detect_button.config(command=self.auto_detect)
         self.ui.flip_check.config(command=self.update_preview)
         self.ui.flop_check.config(command=self.update_preview)
         self.ui.rotate_check.config(command=self.update_preview)
@@ -70,6 +216,7 @@ class Textractor:
         self.ui.master.bind("<Control-y>", self.redo)
         self.ui.master.bind("<Control-o>", lambda e: self.load_image())
         self.ui.master.bind("<Control-s>", lambda e: self.save_texture())
+        self.ui.master.bind("<Control-d>", lambda e: self.auto_detect())
 
     def load_image(self, file_path: Optional[str] = None) -> None:
         if file_path is None:
@@ -79,12 +226,16 @@ class Textractor:
             ])
         if file_path:
             try:
-                self.ui.update_status(f"Loading image: {file_path}")
-                self.image = cv2.imread(file_path, cv2.IMREAD_UNCHANGED)
-                if self.image is None:
-                    raise ImageLoadError("Failed to load image")
-                self.display_image = cv2.cvtColor(self.image, cv2.COLOR_BGR2RGB)
-                self.original_image_size = self.display_image.shape[:2][::-1]  # (width, height)
+                self.ui.update_status(f"Loading image: {file_path}", immediate=True)
+                self.session.set_image(load_image(file_path, self.tiled_load_threshold(file_path)))
+                self.image_path = file_path
+                if isinstance(self.image, TiledImage):
+                    # Only a coarse pyramid level is ever shown; extraction reads the full-resolution tiles
+                    overview, self.display_scale = self.image.overview(performance().tiled_display_size)
+                    self.display_image = to_rgb(overview)
+                else:
+                    self.display_image, self.display_scale = to_rgb(self.image), 1.0
+                self.original_image_size = (self.image.shape[1], self.image.shape[0])  # (width, height)
                 self.scale_image()
                 self.draw_image()
                 self.clear_selection()
@@ -92,18 +243,22 @@ class Textractor:
                 self.add_recent_file(file_path)
                 logger.info(f"Loaded image: {file_path}")
                 self.ui.update_status("Image loaded successfully")
+                if AUTO_DETECT_ON_LOAD:
+                    self.auto_detect(min_confidence=AUTO_DETECT_MIN_CONFIDENCE, interactive=False)
             except Exception as e:
                 logger.error(f"Failed to load image: {str(e)}")
                 self.ui.show_error("Error", f"Failed to load image: {str(e)}")
                 self.ui.update_status("Failed to load image")
 
+    @traced
     def scale_image(self) -> None:
         if self.image is None:
             return
         canvas_width = self.ui.canvas.winfo_width()
         canvas_height = self.ui.canvas.winfo_height()
-        self.scaled_display_image, self.image_scale_factor = self.image_processor.scale_image(
+        self.scaled_display_image, scale_factor = self.image_processor.scale_image(
             self.display_image, canvas_width, canvas_height)
+        self.image_scale_factor = scale_factor * self.display_scale
         self.scale_points()
 
     def scale_points(self) -> None:
@@ -114,13 +269,17 @@ class Textractor:
             scale_y = new_height / orig_height
             self.points = [(x * scale_x, y * scale_y) for x, y in self.original_points]
 
+    @traced
     def draw_image(self) -> None:
         if self.scaled_display_image is None:
             return
-        self.photo = ImageTk.PhotoImage(image=Image.fromarray(self.scaled_display_image))
+        self.photo = self.ui.create_photo(Image.fromarray(self.scaled_display_image))
         self.ui.canvas.delete("image")
         self.ui.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo, tags="image")
+        # The overlay items outlive the image item, so keep the new image underneath them
+        self.ui.canvas.tag_lower("image")
         self.ui.update_status(f"Zoom: {self.zoom_factor:.2f}x")
+        self.account_memory()
 
     def on_press(self, event) -> None:
         if self.image is None:
@@ -142,15 +301,21 @@ class Textractor:
                 self.add_to_undo_stack()
         else:
             self.dragging_index = self.get_closest_point_index(x, y)
+            if self.dragging_index is None:
+                self.dragging_node = self.get_closest_node(x, y)
 
     def on_release(self, event) -> None:
-        if self.dragging_index is not None:
+        if self.dragging_index is not None or self.dragging_node is not None:
+            self.hide_loupe()
             self.dragging_index = None
+            self.dragging_node = None
             self.apply_aspect_ratio_mode()
             self.extract_texture()
             self.add_to_undo_stack()
 
     def on_drag(self, event) -> None:
+        if self.dragging_index is not None or self.dragging_node is not None:
+            self.update_loupe(event)
         if self.dragging_index is not None:
             x = self.ui.canvas.canvasx(event.x)
             y = self.ui.canvas.canvasy(event.y)
@@ -160,16 +325,48 @@ class Textractor:
                 canvas_y = y / (self.image_scale_factor * self.zoom_factor)
                 self.original_points[self.dragging_index] = (canvas_x, canvas_y)
                 self.points[self.dragging_index] = (x, y)
+                self.session.fit_mesh()
                 self.draw_polygon()
                 self.apply_aspect_ratio_mode()
                 self.extract_texture()
+        elif self.dragging_node is not None:
+            display_scale = self.image_scale_factor * self.zoom_factor
+            x = self.ui.canvas.canvasx(event.x) / display_scale
+            y = self.ui.canvas.canvasy(event.y) / display_scale
+            self.session.mesh[self.dragging_node] = (x, y)
+            self.draw_polygon()
+            self.apply_aspect_ratio_mode()
 
     def on_move(self, event) -> None:
-        self.ui.canvas.delete("temp_line")
         if len(self.points) > 0 and len(self.points) < 4:
             x = self.ui.canvas.canvasx(event.x)
             y = self.ui.canvas.canvasy(event.y)
-            self.ui.canvas.create_line(self.points[-1], (x, y), fill="yellow", width=2, tags="temp_line")
+            self.overlay.set_rubber_band(self.points[-1], (x, y))
+        else:
+            self.overlay.set_rubber_band(None)
+        if self.image is not None and len(self.points) < 4:
+            self.update_loupe(event)
+        else:
+            self.hide_loupe()
+
+    def update_loupe(self, event) -> None:
+        self._loupe_pointer = (self.ui.canvas.canvasx(event.x), self.ui.canvas.canvasy(event.y))
+        self.ui.request_frame("loupe", self.render_loupe)
+
+    @traced
+    def render_loupe(self) -> None:
+        if self._loupe_pointer is None or self.image is None:
+            return
+        x, y = self._loupe_pointer
+        display_scale = self.image_scale_factor * self.zoom_factor
+        self.loupe.show(self.image, x / display_scale, y / display_scale, (x, y),
+                        (self.ui.canvas.canvasx(self.ui.canvas.winfo_width()),
+                         self.ui.canvas.canvasy(self.ui.canvas.winfo_height())))
+
+    def hide_loupe(self) -> None:
+        # A frame may already be queued for the last pointer position
+        self._loupe_pointer = None
+        self.loupe.hide()
 
     def on_resize(self, event) -> None:
         if self.image is not None:
@@ -208,6 +405,27 @@ class Textractor:
         self.draw_image()
         self.draw_polygon()
 
+    def auto_detect(self, min_confidence: float = 0.0, interactive: bool = True) -> None:
+        """Select the best detected quad, unless its confidence is below min_confidence. Only interactive calls
+        (the button and Ctrl+D) report that nothing was found; detection on load stays silent."""
+        if self.image is None:
+            return
+        quads = detect_quads(self.image, max_quads=1)
+        if not quads or quads[0].confidence < min_confidence:
+            if interactive:
+                self.ui.update_status(STATUS_MESSAGES["no_quad_detected"])
+            return
+        quad = quads[0]
+        self.original_points = list(quad.points)
+        self.session.fit_mesh()
+        display_scale = self.image_scale_factor * self.zoom_factor
+        self.points = [(x * display_scale, y * display_scale) for x, y in quad.points]
+        self.draw_polygon()
+        self.apply_aspect_ratio_mode()
+        self.add_to_undo_stack()
+        key = "quad_detected" if quad.confidence >= AUTO_DETECT_MIN_CONFIDENCE else "quad_low_confidence"
+        self.ui.update_status(STATUS_MESSAGES[key].format(quad.confidence))
+
     def is_point_too_close(self, x: float, y: float, exclude: Optional[int] = None) -> bool:
         min_distance = 20 / self.zoom_factor
         for i, point in enumerate(self.points):
@@ -222,19 +440,44 @@ class Textractor:
         closest_index, distance = min(distances, key=lambda x: x[1])
         return closest_index if distance < (100 / self.zoom_factor ** 2) else None
 
+    def mesh_nodes(self) -> List[Tuple[int, int]]:
+        """(row, column) of every mesh control point that is not one of the four corners."""
+        rows, columns = self.session.mesh.shape[:2]
+        corners = {(0, 0), (0, columns - 1), (rows - 1, 0), (rows - 1, columns - 1)}
+        return [(r, c) for r in range(rows) for c in range(columns) if (r, c) not in corners]
+
+    def get_closest_node(self, x: float, y: float) -> Optional[Tuple[int, int]]:
+        if self.session.mesh is None:
+            return None
+        display_scale = self.image_scale_factor * self.zoom_factor
+        mesh = self.session.mesh * display_scale
+        distances = [(node, (mesh[node][0] - x) ** 2 + (mesh[node][1] - y) ** 2) for node in self.mesh_nodes()]
+        closest_node, distance = min(distances, key=lambda x: x[1])
+        return closest_node if distance < (100 / self.zoom_factor ** 2) else None
+
+    def draw_mesh(self) -> None:
+        if self.session.mesh is None:
+            self.overlay.set_mesh([], [])
+            return
+        mesh = self.session.mesh * (self.image_scale_factor * self.zoom_factor)
+        lines = [line.tolist() for line in list(mesh) + list(mesh.transpose(1, 0, 2))]
+        self.overlay.set_mesh(lines, [tuple(mesh[node]) for node in self.mesh_nodes()])
+
     def draw_polygon(self) -> None:
-        self.ui.canvas.delete("polygon", "points")
-        if len(self.points) > 1:
-            self.ui.canvas.create_polygon(self.points, outline="cyan", fill="", width=2, tags="polygon")
-        for i, point in enumerate(self.points):
-            self.ui.canvas.create_oval(point[0] - 3, point[1] - 3, point[0] + 3, point[1] + 3, fill="red",
-                                       outline="white", tags="points")
-            self.ui.canvas.create_text(point[0] + 10, point[1] + 10, text=str(i + 1), fill="white", tags="points")
+        # Many drag events can arrive per frame; only the last selection state needs to be drawn
+        self.ui.request_frame("overlay", self.render_overlay)
+
+    @traced
+    def render_overlay(self) -> None:
+        self.draw_mesh()
+        self.overlay.set_points(self.points, show_outline=self.session.mesh is None)
 
     def clear_selection(self) -> None:
         self.points = []
         self.original_points = []
-        self.ui.canvas.delete("polygon", "points", "temp_line")
+        self.session.set_mesh(None)
+        self.ui.mesh_var.set(MESH_OFF)
+        self.overlay.clear()
         self.ui.preview_canvas.delete("all")
         self.aspect_ratio = 1.0
         self.ui.custom_aspect_entry.delete(0, tk.END)
@@ -250,113 +493,68 @@ class Textractor:
 
     def estimate_aspect_ratio(self) -> None:
         if len(self.points) == 4:
-            side_lengths = [
-                ((self.points[i][0] - self.points[(i + 1) % 4][0]) ** 2 +
-                 (self.points[i][1] - self.points[(i + 1) % 4][1]) ** 2) ** 0.5
-                for i in range(4)
-            ]
-            width = (side_lengths[0] + side_lengths[2]) / 2
-            height = (side_lengths[1] + side_lengths[3]) / 2
-            self.aspect_ratio = width / height
+            self.aspect_ratio = mesh_aspect_ratio(self.session.mesh) if self.session.mesh is not None else \
+                estimate_aspect_ratio(self.points)
             self.ui.update_estimated_aspect_ratio(self.aspect_ratio)
-            logger.info(f"Estimated aspect ratio: {self.aspect_ratio:.2f}")
+            logger.debug(f"Estimated aspect ratio: {self.aspect_ratio:.2f}")
             self.extract_texture()
         else:
             self.ui.update_estimated_aspect_ratio(1.0)
 
     def apply_aspect_ratio_mode(self) -> None:
         selected_mode = self.ui.aspect_ratio_var.get()
+        self.session.aspect_mode = selected_mode
         if selected_mode == "Estimated":
             self.estimate_aspect_ratio()
-        elif selected_mode == "Square":
-            self.aspect_ratio = 1.0
+        else:
+            self.session.apply_aspect_mode()
             self.extract_texture()
-        elif selected_mode == "Custom":
-            self.ui.update_custom_aspect_ratio()
-
-    def extract_texture(self) -> None:
-        if self.image is not None and len(self.points) == 4:
-            self.ui.update_status("Extracting texture...")
-            self.thread = threading.Thread(target=self._extract_texture_thread)
-            self.thread.start()
-            self.ui.master.after(100, self.check_thread)
-
-    def _extract_texture_thread(self) -> None:
-        try:
-            src_pts = np.array(self.original_points, dtype=np.float32)
-
-            max_dim = max(self.image.shape[0], self.image.shape[1])
-
-            output_size = self._calculate_output_size(src_pts, max_dim)
 
-            warped = self.image_processor.extract_texture(self.image, src_pts, output_size[0], output_size[1])
-            display_warped = cv2.cvtColor(warped, cv2.COLOR_BGR2RGB)
+    def sync_session(self) -> None:
+        self.session.flip = self.ui.flip_var.get()
+        self.session.flop = self.ui.flop_var.get()
+        self.session.rotate = self.ui.rotate_var.get()
 
-            preview_warped = self._scale_for_preview(display_warped)
+    def extract_texture(self) -> None:
+        # Coalesced like the overlay, so a drag submits at most one extraction per frame
+        self.ui.request_frame("extract", self._submit_extraction)
 
-            self.queue.put((warped, preview_warped))
-        except Exception as e:
-            logger.error(f"Error in texture extraction: {str(e)}")
-            self.queue.put(None)
+    def _submit_extraction(self) -> None:
+        if self.session.is_ready:
+            self.ui.update_status("Extracting texture...")
+            self.sync_session()
+            self.future = self.session.submit()
+            if not self._poll_scheduled:
+                self._poll_scheduled = True
+                self.ui.master.after(performance().poll_ms, self.check_thread)
 
     def _calculate_output_size(self, points: np.ndarray, max_dim: int) -> Tuple[int, int]:
-        if self.output_resolution:
-            return self.output_resolution
-
-        width = max(
-            np.linalg.norm(points[0] - points[1]),
-            np.linalg.norm(points[2] - points[3])
-        )
-        height = max(
-            np.linalg.norm(points[1] - points[2]),
-            np.linalg.norm(points[3] - points[0])
-        )
-
-        if self.aspect_ratio > 1:
-            width = height * self.aspect_ratio
-        else:
-            height = width / self.aspect_ratio
-
-        scale = max_dim / max(width, height)
-        return (int(width * scale), int(height * scale))
+        return self.session.calculate_output_size(points, max_dim)
 
     def _scale_for_preview(self, image: np.ndarray) -> np.ndarray:
-        preview_max_dim = 500  # Maximum dimension for preview
-        h, w = image.shape[:2]
-        if max(h, w) > preview_max_dim:
-            scale = preview_max_dim / max(h, w)
-            new_size = (int(w * scale), int(h * scale))
-            return cv2.resize(image, new_size, interpolation=cv2.INTER_AREA)
-        return image
+        return scale_for_preview(image, self.session.preview_size)
 
     def check_thread(self) -> None:
-        if self.thread.is_alive():
-            self.ui.master.after(100, self.check_thread)
-        else:
-            try:
-                result = self.queue.get_nowait()
-                if result is not None:
-                    self.warped, self.preview_warped = result
-                    self.update_preview()
-                    self.ui.update_status("Texture extracted successfully")
-                else:
-                    raise TextureExtractionError("Failed to extract texture")
-            except queue.Empty:
-                pass
-            except TextureExtractionError as e:
-                logger.error(str(e))
-                self.ui.show_error("Error", str(e))
-                self.ui.update_status("Failed to extract texture")
-
+        if not self.future.done():
+            self.ui.master.after(performance().poll_ms, self.check_thread)
+            return
+        self._poll_scheduled = False
+        try:
+            result = self.future.result()
+            self.result = result
+            self.warped, self.preview_warped = result.warped, result.preview
+            self.update_preview()
+            self.ui.update_status("Texture extracted successfully")
+        except TextureExtractionError as e:
+            logger.error(str(e))
+            self.ui.show_error("Error", str(e))
+            self.ui.update_status("Failed to extract texture")
+
+    @traced
     def update_preview(self) -> None:
         if hasattr(self, 'preview_warped'):
-            preview = Image.fromarray(self.preview_warped)
-            if self.ui.flip_var.get():
-                preview = ImageOps.flip(preview)
-            if self.ui.flop_var.get():
-                preview = ImageOps.mirror(preview)
-            if self.ui.rotate_var.get():
-                preview = preview.rotate(-90, expand=True)
+            preview = Image.fromarray(np.ascontiguousarray(apply_orientation(
+                self.preview_warped, self.ui.flip_var.get(), self.ui.flop_var.get(), self.ui.rotate_var.get())))
 
             preview_width = self.ui.preview_canvas.winfo_width()
             preview_height = self.ui.preview_canvas.winfo_height()
@@ -371,35 +569,36 @@ class Textractor:
 
             preview = preview.resize((new_width, new_height), Image.LANCZOS)
 
-            self.preview_photo = ImageTk.PhotoImage(image=preview)
+            self.preview_photo = self.ui.create_photo(preview)
             self.ui.preview_canvas.delete("all")
             self.ui.preview_canvas.create_image(preview_width // 2, preview_height // 2, anchor=tk.CENTER,
                                                 image=self.preview_photo)
+            self.account_memory()
             self.ui.update_status("Preview updated")
 
     def save_texture(self) -> None:
         if hasattr(self, 'warped'):
             file_path = filedialog.asksaveasfilename(
                 defaultextension=".png",
-                filetypes=[
-                    ("PNG files", "*.png"),
-                    ("JPEG files", "*.jpg"),
-                    ("TIFF files", "*.tif"),
-                    ("BMP files", "*.bmp"),
-                    ("All files", "*.*")
-                ]
+                filetypes=SAVE_IMAGE_TYPES
             )
             if file_path:
                 try:
-                    save_image = Image.fromarray(cv2.cvtColor(self.warped, cv2.COLOR_BGR2RGB))
-                    if self.ui.flip_var.get():
-                        save_image = ImageOps.flip(save_image)
-                    if self.ui.flop_var.get():
-                        save_image = ImageOps.mirror(save_image)
-                    if self.ui.rotate_var.get():
-                        save_image = save_image.rotate(-90, expand=True)
-
-                    save_image.save(file_path)
+                    # Post-processing of the full-resolution texture waits until it is actually saved
+                    self.warped = self.result.finish().warped
+                    self.account_memory()
+                    texture = apply_orientation(
+                        self.warped, self.ui.flip_var.get(), self.ui.flop_var.get(), self.ui.rotate_var.get())
+                    texture_hash = phash(texture)
+                    duplicate = self.hash_index.find_duplicate(texture_hash, kind="texture",
+                                                               exclude_path=os.path.abspath(file_path))
+                    if duplicate is not None and not self.ui.ask_save_duplicate(duplicate["path"]):
+                        self.ui.update_status(STATUS_MESSAGES["duplicate_skipped"].format(duplicate["path"]))
+                        return
+                    save_texture(file_path, texture)
+                    self.hash_index.add(texture_hash, os.path.abspath(file_path), source=self.image_path,
+                                        points=[list(point) for point in self.session.points])
+                    self.hash_index.save()
                     logger.info(f"Texture saved: {file_path}")
                     self.ui.show_info("Success", "Texture saved successfully.")
                     self.ui.update_status(f"Texture saved: {file_path}")
@@ -408,6 +607,51 @@ class Textractor:
                     self.ui.show_error("Error", f"Failed to save texture: {str(e)}")
                     self.ui.update_status("Failed to save texture")
 
+    def export_set(self, preset: str) -> None:
+        if not self.session.is_ready:
+            self.ui.show_error("Error", "Load an image and select four points first.")
+            return
+        if self.export_future is not None and not self.export_future.done():
+            self.ui.show_error("Error", "An export is already running.")
+            return
+        base_path = self.ui.get_export_file_path(EXPORT_PRESETS[preset]["mip_chain"])
+        if base_path:
+            self.sync_session()
+            self.ui.update_status(STATUS_MESSAGES["exporting_set"].format(preset))
+            # The job is an immutable snapshot built here, so edits made while the export runs do not leak into it
+            self.export_future = self._export_executor.submit(export_preset, self.session.make_job(), base_path,
+                                                              preset)
+            self.ui.master.after(performance().poll_ms, self.check_export)
+
+    def check_export(self) -> None:
+        if not self.export_future.done():
+            self.ui.master.after(performance().poll_ms, self.check_export)
+            return
+        try:
+            paths = self.export_future.result()
+            self.ui.update_status(STATUS_MESSAGES["export_set_done"].format(len(paths), ", ".join(paths)))
+        except Exception as e:
+            logger.error(f"Error exporting texture set: {str(e)}")
+            self.ui.show_error("Error", f"Failed to export texture set: {str(e)}")
+            self.ui.update_status(STATUS_MESSAGES["save_failed"])
+
+    def add_to_project(self) -> None:
+        if not self.session.is_ready or self.image_path is None:
+            self.ui.show_error("Error", "Load an image and select four points first.")
+            return
+        project_path = self.ui.get_project_file_path()
+        if project_path:
+            try:
+                self.sync_session()
+                project = Project.load_or_create(project_path)
+                quad = project.add_selection(self.image_path, self.session)
+                project.save()
+                logger.info(f"Added selection to project {project_path}: {quad['output']}")
+                self.ui.update_status(STATUS_MESSAGES["project_updated"].format(project_path))
+            except Exception as e:
+                logger.error(f"Error updating project: {str(e)}")
+                self.ui.show_error("Error", f"Failed to update project: {str(e)}")
+
     def add_to_undo_stack(self) -> None:
         state = {
             'original_points': self.original_points.copy(),
@@ -416,7 +660,9 @@ class Textractor:
             'flop': self.ui.flop_var.get(),
             'rotate': self.ui.rotate_var.get(),
             'aspect_ratio': self.aspect_ratio,
-            'aspect_ratio_mode': self.ui.aspect_ratio_var.get()
+            'aspect_ratio_mode': self.ui.aspect_ratio_var.get(),
+            'mesh': None if self.session.mesh is None else self.session.mesh.copy(),
+            'mesh_grid': self.ui.mesh_var.get()
         }
         self.undo_stack.append(state)
         self.redo_stack.clear()
@@ -444,6 +690,8 @@ class Textractor:
         self.ui.rotate_var.set(state['rotate'])
         self.aspect_ratio = state['aspect_ratio']
         self.ui.aspect_ratio_var.set(state['aspect_ratio_mode'])
+        self.session.mesh = None if state['mesh'] is None else state['mesh'].copy()
+        self.ui.mesh_var.set(state['mesh_grid'])
 
         self.draw_polygon()
         if len(self.points) == 4:
@@ -456,27 +704,57 @@ class Textractor:
         if file_path in self.recent_files:
             self.recent_files.remove(file_path)
         self.recent_files.insert(0, file_path)
-        self.recent_files = self.recent_files[:5]  # Keep only the 5 most recent files
+        self.recent_files = self.recent_files[:performance().recent_files]
         save_recent_files(self.recent_files)
         self.ui.update_recent_files_menu()
 
     def update_output_resolution(self, value: str) -> None:
-        if value == "Original":
-            self.output_resolution = None
-        elif value == "Custom":
-            # You'll need to add logic to parse the custom entry
+        if value == "Custom":
             custom_value = self.ui.custom_resolution_entry.get()
             try:
-                width, height = map(int, custom_value.split('x'))
-                self.output_resolution = (width, height)
+                self.output_resolution = parse_resolution(custom_value)
             except ValueError:
                 self.ui.show_error("Invalid Resolution", "Please enter a valid resolution (e.g., 1024x1024)")
                 return
         else:
-            width, height = map(int, value.split('x'))
-            self.output_resolution = (width, height)
+            self.session.set_resolution(value)
         self.extract_texture()  # Re-extract with new resolution
 
+    def update_quality_profile(self, value: str) -> None:
+        self.quality_profile = value
+        self.extract_texture()
+
+    def camera_profile_names(self) -> List[str]:
+        try:
+            self.camera_profiles = load_camera_profiles()
+        except (ValueError, KeyError) as e:
+            logger.error(f"Failed to load camera profiles: {str(e)}")
+            self.camera_profiles = {}
+        return [NO_CAMERA] + list(self.camera_profiles)
+
+    def update_mesh_grid(self, value: str) -> None:
+        """Replace the four-point selection with a flat control grid of the chosen size (or go back)."""
+        if value == MESH_OFF:
+            self.session.set_mesh(None)
+        elif not self.session.is_ready:
+            self.ui.mesh_var.set(MESH_OFF)
+            self.ui.update_status(STATUS_MESSAGES["mesh_needs_quad"])
+            return
+        else:
+            columns, rows = parse_resolution(value)
+            self.session.set_mesh(mesh_from_quad(self.session.points, columns, rows))
+        self.draw_polygon()
+        self.apply_aspect_ratio_mode()
+        self.add_to_undo_stack()
+
+    def update_postprocess(self, name: str) -> None:
+        self.session.postprocess = PostProcessChain.from_preset(name)
+        self.extract_texture()
+
+    def update_camera_profile(self, name: Optional[str]) -> None:
+        self.session.camera = self.camera_profiles[name] if name else None
+        self.extract_texture()
+
     def run(self) -> None:
         self.ui.master.mainloop()
 
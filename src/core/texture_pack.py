@@ -0,0 +1,309 @@
+# src/core/texture_pack.py
+#
+# Texture packs: many extracted textures in one file, so batch outputs do not
+# cost a file (and its metadata) each, and loading a texture is one lookup in an
+# in-memory index plus one read. The layout is
+#
+#   header  64 bytes: magic, version, offset/length of the current index, count
+#   data    texture payloads, each aligned to TEXTURE_PACK_ALIGN bytes
+#   index   one fixed-size record per texture (INDEX_DTYPE), then their names
+#
+# Payloads are raw pixel arrays, which readers get as zero-copy views of a
+# read-only memory map, or PNG bytes decoded on read. Appends write new payloads
+# and a new index after everything else and only then point the header at it,
+# so a crash during an append leaves the previous state readable. Replaced and
+# removed textures and old indexes stay in the file as dead bytes until the
+# pack is compacted.
+
+import logging
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from src.config.settings import TEXTURE_PACK_ALIGN, TEXTURE_PACK_FORMATS
+from src.utils.exceptions import TextractorError
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TXTRPACK"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIQQQ")  # magic, version, alignment, reserved, index offset, index length, count
+HEADER_SIZE = 64
+INDEX_DTYPE = np.dtype([
+    ("offset", "<u8"), ("length", "<u8"), ("width", "<u4"), ("height", "<u4"),
+    ("name_offset", "<u4"), ("name_length", "<u2"), ("channels", "u1"), ("dtype", "u1"),
+    ("format", "u1"), ("reserved", "u1", 7),
+    ("source_hash", "u1", 32), ("key", "u1", 32),  # SHA-256 of the source image and of the render settings
+    ("quad", "<f4", (4, 2)),  # Selection corners in the source image
+])
+DTYPES = (np.dtype(np.uint8), np.dtype(np.uint16), np.dtype(np.float32))
+
+
+class TexturePackError(TextractorError):
+    """Raised when a texture pack is malformed or cannot hold a texture"""
+
+
+@dataclass
+class PackEntry:
+    name: str
+    width: int
+    height: int
+    channels: int
+    dtype: np.dtype
+    format: str
+    offset: int
+    length: int
+    source_hash: Optional[str]
+    key: Optional[str]
+    quad: Optional[List[Tuple[float, float]]]
+
+
+def _digest(value: Optional[str]) -> np.ndarray:
+    return np.frombuffer(bytes.fromhex(value), dtype=np.uint8) if value else np.zeros(32, dtype=np.uint8)
+
+
+def _hex(digest: np.ndarray) -> Optional[str]:
+    return digest.tobytes().hex() if digest.any() else None
+
+
+def _fsync_directory(path: str) -> None:
+    """Make a rename in path's directory durable. Windows cannot open directories and commits renames itself."""
+    if os.name == "nt":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class TexturePack:
+    """A texture pack opened for reading ("r") or for appending ("a", created if missing). Appended textures are
+    readable straight away; the index is written by flush() and close()."""
+
+    def __init__(self, path: str, mode: str = "r"):
+        if mode not in ("r", "a"):
+            raise ValueError(f"Unknown texture pack mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self._mmap: Optional[mmap.mmap] = None
+        self._open()
+
+    def _open(self) -> None:
+        if self.mode == "a" and (not os.path.exists(self.path) or os.path.getsize(self.path) == 0):
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, TEXTURE_PACK_ALIGN, 0, 0, 0, 0).ljust(HEADER_SIZE, b"\0"))
+        self._file = open(self.path, 'r+b' if self.mode == "a" else 'rb')
+        self._end = os.fstat(self._file.fileno()).st_size
+        magic, version, _, _, index_offset, index_length, count = HEADER.unpack(self._file.read(HEADER.size))
+        if magic != MAGIC:
+            raise TexturePackError(f"{self.path} is not a texture pack")
+        if version != VERSION:
+            raise TexturePackError(f"Unsupported texture pack version {version} in {self.path}")
+        self._index_length = index_length
+
+        # The index is read through the memory map too, so opening a pack costs one mapping and a dict of names
+        table = np.frombuffer(self._map(index_offset + index_length), dtype=INDEX_DTYPE, count=count,
+                              offset=index_offset) if count else np.zeros(0, dtype=INDEX_DTYPE)
+        names = bytes(self._mmap[index_offset + table.nbytes:index_offset + index_length]) if count else b""
+        self._table = table.copy() if self.mode == "a" else table
+        self._pending: List[np.ndarray] = []  # Rows appended since the last flush
+        self._names = [names[start:start + length].decode("utf-8")
+                       for start, length in zip(table["name_offset"].tolist(), table["name_length"].tolist())]
+        self._lookup: Dict[str, int] = {name: i for i, name in enumerate(self._names)}
+        self._dirty = False
+
+    def _map(self, size: int) -> mmap.mmap:
+        """The memory map, remapped when the file has grown past it."""
+        if self._mmap is None or len(self._mmap) < size:
+            if self.mode == "a":
+                self._file.flush()
+            self._release_map()
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def _release_map(self, strict: bool = False) -> None:
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Arrays returned by read() still use it; it is unmapped once they are gone
+                if strict:
+                    raise TexturePackError(f"Textures read from {self.path} are still in use") from None
+            self._mmap = None
+
+    def __enter__(self) -> "TexturePack":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._lookup)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._lookup
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._lookup)
+
+    def _row(self, i: int) -> np.void:
+        return self._table[i] if i < len(self._table) else self._pending[i - len(self._table)]
+
+    def entry(self, name: str) -> PackEntry:
+        row = self._row(self._lookup[name])
+        quad = row["quad"]
+        return PackEntry(name, int(row["width"]), int(row["height"]), int(row["channels"]), DTYPES[row["dtype"]],
+                         TEXTURE_PACK_FORMATS[row["format"]], int(row["offset"]), int(row["length"]),
+                         _hex(row["source_hash"]), _hex(row["key"]),
+                         None if np.isnan(quad).all() else [tuple(point) for point in quad.tolist()])
+
+    def entries(self) -> Iterator[PackEntry]:
+        return (self.entry(name) for name in self._lookup)
+
+    def read(self, name: str) -> np.ndarray:
+        """The texture as a BGR(A) or grayscale array. Raw textures are read-only views of the pack's memory
+        map, so nothing is copied and only the pages touched are read from disk."""
+        row = self._row(self._lookup[name])
+        offset, length = int(row["offset"]), int(row["length"])
+        payload = np.frombuffer(self._map(offset + length), dtype=np.uint8, count=length, offset=offset)
+        if TEXTURE_PACK_FORMATS[row["format"]] != "raw":
+            return cv2.imdecode(payload, cv2.IMREAD_UNCHANGED)
+        shape = (int(row["height"]), int(row["width"])) + ((int(row["channels"]),) if row["channels"] > 1 else ())
+        return payload.view(DTYPES[row["dtype"]]).reshape(shape)
+
+    def append(self, name: str, image: np.ndarray, format: str = "raw", source_hash: Optional[str] = None,
+               key: Optional[str] = None, quad: Optional[Sequence[Tuple[float, float]]] = None) -> PackEntry:
+        """Add image under name, replacing any texture already stored under it."""
+        if format not in TEXTURE_PACK_FORMATS:
+            raise ValueError(f"Unknown texture pack format: {format}")
+        if np.dtype(image.dtype) not in DTYPES:
+            raise TexturePackError(f"Textures of type {image.dtype} cannot be packed")
+        if format == "raw":
+            payload = memoryview(np.ascontiguousarray(image)).cast("B")
+        else:
+            success, encoded = cv2.imencode("." + format, image)
+            if not success:
+                raise TexturePackError(f"Failed to encode {name} as {format}")
+            payload = memoryview(encoded).cast("B")
+
+        row = np.zeros(1, dtype=INDEX_DTYPE)[0]
+        row["width"], row["height"] = image.shape[1], image.shape[0]
+        row["channels"] = 1 if image.ndim == 2 else image.shape[2]
+        row["dtype"] = DTYPES.index(np.dtype(image.dtype))
+        row["format"] = TEXTURE_PACK_FORMATS.index(format)
+        row["source_hash"], row["key"] = _digest(source_hash), _digest(key)
+        row["quad"] = np.nan if quad is None else np.asarray(quad, dtype=np.float32)
+        self._write_payload(name, payload, row)
+        return self.entry(name)
+
+    def _write_payload(self, name: str, payload, row: np.void) -> None:
+        if self.mode != "a":
+            raise TexturePackError(f"{self.path} is open for reading only")
+        padding = -self._end % TEXTURE_PACK_ALIGN
+        self._file.seek(self._end)
+        self._file.write(b"\0" * padding)
+        self._file.write(payload)
+        row["offset"], row["length"] = self._end + padding, len(payload)
+        self._end += padding + len(payload)
+        self._pending.append(row)
+        self._names.append(name)
+        self._lookup[name] = len(self._names) - 1
+        self._dirty = True
+
+    def remove(self, name: str) -> None:
+        if self.mode != "a":
+            raise TexturePackError(f"{self.path} is open for reading only")
+        del self._lookup[name]
+        self._dirty = True
+
+    @property
+    def size(self) -> int:
+        return self._end
+
+    @property
+    def dead_bytes(self) -> int:
+        """Bytes taken by replaced and removed textures, old indexes and alignment, reclaimed by compact()."""
+        live = sum(int(self._row(i)["length"]) for i in self._lookup.values())
+        return self._end - HEADER_SIZE - live - self._index_length
+
+    def flush(self) -> None:
+        """Write the index after the data, then point the header at it."""
+        if not self._dirty:
+            return
+        rows = sorted(self._lookup.values())
+        table = np.concatenate([self._table, np.array(self._pending, dtype=INDEX_DTYPE)])[rows] if rows else \
+            np.zeros(0, dtype=INDEX_DTYPE)
+        names = [self._names[i].encode("utf-8") for i in rows]
+        lengths = np.array([len(name) for name in names], dtype=np.int64)
+        if len(lengths) and lengths.max() > np.iinfo(np.uint16).max:
+            raise TexturePackError("Texture names are limited to 65535 bytes")
+        table["name_length"] = lengths
+        table["name_offset"] = np.cumsum(lengths) - lengths
+        index = table.tobytes() + b"".join(names)
+
+        index_offset = self._end + (-self._end % TEXTURE_PACK_ALIGN)
+        self._file.seek(self._end)
+        self._file.write(b"\0" * (index_offset - self._end) + index)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, TEXTURE_PACK_ALIGN, 0, index_offset, len(index), len(rows)))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        self._end = index_offset + len(index)
+        self._index_length = len(index)
+        self._table, self._pending = table, []
+        self._names = [self._names[i] for i in rows]
+        self._lookup = {name: i for i, name in enumerate(self._names)}
+        self._dirty = False
+
+    def compact(self) -> int:
+        """Rewrite the pack with only its live textures; returns the bytes reclaimed.
+
+        The file is replaced, so this fails with TexturePackError while arrays returned by read() are alive, and
+        on Windows while any other reader has the pack open. The pack is left as it was in both cases.
+        """
+        if self.mode != "a":
+            raise TexturePackError(f"{self.path} is open for reading only")
+        self.flush()
+        before = self._end
+        tmp_path = f"{self.path}.tmp{os.getpid()}"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            with TexturePack(tmp_path, "a") as compacted:
+                for name in self._names:
+                    row = self._row(self._lookup[name]).copy()
+                    offset, length = int(row["offset"]), int(row["length"])
+                    compacted._write_payload(name, self._map(offset + length)[offset:offset + length], row)
+            self._release_map(strict=True)
+            self._file.close()
+            try:
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                self._open()
+                raise TexturePackError(f"Could not replace {self.path} with its compacted copy: {e}") from e
+            _fsync_directory(self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._open()
+        logger.info(f"Compacted {self.path}: {before - self._end} bytes reclaimed")
+        return before - self._end
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        if self.mode == "a":
+            self.flush()
+        self._table = self._table.copy()  # A reader's index is a view of the map
+        self._release_map()
+        self._file.close()
@@ -0,0 +1,259 @@
+# src/core/tiled_image.py
+#
+# Out-of-core source images. A photo too large to hold in memory comfortably is
+# converted once into a pyramid of tiled arrays on disk: one .npy per level, laid
+# out tile by tile so every tile is contiguous. Afterwards the levels are opened
+# with np.memmap and warps read only the tiles under their ROI, at the pyramid
+# level they need, while the canvas shows a coarse level. The working set follows
+# what is on screen or inside the quad instead of the size of the photo.
+#
+# Every level is built from the previous one with cv2.pyrDown over overlapping
+# windows, which gives exactly what pyrDown of the whole level would, so warps
+# read the same pixels as they would from an in-memory image.
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import struct
+import tempfile
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from src.config.settings import TILED_CACHE_DIR, TILED_IMAGE_MIN_PIXELS, TILED_TILE_SIZE
+from src.utils.exceptions import ImageLoadError
+
+logger = logging.getLogger(__name__)
+
+METADATA_FILE = "tiles.json"
+# pyrDown reads two pixels either side of 2x; four keeps the windows on even coordinates
+PYRAMID_MARGIN = 4
+
+
+def _read_tiles(tiles: np.ndarray, tile: int, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+    """Pixels [y0:y1, x0:x1] of a (tiles_y, tiles_x, tile, tile, channels) array, copied out of the tiles they touch."""
+    window = np.empty((y1 - y0, x1 - x0, tiles.shape[-1]), dtype=tiles.dtype)
+    for ty in range(y0 // tile, (y1 - 1) // tile + 1):
+        top, bottom = max(y0, ty * tile), min(y1, (ty + 1) * tile)
+        for tx in range(x0 // tile, (x1 - 1) // tile + 1):
+            left, right = max(x0, tx * tile), min(x1, (tx + 1) * tile)
+            window[top - y0:bottom - y0, left - x0:right - x0] = \
+                tiles[ty, tx, top - ty * tile:bottom - ty * tile, left - tx * tile:right - tx * tile]
+    return window
+
+
+class TiledImage:
+    """Read-only tile pyramid in a cache directory, addressed in full-resolution pixels like the array it replaces."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with open(os.path.join(self.path, METADATA_FILE), 'r') as f:
+            metadata = json.load(f)
+        self.shape: Tuple[int, ...] = tuple(metadata["shape"])
+        self.dtype = np.dtype(metadata["dtype"])
+        self.tile: int = metadata["tile"]
+        self.source: Optional[str] = metadata.get("source")
+        self.level_shapes: List[Tuple[int, int]] = [tuple(shape) for shape in metadata["levels"]]  # (height, width)
+        self.levels = [np.load(os.path.join(self.path, f"level{n}.npy"), mmap_mode="r")
+                       for n in range(len(self.level_shapes))]
+
+    def __reduce__(self):
+        # Worker processes reopen the memory maps instead of being sent pixels
+        return TiledImage, (self.path,)
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    def read(self, level: int, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        """Pixels [y0:y1, x0:x1] of a stored pyramid level."""
+        window = _read_tiles(self.levels[level], self.tile, x0, y0, x1, y1)
+        return window if self.ndim == 3 else window[:, :, 0]
+
+    def region(self, roi: Tuple[int, int, int, int], level: int) -> np.ndarray:
+        """The full-resolution ROI (x0, y0, x1, y1) reduced level times, as image[y0:y1, x0:x1] and level pyrDowns.
+
+        x0 and y0 must be multiples of 2**level, as the ROIs of ImageProcessor.level_points are, so the ROI's
+        pyramid pixels are the stored ones.
+        """
+        x0, y0, x1, y1 = roi
+        stored = min(level, len(self.levels) - 1)
+        factor = 2 ** stored
+        height, width = self.level_shapes[stored]
+        source = self.read(stored, x0 // factor, y0 // factor, min(-(-x1 // factor), width),
+                           min(-(-y1 // factor), height))
+        for _ in range(level - stored):
+            source = cv2.pyrDown(source)
+        return source
+
+    def overview(self, max_size: int) -> Tuple[np.ndarray, float]:
+        """The finest whole level with no side longer than max_size, and its size relative to full resolution."""
+        for n, (height, width) in enumerate(self.level_shapes):
+            if max(height, width) <= max_size or n == len(self.level_shapes) - 1:
+                return self.read(n, 0, 0, width, height), width / self.shape[1]
+
+
+def _reduce_tile(tiles: np.ndarray, tile: int, shape: Tuple[int, int], x0: int, y0: int, x1: int,
+                 y1: int) -> np.ndarray:
+    """Pixels [y0:y1, x0:x1] of pyrDown(level), computed from a window of the tiled level around them."""
+    height, width = shape
+    sx0, sy0 = max(2 * x0 - PYRAMID_MARGIN, 0), max(2 * y0 - PYRAMID_MARGIN, 0)
+    sx1, sy1 = min(2 * x1 + PYRAMID_MARGIN, width), min(2 * y1 + PYRAMID_MARGIN, height)
+    reduced = cv2.pyrDown(_read_tiles(tiles, tile, sx0, sy0, sx1, sy1))
+    reduced = reduced.reshape(reduced.shape[0], reduced.shape[1], -1)
+    left, top = x0 - sx0 // 2, y0 - sy0 // 2
+    return reduced[top:top + y1 - y0, left:left + x1 - x0]
+
+
+def build_tiled_image(image: np.ndarray, path: str, tile: int = TILED_TILE_SIZE,
+                      source: Optional[str] = None) -> TiledImage:
+    """Write image as a tile pyramid in directory path, down to a level that fits in one tile.
+
+    image is only read one tile at a time, so a memory-mapped source is converted in bounded memory. The
+    pyramid is built next to path and renamed into place, so concurrent builders never see a partial one.
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".building-", dir=parent)
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    shapes = [tuple(image.shape[:2])]
+    while max(shapes[-1]) > tile:
+        shapes.append(((shapes[-1][0] + 1) // 2, (shapes[-1][1] + 1) // 2))
+    try:
+        previous = None
+        for n, (height, width) in enumerate(shapes):
+            tiles = np.lib.format.open_memmap(os.path.join(staging, f"level{n}.npy"), mode="w+", dtype=image.dtype,
+                                              shape=(-(-height // tile), -(-width // tile), tile, tile, channels))
+            for ty in range(tiles.shape[0]):
+                for tx in range(tiles.shape[1]):
+                    x0, y0 = tx * tile, ty * tile
+                    x1, y1 = min(x0 + tile, width), min(y0 + tile, height)
+                    if previous is None:
+                        block = np.asarray(image[y0:y1, x0:x1]).reshape(y1 - y0, x1 - x0, channels)
+                    else:
+                        block = _reduce_tile(previous, tile, shapes[n - 1], x0, y0, x1, y1)
+                    tiles[ty, tx, :y1 - y0, :x1 - x0] = block
+            tiles.flush()
+            previous = tiles
+        del previous, tiles
+
+        metadata = {"shape": list(image.shape), "dtype": image.dtype.str, "tile": tile,
+                    "levels": [list(shape) for shape in shapes], "source": source}
+        with open(os.path.join(staging, METADATA_FILE), 'w') as f:
+            json.dump(metadata, f, indent=2)
+        try:
+            os.rename(staging, path)
+        except OSError:
+            # Another process finished converting the same source first; its pyramid is identical
+            if not os.path.exists(os.path.join(path, METADATA_FILE)):
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    logger.info(f"Built {len(shapes)}-level tile pyramid of {image.shape[1]}x{image.shape[0]} at {path}")
+    return TiledImage(path)
+
+
+@dataclass(frozen=True)
+class ImageInfo:
+    """What decoding an image would produce, as read from its header."""
+    width: int
+    height: int
+    channels: int
+    bit_depth: int
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the decoded array."""
+        return self.pixels * self.channels * self.bit_depth // 8
+
+
+# Pillow mode -> (channels, bits per channel) of what cv2.imread(IMREAD_UNCHANGED) returns for it
+_MODE_LAYOUTS = {"1": (1, 8), "L": (1, 8), "P": (3, 8), "LA": (4, 8), "PA": (4, 8), "RGB": (3, 8),
+                 "RGBA": (4, 8), "RGBX": (3, 8), "CMYK": (3, 8), "YCbCr": (3, 8), "LAB": (3, 8), "HSV": (3, 8),
+                 "I": (1, 32), "F": (1, 32)}
+
+
+def _open_header(fp) -> Optional[Image.Image]:
+    """The file's header parsed by the first Pillow plugin that accepts it, or None. Image.open does the same but
+    then applies its decompression bomb limit, which is meant for decoding and would reject the very images this
+    module exists for; only the header is read here, so the limit is left alone rather than lifted globally."""
+    Image.init()
+    prefix = fp.read(16)
+    for format in Image.ID:
+        factory, accept = Image.OPEN[format]
+        result = accept is None or accept(prefix)
+        if not result or isinstance(result, str):  # A string is Pillow's "almost, but not supported" warning
+            continue
+        fp.seek(0)
+        try:
+            return factory(fp, fp.name)
+        except (SyntaxError, IndexError, TypeError, struct.error):
+            continue
+    return None
+
+
+def probe_image(file_path: str) -> Optional[ImageInfo]:
+    """Dimensions, channels and bit depth of an image without decoding its pixels; None if it is not recognized."""
+    if file_path.lower().endswith(".npy"):
+        array = np.load(file_path, mmap_mode="r")
+        return ImageInfo(array.shape[1], array.shape[0], array.shape[2] if array.ndim == 3 else 1,
+                         array.dtype.itemsize * 8)
+    try:
+        with open(file_path, "rb") as fp:
+            image = _open_header(fp)
+            if image is None:
+                return None  # Not something Pillow can identify; OpenCV may still read it
+            width, height, mode = image.width, image.height, image.mode
+            rawmodes = [tile[3][0] if isinstance(tile[3], tuple) else tile[3]
+                        for tile in getattr(image, "tile", []) if len(tile) > 3 and tile[3]]
+    except Exception:
+        return None
+    if mode.startswith("I;16"):
+        channels, bit_depth = 1, 16
+    else:
+        channels, bit_depth = _MODE_LAYOUTS.get(mode, (3, 8))
+        # Pillow opens 16-bit RGB(A) as 8-bit modes; the raw mode of the data still says 16
+        if any(";16" in str(rawmode) for rawmode in rawmodes):
+            bit_depth = 16
+    return ImageInfo(width, height, channels, bit_depth)
+
+
+def should_tile(file_path: str, min_pixels: Optional[int] = None) -> bool:
+    """Whether the image at file_path is large enough to be read out of core, judged from its header alone."""
+    info = probe_image(file_path)
+    return info is not None and info.pixels >= (TILED_IMAGE_MIN_PIXELS if min_pixels is None else min_pixels)
+
+
+def cache_path(file_path: str) -> str:
+    """Cache directory for the pyramid of file_path; editing or replacing the file gives a new one."""
+    stat = os.stat(file_path)
+    key = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|{TILED_TILE_SIZE}"
+    return os.path.join(TILED_CACHE_DIR, hashlib.sha1(key.encode()).hexdigest()[:16])
+
+
+def open_tiled(file_path: str, image: Optional[np.ndarray] = None) -> TiledImage:
+    """The tile pyramid of file_path, converting the image on first use.
+
+    .npy sources are memory-mapped and converted tile by tile; other formats are decoded once here, unless
+    their pixels are passed as image.
+    """
+    path = cache_path(file_path)
+    if os.path.exists(os.path.join(path, METADATA_FILE)):
+        return TiledImage(path)
+    logger.info(f"Converting {file_path} into tiles, this happens once per source")
+    if image is None and file_path.lower().endswith(".npy"):
+        image = np.load(file_path, mmap_mode="r")
+    elif image is None:
+        image = cv2.imread(file_path, cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise ImageLoadError(f"Failed to load image: {file_path}")
+    return build_tiled_image(image, path, source=os.path.abspath(file_path))
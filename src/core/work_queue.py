@@ -0,0 +1,266 @@
+# src/core/work_queue.py
+#
+# Coordinator-free batch sharding over a shared directory. Every job (one source
+# image and its stale outputs) is a JSON file that moves between
+#
+#   pending/ -> leased/ -> done/ (or failed/)
+#
+# using atomic renames, so any number of workers on any number of hosts can claim
+# jobs without a broker. A leased job's mtime is its heartbeat; when a worker
+# dies the lease expires and the next idle worker moves the job back to pending.
+# Outputs are written with the same atomic save as a local re-export and are
+# keyed by their input hash, so running a job twice is harmless.
+#
+# Paths in jobs are absolute: every host must mount the project and the queue at
+# the same location.
+
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from src.core.camera import CameraProfile
+from src.core.project import ExportTask, Project, ReexportSummary, render_source
+from src.config.performance import performance
+from src.config.settings import QUEUE_LEASE_SECONDS, QUEUE_MAX_ATTEMPTS
+
+logger = logging.getLogger(__name__)
+
+STATES = ("pending", "leased", "done", "failed")
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp_path = f"{path}.tmp{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+@dataclass
+class QueueStatus:
+    counts: Dict[str, int] = field(default_factory=dict)
+    rendered: int = 0
+    failed: Dict[str, str] = field(default_factory=dict)
+    workers: Dict[str, int] = field(default_factory=dict)  # Jobs finished per worker
+    busy_seconds: float = 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.counts.get("pending", 0) == 0 and self.counts.get("leased", 0) == 0
+
+    def __str__(self) -> str:
+        states = ", ".join(f"{self.counts.get(state, 0)} {state}" for state in STATES)
+        workers = ", ".join(f"{worker}: {jobs}" for worker, jobs in sorted(self.workers.items()))
+        return (f"jobs: {states}; outputs: {self.rendered} rendered, {len(self.failed)} failed; "
+                f"{self.busy_seconds:.1f}s of work" + (f" (jobs per worker: {workers})" if workers else ""))
+
+
+class WorkQueue:
+    def __init__(self, root: str, lease_seconds: float = QUEUE_LEASE_SECONDS,
+                 max_attempts: int = QUEUE_MAX_ATTEMPTS):
+        self.root = os.path.abspath(root)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        for state in STATES:
+            os.makedirs(self.dir(state), exist_ok=True)
+
+    def dir(self, state: str) -> str:
+        return os.path.join(self.root, state)
+
+    def path(self, state: str, job_id: str) -> str:
+        return os.path.join(self.dir(state), job_id + ".json")
+
+    def jobs(self, state: str) -> List[str]:
+        return sorted(name[:-5] for name in os.listdir(self.dir(state)) if name.endswith(".json"))
+
+    # Submitting
+
+    @staticmethod
+    def job_id(source: str, tasks: List[ExportTask]) -> str:
+        payload = json.dumps([source] + sorted(task.key for task in tasks))
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def submit(self, project: Project, force: bool = False, overrides: Optional[dict] = None) -> List[str]:
+        """Queue one job per source with stale outputs. Jobs already queued or done are not queued again."""
+        submitted = []
+        for source, tasks in project.stale_tasks(force, overrides).items():
+            job_id = self.job_id(source, tasks)
+            if any(os.path.exists(self.path(state, job_id)) for state in STATES):
+                continue
+            _write_json(self.path("pending", job_id), {
+                "id": job_id,
+                "source": source,
+                # The camera is resolved here, so workers need not share this host's camera_profiles.json
+                "tasks": [{"output": t.output, "key": t.key, "quad": t.quad,
+                           "camera": t.camera.to_dict() if t.camera else None} for t in tasks],
+                "attempts": 0,
+            })
+            submitted.append(job_id)
+        logger.info(f"Queued {len(submitted)} job(s) in {self.root}")
+        return submitted
+
+    # Claiming
+
+    def claim(self) -> Optional[dict]:
+        """Atomically move one pending job to leased/ and return it, or None if nothing is pending."""
+        for job_id in self.jobs("pending"):
+            pending_path, leased_path = self.path("pending", job_id), self.path("leased", job_id)
+            try:
+                # rename keeps the mtime, so refresh it first: the lease starts now
+                os.utime(pending_path)
+                os.rename(pending_path, leased_path)
+            except FileNotFoundError:
+                continue  # Another worker got there first
+            job = _read_json(leased_path)
+            if job is None:
+                continue  # Reaped in between; someone else will pick it up
+            job["attempts"] += 1
+            _write_json(leased_path, job)
+            return job
+        return None
+
+    def heartbeat(self, job_id: str) -> bool:
+        """Extend a lease. Returns False if it was lost (expired and reaped by another worker)."""
+        try:
+            os.utime(self.path("leased", job_id))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def reap(self) -> List[str]:
+        """Move expired leases back to pending (or to failed after max_attempts)."""
+        reaped = []
+        now = time.time()
+        for job_id in self.jobs("leased"):
+            leased_path = self.path("leased", job_id)
+            try:
+                if now - os.path.getmtime(leased_path) < self.lease_seconds:
+                    continue
+                job = _read_json(leased_path)
+                target = "pending" if job is not None and job["attempts"] < self.max_attempts else "failed"
+                os.rename(leased_path, self.path(target, job_id))
+            except FileNotFoundError:
+                continue
+            logger.warning(f"Lease on job {job_id} expired, moved to {target}")
+            reaped.append(job_id)
+        return reaped
+
+    # Finishing
+
+    def complete(self, job: dict, results: List[Tuple[str, str, Optional[str]]], worker: str,
+                 seconds: float) -> str:
+        """Record a job's results; failed outputs are retried until max_attempts. Returns the new state."""
+        job_id = job["id"]
+        failed = {output for output, _, error in results if error is not None}
+        record = dict(job, results=results, worker=worker, seconds=seconds)
+        if failed and job["attempts"] < self.max_attempts:
+            retry = dict(job, tasks=[task for task in job["tasks"] if task["output"] in failed])
+            # Keep the successful outputs on record under a per-attempt name
+            _write_json(self.path("done", f"{job_id}.{job['attempts']}"), dict(
+                record, results=[result for result in results if result[2] is None]))
+            _write_json(self.path("pending", job_id), retry)
+            state = "pending"
+        else:
+            state = "failed" if failed else "done"
+            _write_json(self.path(state, job_id), record)
+        try:
+            os.remove(self.path("leased", job_id))
+        except FileNotFoundError:
+            pass
+        return state
+
+    # Reporting
+
+    def records(self) -> List[dict]:
+        records = []
+        for state in ("done", "failed"):
+            for job_id in self.jobs(state):
+                record = _read_json(self.path(state, job_id))
+                # Jobs that failed through lease expiry have no results
+                if record is not None and "results" in record:
+                    records.append(record)
+        return records
+
+    def status(self) -> QueueStatus:
+        status = QueueStatus(counts={state: len(self.jobs(state)) for state in STATES})
+        # Per-attempt records of retried jobs are not jobs of their own
+        status.counts["done"] = sum(1 for job_id in self.jobs("done") if "." not in job_id)
+        for record in self.records():
+            status.workers[record["worker"]] = status.workers.get(record["worker"], 0) + 1
+            status.busy_seconds += record["seconds"]
+            for output, _, error in record["results"]:
+                if error is None:
+                    status.rendered += 1
+                    status.failed.pop(output, None)
+                else:
+                    status.failed[output] = error
+        return status
+
+    def collect(self, project: Project) -> ReexportSummary:
+        """Merge every finished result into the project's build map and save it."""
+        summary = ReexportSummary()
+        for record in self.records():
+            project.record_results([tuple(result) for result in record["results"]], summary)
+        for output in summary.rendered:
+            summary.failed.pop(output, None)
+        project.save()
+        return summary
+
+
+def default_worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_worker(queue: WorkQueue, worker: Optional[str] = None, wait: bool = False,
+               poll_seconds: Optional[float] = None) -> int:
+    """Process jobs until the queue is drained (or forever with wait). Returns the number of jobs run."""
+    worker = worker or default_worker_name()
+    poll_seconds = poll_seconds or performance().queue_poll_seconds
+    processed = 0
+    while True:
+        job = queue.claim()
+        if job is None:
+            if queue.reap():
+                continue
+            if not wait and not queue.jobs("leased"):
+                break
+            # Other workers still hold leases that may yet expire
+            time.sleep(poll_seconds)
+            continue
+
+        stop = threading.Event()
+
+        def beat(job_id: str = job["id"]) -> None:
+            while not stop.wait(queue.lease_seconds / 3):
+                if not queue.heartbeat(job_id):
+                    logger.warning(f"{worker} lost the lease on job {job_id}")
+                    return
+
+        heartbeat = threading.Thread(target=beat, daemon=True)
+        heartbeat.start()
+        started = time.perf_counter()
+        try:
+            tasks = [ExportTask(job["source"], task["output"], task["key"], task["quad"],
+                                camera=CameraProfile.from_dict(task["quad"]["camera"], task["camera"])
+                                if task.get("camera") else None) for task in job["tasks"]]
+            results = render_source(job["source"], tasks)
+        finally:
+            stop.set()
+            heartbeat.join()
+        state = queue.complete(job, results, worker, time.perf_counter() - started)
+        logger.info(f"{worker} finished job {job['id']} ({os.path.basename(job['source'])}): {state}")
+        processed += 1
+    return processed
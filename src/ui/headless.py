@@ -0,0 +1,220 @@
+# src/ui/headless.py
+#
+# Widget-free stand-ins for UIManager, its canvases and the Tk root, so a
+# Textractor can run without a display (see src.ui.replay). HeadlessUI inherits
+# UIManager's logic (frame coalescing, status, aspect ratio handling) and only
+# replaces the widgets. HeadlessMaster is a small event loop for after()
+# callbacks that the replay drives explicitly.
+
+import heapq
+import itertools
+import logging
+import time
+from typing import Callable, List, Optional, Tuple
+
+from src.ui.ui_manager import UIManager
+
+logger = logging.getLogger(__name__)
+
+
+class HeadlessVar:
+    """tk.StringVar/BooleanVar replacement, including write traces."""
+
+    def __init__(self, value=None):
+        self._value = value
+        self._traces: List[Callable] = []
+
+    def get(self):
+        return self._value
+
+    def set(self, value) -> None:
+        self._value = value
+        for callback in self._traces:
+            callback("", "", "write")
+
+    def trace_add(self, mode, callback: Callable) -> str:
+        self._traces.append(callback)
+        return str(len(self._traces))
+
+
+class HeadlessWidget:
+    """Accepts any widget call; entries keep their text so the aspect ratio handlers can read it."""
+
+    def __init__(self, text: str = ""):
+        self.text = text
+        self.options = {"state": "normal"}
+
+    def get(self) -> str:
+        return self.text
+
+    def insert(self, index, text: str) -> None:
+        self.text += text
+
+    def delete(self, first, last=None) -> None:
+        self.text = ""
+
+    def configure(self, **options) -> None:
+        self.options.update(options)
+
+    config = configure
+
+    def cget(self, option):
+        return self.options.get(option)
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class HeadlessCanvas(HeadlessWidget):
+    """Keeps the coordinates and options of canvas items, at a fixed widget size."""
+
+    def __init__(self, width: int, height: int):
+        super().__init__()
+        self.width, self.height = width, height
+        self.items = {}
+        self._ids = itertools.count(1)
+
+    def winfo_width(self) -> int:
+        return self.width
+
+    def winfo_height(self) -> int:
+        return self.height
+
+    def canvasx(self, x: float) -> float:
+        return x
+
+    def canvasy(self, y: float) -> float:
+        return y
+
+    def _create(self, *coords, **options) -> int:
+        item = next(self._ids)
+        self.items[item] = {"coords": list(coords), **options}
+        return item
+
+    create_image = create_line = create_oval = create_text = create_rectangle = _create
+
+    def coords(self, item, *coords):
+        if coords:
+            self.items[item]["coords"] = list(coords)
+        return self.items[item]["coords"]
+
+    def itemconfigure(self, item, **options) -> None:
+        self.items[item].update(options)
+
+    def delete(self, *tags) -> None:
+        for tag in tags:
+            for item in [item for item, options in self.items.items() if tag == "all" or item == tag or
+                         tag == options.get("tags") or tag in (options.get("tags") or ())]:
+                del self.items[item]
+
+
+class HeadlessPhoto:
+    """PhotoImage replacement that only remembers its size and content."""
+
+    def __init__(self, image):
+        self.image = image
+
+    def width(self) -> int:
+        return self.image.width
+
+    def height(self) -> int:
+        return self.image.height
+
+    def paste(self, image) -> None:
+        self.image = image
+
+
+class HeadlessMaster(HeadlessWidget):
+    """Runs after() callbacks when run_until is called, in due order."""
+
+    def __init__(self):
+        super().__init__()
+        self._queue: List[Tuple[float, int, Callable, tuple]] = []
+        self._cancelled = set()
+        self._ids = itertools.count(1)
+        self.errors: List[str] = []
+
+    def after(self, delay_ms, callback: Optional[Callable] = None, *args):
+        after_id = next(self._ids)
+        heapq.heappush(self._queue, (time.perf_counter() + delay_ms / 1000, after_id, callback, args))
+        return after_id
+
+    def after_idle(self, callback: Callable, *args):
+        return self.after(0, callback, *args)
+
+    def after_cancel(self, after_id) -> None:
+        self._cancelled.add(after_id)
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def run_until(self, deadline: float) -> None:
+        """Run callbacks as they come due until deadline (perf_counter seconds)."""
+        while True:
+            now = time.perf_counter()
+            if self._queue and self._queue[0][0] <= now:
+                _, after_id, callback, args = heapq.heappop(self._queue)
+                if after_id in self._cancelled:
+                    self._cancelled.discard(after_id)
+                    continue
+                self.call(callback, *args)
+                continue
+            if now >= deadline:
+                return
+            next_due = self._queue[0][0] if self._queue else deadline
+            time.sleep(max(min(next_due, deadline) - now, 0))
+
+    def call(self, callback: Callable, *args) -> None:
+        # Tk reports exceptions in callbacks and keeps going; so does the replay
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.exception(f"Error in {getattr(callback, '__name__', callback)}")
+            self.errors.append(f"{getattr(callback, '__name__', callback)}: {e}")
+
+
+class HeadlessUI(UIManager):
+    def __init__(self, master: HeadlessMaster, controller, canvas_size: Tuple[int, int] = (900, 760),
+                 preview_size: Tuple[int, int] = (300, 300)):
+        self.master = master
+        self.controller = controller
+        self.last_valid_aspect_ratio = "1.0"
+        self._frame_callbacks = {}
+        self._frame_pending = None
+        self._status_text = "Ready"
+        self.errors = master.errors
+        controller.camera_profile_names()  # Loads the profiles the camera menu would list
+        self.canvas = HeadlessCanvas(*canvas_size)
+        self.preview_canvas = HeadlessCanvas(*preview_size)
+        for name in ("load_button", "clear_button", "save_button", "detect_button", "flip_check", "flop_check",
+                     "rotate_check", "custom_resolution_entry", "estimated_aspect_label", "recent_files_menu",
+                     "status_bar", "memory_label"):
+            setattr(self, name, HeadlessWidget())
+        self.custom_aspect_entry = HeadlessWidget("1.0")
+        self.custom_aspect_entry.configure(state="disabled")
+        for name, value in (("aspect_ratio_var", "Estimated"), ("resolution_var", None), ("quality_var", None),
+                            ("camera_var", None), ("mesh_var", None), ("postprocess_var", None),
+                            ("flip_var", False), ("flop_var", False), ("rotate_var", False)):
+            setattr(self, name, HeadlessVar(value))
+
+    def _run_frame(self):
+        self._frame_pending = None
+        callbacks, self._frame_callbacks = self._frame_callbacks, {}
+        for callback in callbacks.values():
+            self.master.call(callback)
+
+    def create_photo(self, image):
+        return HeadlessPhoto(image)
+
+    def show_error(self, title, message):
+        self.errors.append(f"{title}: {message}")
+
+    def show_info(self, title, message):
+        pass
+
+    def ask_save_duplicate(self, existing_path):
+        return True
+
+    def ask_quit(self):
+        return True
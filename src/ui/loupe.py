@@ -0,0 +1,91 @@
+# src/ui/loupe.py
+#
+# Magnifier for placing corners precisely. It shows the full-resolution source
+# (not the scaled display image) around the pointer at a fixed zoom, with a
+# crosshair on the exact sub-pixel position under the pointer. Each update reads
+# only the few source pixels under the loupe and pastes them into one PhotoImage
+# that is created once, so the canvas image itself is never re-rendered.
+
+import math
+import tkinter as tk
+from typing import Callable, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+from src.core.engine import to_rgb
+from src.core.image_processor import read_source
+from src.config.settings import LOUPE_SIZE, LOUPE_ZOOM, LOUPE_OFFSET
+
+BACKGROUND = (30, 30, 30)
+
+
+def magnify(image, x: float, y: float, size: int = LOUPE_SIZE, zoom: int = LOUPE_ZOOM) -> np.ndarray:
+    """RGB size x size view of image (array or TiledImage) with source point (x, y) at its centre, each source
+    pixel drawn as a zoom x zoom block."""
+    height, width = image.shape[:2]
+    radius = size / (2 * zoom) + 1
+    x0, y0 = max(int(math.floor(x - radius)), 0), max(int(math.floor(y - radius)), 0)
+    x1, y1 = min(int(math.ceil(x + radius)) + 1, width), min(int(math.ceil(y + radius)) + 1, height)
+    if x0 >= x1 or y0 >= y1:
+        return np.full((size, size, 3), BACKGROUND, dtype=np.uint8)
+    crop = read_source(image, (x0, y0, x1, y1), 0)
+    if crop.dtype != np.uint8:
+        crop = cv2.convertScaleAbs(crop, alpha=255.0 / np.iinfo(crop.dtype).max) \
+            if np.issubdtype(crop.dtype, np.integer) else cv2.convertScaleAbs(crop, alpha=255.0)
+    crop = to_rgb(crop)[:, :, :3]
+    # Pixel centres sit on integer coordinates, so the loupe centre maps exactly onto (x, y)
+    centre = (size - 1) / 2
+    matrix = np.float32([[zoom, 0, centre - zoom * (x - x0)], [0, zoom, centre - zoom * (y - y0)]])
+    return cv2.warpAffine(crop, matrix, (size, size), flags=cv2.INTER_NEAREST, borderMode=cv2.BORDER_CONSTANT,
+                          borderValue=BACKGROUND)
+
+
+class Loupe:
+    def __init__(self, canvas: tk.Canvas, size: int = LOUPE_SIZE, zoom: int = LOUPE_ZOOM,
+                 create_photo: Callable[[Image.Image], ImageTk.PhotoImage] = ImageTk.PhotoImage):
+        self.canvas = canvas
+        self.create_photo = create_photo
+        self.size = size
+        self.zoom = zoom
+        self.photo: Optional[ImageTk.PhotoImage] = None
+        self.items: Tuple[int, ...] = ()
+        self.label: Optional[int] = None
+
+    def _create(self) -> None:
+        self.photo = self.create_photo(Image.new("RGB", (self.size, self.size), BACKGROUND))
+        image = self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo, tags="loupe")
+        border = self.canvas.create_rectangle(0, 0, 0, 0, outline="white", tags="loupe")
+        horizontal = self.canvas.create_line(0, 0, 0, 0, fill="red", tags="loupe")
+        vertical = self.canvas.create_line(0, 0, 0, 0, fill="red", tags="loupe")
+        self.label = self.canvas.create_text(0, 0, anchor=tk.NW, fill="white", font=("TkFixedFont", 9),
+                                             tags="loupe")
+        self.items = (image, border, horizontal, vertical, self.label)
+
+    def show(self, image, x: float, y: float, pointer: Tuple[float, float], bounds: Tuple[float, float]) -> None:
+        """Magnify source point (x, y) of image next to the canvas position pointer, kept inside bounds
+        (canvas width, height)."""
+        if not self.items:
+            self._create()
+        self.photo.paste(Image.fromarray(magnify(image, x, y, self.size, self.zoom)))
+
+        # Below and to the right of the pointer, flipped to the other side near the canvas edges
+        px, py = pointer
+        left = px + LOUPE_OFFSET if px + LOUPE_OFFSET + self.size <= bounds[0] else px - LOUPE_OFFSET - self.size
+        top = py + LOUPE_OFFSET if py + LOUPE_OFFSET + self.size + 16 <= bounds[1] else py - LOUPE_OFFSET - self.size
+        image_item, border, horizontal, vertical, label = self.items
+        centre = (self.size - 1) / 2 + 0.5
+        self.canvas.coords(image_item, left, top)
+        self.canvas.coords(border, left, top, left + self.size, top + self.size)
+        self.canvas.coords(horizontal, left, top + centre, left + self.size, top + centre)
+        self.canvas.coords(vertical, left + centre, top, left + centre, top + self.size)
+        self.canvas.coords(label, left, top + self.size + 2)
+        self.canvas.itemconfigure(label, text=f"x {x:.2f}  y {y:.2f}")
+        for item in self.items:
+            self.canvas.itemconfigure(item, state=tk.NORMAL)
+        self.canvas.tag_raise("loupe")
+
+    def hide(self) -> None:
+        for item in self.items:
+            self.canvas.itemconfigure(item, state=tk.HIDDEN)
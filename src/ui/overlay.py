@@ -0,0 +1,85 @@
+# src/ui/overlay.py
+#
+# Retained-mode selection overlay. The outline, corner handles, their labels, the
+# rubber band line and the mesh grid are created once and afterwards only moved
+# with coords() or hidden, so a drag costs a handful of coordinate updates per
+# frame instead of deleting and recreating every item.
+
+import tkinter as tk
+from typing import List, Optional, Sequence, Tuple
+
+Point = Tuple[float, float]
+
+HANDLE_RADIUS = 3
+LABEL_OFFSET = 10
+
+
+class SelectionOverlay:
+    def __init__(self, canvas: tk.Canvas):
+        self.canvas = canvas
+        self.outline: Optional[int] = None
+        self.handles: List[Tuple[int, int]] = []  # (oval, label) per corner
+        self.rubber_band: Optional[int] = None
+        self.mesh_lines: List[int] = []
+        self.mesh_nodes: List[int] = []
+
+    def _show(self, item: int, visible: bool = True) -> None:
+        self.canvas.itemconfigure(item, state=tk.NORMAL if visible else tk.HIDDEN)
+
+    def set_points(self, points: Sequence[Point], show_outline: bool = True) -> None:
+        """Move the corner handles (and the closed outline through them) to points."""
+        if self.outline is None:
+            self.outline = self.canvas.create_line(0, 0, 0, 0, fill="cyan", width=2, tags=("overlay", "polygon"))
+        if len(points) > 1 and show_outline:
+            closed = list(points) + ([points[0]] if len(points) > 2 else [])
+            self.canvas.coords(self.outline, *[value for point in closed for value in point])
+            self._show(self.outline)
+        else:
+            self._show(self.outline, False)
+
+        while len(self.handles) < len(points):
+            oval = self.canvas.create_oval(0, 0, 0, 0, fill="red", outline="white", tags=("overlay", "points"))
+            label = self.canvas.create_text(0, 0, text=str(len(self.handles) + 1), fill="white",
+                                            tags=("overlay", "points"))
+            self.handles.append((oval, label))
+        for i, (oval, label) in enumerate(self.handles):
+            visible = i < len(points)
+            if visible:
+                x, y = points[i]
+                self.canvas.coords(oval, x - HANDLE_RADIUS, y - HANDLE_RADIUS, x + HANDLE_RADIUS, y + HANDLE_RADIUS)
+                self.canvas.coords(label, x + LABEL_OFFSET, y + LABEL_OFFSET)
+            self._show(oval, visible)
+            self._show(label, visible)
+
+    def set_rubber_band(self, start: Optional[Point], end: Optional[Point] = None) -> None:
+        """The line from the last placed corner to the pointer, or hidden when start is None."""
+        if self.rubber_band is None:
+            self.rubber_band = self.canvas.create_line(0, 0, 0, 0, fill="yellow", width=2,
+                                                       tags=("overlay", "temp_line"))
+        if start is None or end is None:
+            self._show(self.rubber_band, False)
+            return
+        self.canvas.coords(self.rubber_band, *start, *end)
+        self._show(self.rubber_band)
+
+    def set_mesh(self, lines: Sequence[Sequence[Point]], nodes: Sequence[Point]) -> None:
+        """Grid lines (each a polyline) and interior control points; items are only created when the grid grows."""
+        while len(self.mesh_lines) < len(lines):
+            self.mesh_lines.append(self.canvas.create_line(0, 0, 0, 0, fill="cyan", width=1, tags=("overlay", "mesh")))
+        while len(self.mesh_nodes) < len(nodes):
+            self.mesh_nodes.append(self.canvas.create_oval(0, 0, 0, 0, fill="yellow", outline="white",
+                                                           tags=("overlay", "mesh")))
+        for i, item in enumerate(self.mesh_lines):
+            if i < len(lines):
+                self.canvas.coords(item, *[value for point in lines[i] for value in point])
+            self._show(item, i < len(lines))
+        for i, item in enumerate(self.mesh_nodes):
+            if i < len(nodes):
+                x, y = nodes[i]
+                self.canvas.coords(item, x - HANDLE_RADIUS, y - HANDLE_RADIUS, x + HANDLE_RADIUS, y + HANDLE_RADIUS)
+            self._show(item, i < len(nodes))
+
+    def clear(self) -> None:
+        self.set_points([])
+        self.set_rubber_band(None)
+        self.set_mesh([], [])
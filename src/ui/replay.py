@@ -0,0 +1,306 @@
+# src/ui/replay.py
+#
+# Record GUI sessions as event traces and replay them without a display, to
+# measure what a user feels: the time from an input event to the preview that
+# reflects it. InteractionRecorder wraps the Textractor handlers of a live
+# session and saves the pointer events, resizes, menu choices and toggles with
+# their timestamps. replay() feeds a trace to a Textractor built on the headless
+# UI (src.ui.headless) at the recorded pace, with the real frame coalescing,
+# worker pool and polling, and reports latency percentiles, extractions that
+# were coalesced away or finished stale, and the CPU time spent.
+#
+#   python -m src.ui.replay tests/traces/place_and_drag.json --image wall.png=photos/wall.png
+
+import argparse
+import functools
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from src.ui.headless import HeadlessMaster, HeadlessUI
+
+logger = logging.getLogger(__name__)
+
+TRACE_VERSION = 1
+POINTER_HANDLERS = ("on_press", "on_release", "on_drag", "on_move")
+RECORDED_CALLS = ("load_image", "clear_selection", "undo", "redo", "auto_detect", "update_output_resolution",
+                  "update_quality_profile", "update_camera_profile", "update_mesh_grid", "update_postprocess")
+# Toggles and menus whose widget command reads the variable rather than passing the value on
+RECORDED_VARIABLES = ("aspect_ratio_var", "flip_var", "flop_var", "rotate_var")
+
+
+class InteractionRecorder:
+    """Records the user input of a running Textractor. Handlers called from other handlers (undo setting the
+    flip variable, load_image clearing the selection) are not recorded, since replaying the outer one repeats them."""
+
+    def __init__(self, app):
+        self.app = app
+        self.events: List[dict] = []
+        self._origin = time.perf_counter()
+        self._depth = 0
+        self._canvas_size = self._sizes()
+
+        for name in POINTER_HANDLERS:
+            self._wrap(name, self._pointer_event(name))
+        self._wrap("on_resize", self._resize_event)
+        for name in RECORDED_CALLS:
+            self._wrap(name, self._call_event(name))
+        for name in RECORDED_VARIABLES:
+            variable = getattr(app.ui, name)
+            variable.trace_add("write", lambda *args, name=name, variable=variable: self._variable_event(name,
+                                                                                                        variable))
+        # The widgets kept the original bound methods; hand them the wrapped ones
+        app.ui.setup_bindings(app.on_press, app.on_release, app.on_drag, app.on_move, app.on_resize, app.on_closing)
+        app.setup_ui_commands()
+        app.setup_keyboard_shortcuts()
+
+    def _sizes(self) -> dict:
+        ui = self.app.ui
+        return {"canvas": [ui.canvas.winfo_width(), ui.canvas.winfo_height()],
+                "preview": [ui.preview_canvas.winfo_width(), ui.preview_canvas.winfo_height()]}
+
+    def _wrap(self, name: str, record) -> None:
+        handler = getattr(self.app, name)
+
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            outermost = self._depth == 0
+            t = time.perf_counter() - self._origin
+            self._depth += 1
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                self._depth -= 1
+                if outermost:
+                    event = record(*args, **kwargs)
+                    if event is not None:
+                        self.events.append({"t": round(t, 4), **event})
+
+        setattr(self.app, name, wrapper)
+
+    def _pointer_event(self, name: str):
+        return lambda event: {"type": "pointer", "handler": name, "x": event.x, "y": event.y}
+
+    def _resize_event(self, event=None) -> Optional[dict]:
+        # <Configure> fires for every widget in the window; only canvas size changes matter
+        sizes = self._sizes()
+        if sizes == self._canvas_size:
+            return None
+        self._canvas_size = sizes
+        return {"type": "resize", **sizes}
+
+    def _call_event(self, name: str):
+        def record(*args, **kwargs) -> Optional[dict]:
+            args = [arg for arg in args if not hasattr(arg, "widget")]  # Key bindings pass their event
+            if name == "load_image":
+                # The path chosen in the file dialog, or nothing when it was cancelled or failed
+                if self.app.image_path is None or (args and args[0] != self.app.image_path):
+                    return None
+                args = [self.app.image_path]
+            return {"type": "call", "method": name, "args": args}
+        return record
+
+    def _variable_event(self, name: str, variable) -> None:
+        if self._depth == 0:
+            self.events.append({"t": round(time.perf_counter() - self._origin, 4), "type": "variable", "name": name,
+                                "value": variable.get()})
+
+    def trace(self) -> dict:
+        return {"version": TRACE_VERSION, **self._sizes(), "events": self.events}
+
+    def save(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.trace(), f, indent=1)
+        logger.info(f"Recorded {len(self.events)} events to {path}")
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile, in the same way as the profiler's handler summary."""
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+
+@dataclass
+class ReplayReport:
+    events: int = 0
+    latencies_ms: List[float] = field(default_factory=list)  # Event to displayed preview, per event that changed it
+    requested: int = 0  # Extraction requests (extract_texture calls)
+    skipped: int = 0  # Requests made while there was no complete selection to extract
+    submitted: int = 0  # Extractions started; the other requests were coalesced into the same frame
+    displayed: int = 0  # Results shown; the rest were superseded by a newer extraction while running
+    unanswered: int = 0  # Events that asked for an extraction but never saw its preview
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0  # Process CPU time, worker threads included
+    ui_cpu_seconds: float = 0.0  # CPU time of the thread running the handlers
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def coalesced(self) -> int:
+        return self.requested - self.skipped - self.submitted
+
+    @property
+    def stale(self) -> int:
+        return self.submitted - self.displayed
+
+    def summary(self) -> str:
+        latencies = self.latencies_ms
+        lines = [f"{self.events} events in {self.wall_seconds:.2f} s, CPU {self.cpu_seconds:.2f} s "
+                 f"(UI thread {self.ui_cpu_seconds:.2f} s)",
+                 f"Extractions: {self.requested} requested, {self.skipped} skipped, {self.coalesced} coalesced, "
+                 f"{self.submitted} submitted, {self.stale} stale, {self.displayed} displayed",
+                 f"Event to preview: {len(latencies)} events, p50 {percentile(latencies, 0.5):.1f} ms, "
+                 f"p90 {percentile(latencies, 0.9):.1f} ms, p99 {percentile(latencies, 0.99):.1f} ms, "
+                 f"max {max(latencies, default=0.0):.1f} ms, {self.unanswered} unanswered"]
+        lines += [f"Error: {error}" for error in self.errors]
+        return "\n".join(lines)
+
+
+def resolve_image(path: str, images: Dict[str, str], base_dir: str) -> str:
+    """Where to find an image named in a trace: a mapping by full path or file name, else relative to the trace."""
+    for key in (path, os.path.basename(path)):
+        if key in images:
+            return images[key]
+    return path if os.path.isabs(path) else os.path.join(base_dir, path)
+
+
+def load_trace(path: str) -> dict:
+    with open(path) as f:
+        trace = json.load(f)
+    if trace.get("version") != TRACE_VERSION:
+        raise ValueError(f"Unsupported trace version {trace.get('version')} in {path}")
+    trace.setdefault("base_dir", os.path.dirname(os.path.abspath(path)))
+    return trace
+
+
+def replay(trace: dict, images: Optional[Dict[str, str]] = None, speed: float = 1.0,
+           settle: float = 10.0) -> ReplayReport:
+    """Play trace (see load_trace) against a headless Textractor at speed times the recorded pace, then wait up to
+    settle seconds for outstanding extractions."""
+    # Imported here so the recorder can be used from inside the application
+    from src.core.textractor import Textractor
+
+    images = images or {}
+    base_dir = trace.get("base_dir", os.getcwd())
+    master = HeadlessMaster()
+    app = Textractor(master, ui_factory=lambda root, controller: HeadlessUI(
+        root, controller, tuple(trace["canvas"]), tuple(trace["preview"])))
+    app.add_recent_file = lambda file_path: None  # A replay should not touch the user's recent files
+    report = ReplayReport(events=len(trace["events"]), errors=master.errors)
+
+    current: List[Optional[float]] = [None]  # Start time of the event being dispatched
+    requesting: List[float] = []  # Events whose extraction request has not been submitted yet
+    requests = [0]  # Requests waiting for the next frame
+    in_flight = []  # (future, event times) in submission order
+
+    request_extraction = app.extract_texture
+    submit_extraction = app._submit_extraction
+    poll = app.check_thread
+
+    def extract_texture():
+        report.requested += 1
+        requests[0] += 1
+        if current[0] is not None and current[0] not in requesting:
+            requesting.append(current[0])
+        request_extraction()
+
+    def _submit_extraction():
+        previous = app.future
+        submit_extraction()
+        if app.future is not previous:
+            report.submitted += 1
+            in_flight.append((app.future, list(requesting)))
+        elif not app.session.is_ready:
+            report.skipped += requests[0]
+        requesting.clear()
+        requests[0] = 0
+
+    def check_thread():
+        future = app.future
+        poll()
+        if future is None or not future.done():
+            return
+        now = time.perf_counter()
+        shown = future.exception() is None
+        report.displayed += shown
+        # Superseded extractions were never shown; their events are answered by this preview (or its error)
+        while in_flight:
+            done_future, times = in_flight.pop(0)
+            if shown:
+                report.latencies_ms += [(now - t) * 1000 for t in times]
+            if done_future is future:
+                break
+
+    app.extract_texture, app._submit_extraction, app.check_thread = extract_texture, _submit_extraction, check_thread
+
+    start = time.perf_counter()
+    cpu_start, ui_cpu_start = time.process_time(), time.thread_time()
+    for event in trace["events"]:
+        due = start + event["t"] / speed
+        master.run_until(due)
+        current[0] = time.perf_counter()
+        master.call(dispatch, app, event, images, base_dir)
+        current[0] = None
+    # Let the last frame run and outstanding extractions finish
+    deadline = time.perf_counter() + settle
+    while time.perf_counter() < deadline and (in_flight or requesting or app.ui._frame_pending is not None):
+        master.run_until(min(time.perf_counter() + 0.01, deadline))
+    report.wall_seconds = time.perf_counter() - start
+    report.cpu_seconds = time.process_time() - cpu_start
+    report.ui_cpu_seconds = time.thread_time() - ui_cpu_start
+    report.unanswered = len(requesting) + sum(len(times) for _, times in in_flight)
+    return report
+
+
+def dispatch(app, event: dict, images: Dict[str, str], base_dir: str) -> None:
+    kind = event["type"]
+    if kind == "pointer":
+        getattr(app, event["handler"])(SimpleNamespace(x=event["x"], y=event["y"]))
+    elif kind == "resize":
+        app.ui.canvas.width, app.ui.canvas.height = event["canvas"]
+        app.ui.preview_canvas.width, app.ui.preview_canvas.height = event["preview"]
+        app.on_resize(None)
+    elif kind == "call":
+        args = list(event.get("args", []))
+        if event["method"] == "load_image":
+            args = [resolve_image(args[0], images, base_dir)]
+        getattr(app, event["method"])(*args)
+    elif kind == "variable":
+        getattr(app.ui, event["name"]).set(event["value"])
+        # What the widget's command does after setting the variable
+        if event["name"] == "aspect_ratio_var":
+            app.ui.update_aspect_ratio(event["value"])
+        else:
+            app.update_preview()
+    else:
+        raise ValueError(f"Unknown trace event type: {kind}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a recorded GUI session without a display")
+    parser.add_argument("traces", nargs="+", help="Trace files written by run.py --record")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed relative to the recording")
+    parser.add_argument("--image", action="append", default=[], metavar="NAME=PATH",
+                        help="Where to find an image the trace loads (by recorded path or file name)")
+    parser.add_argument("--json", action="store_true", help="Print the reports as JSON")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(name)s: %(levelname)s %(message)s')
+
+    images = dict(item.split("=", 1) for item in args.image)
+    failed = False
+    for path in args.traces:
+        report = replay(load_trace(path), images, args.speed)
+        failed = failed or bool(report.errors)
+        if args.json:
+            print(json.dumps({"trace": path, **asdict(report), "coalesced": report.coalesced,
+                              "stale": report.stale}))
+        else:
+            print(f"{path}\n{report.summary()}\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
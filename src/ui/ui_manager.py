@@ -5,14 +5,21 @@ from tkinter import ttk, messagebox, filedialog
 from tkhtmlview import HTMLLabel
 from src.config.settings import ABOUT_TEXT, UI_TEXTS, SUPPORTED_IMAGE_TYPES, WINDOW_WIDTH, WINDOW_HEIGHT, \
     MIN_WINDOW_WIDTH, MIN_WINDOW_HEIGHT
-from src.config.settings import LICENSE_WARNING, BANNER_PATH
+from src.config.settings import LICENSE_WARNING, BANNER_PATH, QUALITY_PROFILES, DEFAULT_QUALITY_PROFILE, \
+    RESOLUTION_OPTIONS, DEFAULT_RESOLUTION, PROJECT_FILE_TYPES, SAVE_IMAGE_TYPES, EXPORT_PRESETS, NO_CAMERA, \
+    MESH_OFF, MESH_GRID_OPTIONS, POSTPROCESS_NONE, POSTPROCESS_PRESETS, FRAME_INTERVAL_MS
 from PIL import Image, ImageTk
+from src.utils.profiler import traced
 
 class UIManager:
     def __init__(self, master: tk.Tk, controller):
         self.master = master
         self.controller = controller
         self.last_valid_aspect_ratio = "1.0"
+        # Callbacks waiting for the next frame, one per key, and the after() id that will run them
+        self._frame_callbacks = {}
+        self._frame_pending = None
+        self._status_text = "Ready"
         self.setup_ui()
         self.create_menu()
         self.create_status_bar()
@@ -60,6 +67,9 @@ class UIManager:
         self.save_button = ttk.Button(self.control_frame, text=UI_TEXTS["save_button"])
         self.save_button.pack(fill=tk.X, pady=2)
 
+        self.detect_button = ttk.Button(self.control_frame, text=UI_TEXTS["detect_button"])
+        self.detect_button.pack(fill=tk.X, pady=2)
+
         # Aspect ratio options
         aspect_ratio_frame = ttk.Frame(self.control_frame)
         aspect_ratio_frame.pack(fill=tk.X, pady=(5, 0))
@@ -95,14 +105,49 @@ class UIManager:
         resolution_frame = ttk.Frame(self.control_frame)
         resolution_frame.pack(fill=tk.X, pady=(5, 0))
         ttk.Label(resolution_frame, text="Output Resolution:").pack(side=tk.LEFT)
-        self.resolution_var = tk.StringVar(value="Original")
-        resolution_options = ["Original", "1024x1024", "2048x2048", "4096x4096", "Custom"]
-        self.resolution_menu = ttk.OptionMenu(resolution_frame, self.resolution_var, "Original", *resolution_options,
-                                              command=self.update_resolution)
+        self.resolution_var = tk.StringVar(value=DEFAULT_RESOLUTION)
+        self.resolution_menu = ttk.OptionMenu(resolution_frame, self.resolution_var, DEFAULT_RESOLUTION,
+                                              *RESOLUTION_OPTIONS, command=self.update_resolution)
         self.resolution_menu.pack(side=tk.LEFT, padx=(5, 10))
         self.custom_resolution_entry = ttk.Entry(resolution_frame, width=10, state='disabled')
         self.custom_resolution_entry.pack(side=tk.LEFT)
 
+        # Warp quality/speed profile
+        quality_frame = ttk.Frame(self.control_frame)
+        quality_frame.pack(fill=tk.X, pady=(5, 0))
+        ttk.Label(quality_frame, text=UI_TEXTS["quality_label"]).pack(side=tk.LEFT)
+        self.quality_var = tk.StringVar(value=DEFAULT_QUALITY_PROFILE)
+        self.quality_menu = ttk.OptionMenu(quality_frame, self.quality_var, DEFAULT_QUALITY_PROFILE,
+                                           *QUALITY_PROFILES.keys(), command=self.update_quality)
+        self.quality_menu.pack(side=tk.LEFT, padx=(5, 10))
+
+        # Lens correction profile
+        camera_frame = ttk.Frame(self.control_frame)
+        camera_frame.pack(fill=tk.X, pady=(5, 0))
+        ttk.Label(camera_frame, text=UI_TEXTS["camera_label"]).pack(side=tk.LEFT)
+        self.camera_var = tk.StringVar(value=NO_CAMERA)
+        self.camera_menu = ttk.OptionMenu(camera_frame, self.camera_var, NO_CAMERA,
+                                          *self.controller.camera_profile_names(), command=self.update_camera)
+        self.camera_menu.pack(side=tk.LEFT, padx=(5, 10))
+
+        # Control grid for curved surfaces
+        mesh_frame = ttk.Frame(self.control_frame)
+        mesh_frame.pack(fill=tk.X, pady=(5, 0))
+        ttk.Label(mesh_frame, text=UI_TEXTS["mesh_label"]).pack(side=tk.LEFT)
+        self.mesh_var = tk.StringVar(value=MESH_OFF)
+        self.mesh_menu = ttk.OptionMenu(mesh_frame, self.mesh_var, MESH_OFF, *MESH_GRID_OPTIONS,
+                                        command=self.update_mesh)
+        self.mesh_menu.pack(side=tk.LEFT, padx=(5, 10))
+
+        # Post-processing chain applied to the preview and the saved texture
+        postprocess_frame = ttk.Frame(self.control_frame)
+        postprocess_frame.pack(fill=tk.X, pady=(5, 0))
+        ttk.Label(postprocess_frame, text=UI_TEXTS["postprocess_label"]).pack(side=tk.LEFT)
+        self.postprocess_var = tk.StringVar(value=POSTPROCESS_NONE)
+        self.postprocess_menu = ttk.OptionMenu(postprocess_frame, self.postprocess_var, POSTPROCESS_NONE,
+                                               *POSTPROCESS_PRESETS, command=self.update_postprocess)
+        self.postprocess_menu.pack(side=tk.LEFT, padx=(5, 10))
+
         # Image transformation options
         self.flip_var = tk.BooleanVar()
         self.flip_check = ttk.Checkbutton(self.control_frame, text=UI_TEXTS["flip_checkbox"], variable=self.flip_var)
@@ -163,13 +208,21 @@ class UIManager:
         # File menu
         file_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="File", menu=file_menu)
-        file_menu.add_command(label="Open", command=self.controller.load_image)
+        # Looked up when clicked, so a session recorder can wrap it (see src.ui.replay)
+        file_menu.add_command(label="Open", command=lambda: self.controller.load_image())
 
         # Recent files submenu
         self.recent_files_menu = tk.Menu(file_menu, tearoff=0)
         file_menu.add_cascade(label="Open Recent", menu=self.recent_files_menu)
         self.update_recent_files_menu()
 
+        file_menu.add_separator()
+        export_menu = tk.Menu(file_menu, tearoff=0)
+        file_menu.add_cascade(label="Export Set", menu=export_menu)
+        for preset in EXPORT_PRESETS:
+            export_menu.add_command(label=preset + "...", command=lambda p=preset: self.controller.export_set(p))
+        file_menu.add_command(label="Add Selection to Project...", command=self.controller.add_to_project)
+
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.master.quit)
 
@@ -180,8 +233,12 @@ class UIManager:
         help_menu.add_command(label="About", command=self.show_about)
 
     def create_status_bar(self):
-        self.status_bar = ttk.Label(self.master, text="Ready", relief=tk.SUNKEN, anchor=tk.W)
-        self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        status_frame = ttk.Frame(self.master)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        self.memory_label = ttk.Label(status_frame, text="", relief=tk.SUNKEN, anchor=tk.E)
+        self.memory_label.pack(side=tk.RIGHT)
+        self.status_bar = ttk.Label(status_frame, text="Ready", relief=tk.SUNKEN, anchor=tk.W)
+        self.status_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
     def update_aspect_ratio(self, value):
         if value == "Estimated":
@@ -253,6 +310,18 @@ class UIManager:
             self.custom_resolution_entry.config(state='disabled')
         self.controller.update_output_resolution(value)
 
+    def update_quality(self, value):
+        self.controller.update_quality_profile(value)
+
+    def update_camera(self, value):
+        self.controller.update_camera_profile(None if value == NO_CAMERA else value)
+
+    def update_mesh(self, value):
+        self.controller.update_mesh_grid(value)
+
+    def update_postprocess(self, value):
+        self.controller.update_postprocess(value)
+
     def show_user_guide(self):
         guide_window = tk.Toplevel(self.master)
         guide_window.title("Textractor User Guide")
@@ -288,9 +357,37 @@ class UIManager:
     def show_about(self):
         messagebox.showinfo("About Textractor", ABOUT_TEXT)
 
-    def update_status(self, message):
-        self.status_bar.config(text=message)
-        self.master.update_idletasks()
+    def request_frame(self, key, callback):
+        """Run callback at the next frame; a later request with the same key replaces the earlier one."""
+        self._frame_callbacks[key] = callback
+        if self._frame_pending is None:
+            self._frame_pending = self.master.after(FRAME_INTERVAL_MS, self._run_frame)
+
+    def _run_frame(self):
+        self._frame_pending = None
+        callbacks, self._frame_callbacks = self._frame_callbacks, {}
+        for callback in callbacks.values():
+            callback()
+
+    @traced
+    def update_status(self, message, immediate=False):
+        """Show message with the next frame, or right away (before blocking work) when immediate."""
+        self._status_text = message
+        if immediate:
+            self.status_bar.config(text=message)
+            self.master.update_idletasks()
+        else:
+            self.request_frame("status", self._show_status)
+
+    def _show_status(self):
+        self.status_bar.config(text=self._status_text)
+
+    def create_photo(self, image):
+        """A PhotoImage of a PIL image, for the canvases."""
+        return ImageTk.PhotoImage(image=image)
+
+    def update_memory(self, text):
+        self.memory_label.config(text=text)
 
     def setup_bindings(self, on_press, on_release, on_drag, on_move, on_resize, on_closing):
         self.canvas.bind("<ButtonPress-1>", on_press)
@@ -306,6 +403,10 @@ class UIManager:
     def show_info(self, title, message):
         messagebox.showinfo(title, message)
 
+    def ask_save_duplicate(self, existing_path):
+        return messagebox.askyesno("Possible Duplicate",
+                                   f"A near-identical texture already exists:\n{existing_path}\n\nSave anyway?")
+
     def ask_quit(self):
         return messagebox.askokcancel("Quit", "Do you want to quit?")
 
@@ -315,5 +416,18 @@ class UIManager:
             filetypes=SUPPORTED_IMAGE_TYPES
         )
 
+    def get_export_file_path(self, mip_chain=False):
+        if mip_chain:
+            return filedialog.asksaveasfilename(defaultextension=".dds",
+                                                filetypes=[("DDS files (block compressed)", "*.dds")])
+        return filedialog.asksaveasfilename(defaultextension=".png", filetypes=SAVE_IMAGE_TYPES)
+
+    def get_project_file_path(self):
+        return filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=PROJECT_FILE_TYPES,
+            confirmoverwrite=False
+        )
+
     def get_open_file_path(self):
         return filedialog.askopenfilename(filetypes=SUPPORTED_IMAGE_TYPES)
\ No newline at end of file
@@ -7,4 +7,7 @@ class ImageLoadError(TextractorError):
     """Raised when an image fails to load"""
 
 class TextureExtractionError(TextractorError):
-    """Raised when texture extraction fails"""
\ No newline at end of file
+    """Raised when texture extraction fails"""
+
+class TextureSaveError(TextractorError):
+    """Raised when an extracted texture cannot be written"""
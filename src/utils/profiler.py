@@ -0,0 +1,169 @@
+# src/utils/profiler.py
+#
+# Profiling mode for tracking down GUI freezes. When enabled, every Tk callback
+# (bindings, widget commands and after() handlers all go through
+# tkinter.CallWrapper) is timed, handlers that exceed the frame budget are logged
+# as stalls, and spans from the extraction worker threads are recorded alongside
+# them. save() writes a Chrome trace (chrome://tracing, ui.perfetto.dev) with one
+# track per thread.
+#
+# Disabled, span() and traced() cost one global lookup.
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from src.config.settings import PROFILE_STALL_MS
+
+logger = logging.getLogger(__name__)
+
+
+class Tracer:
+    """Collects complete ("X") trace events and per-handler latencies from any thread."""
+
+    def __init__(self, stall_ms: float = PROFILE_STALL_MS):
+        self.stall_ms = stall_ms
+        self.events: List[dict] = []
+        self.latencies: Dict[str, List[float]] = {}
+        self.stalls: Dict[str, int] = {}
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+
+    def record(self, name: str, category: str, start: float, end: float, args: Optional[dict] = None) -> None:
+        thread = threading.current_thread()
+        event = {"name": name, "cat": category, "ph": "X", "pid": self._pid, "tid": thread.ident,
+                 "ts": (start - self._origin) * 1e6, "dur": (end - start) * 1e6}
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._threads.setdefault(thread.ident, thread.name)
+            self.events.append(event)
+
+    def record_handler(self, name: str, start: float, end: float) -> None:
+        """A Tk handler on the UI thread: recorded as a span and counted towards its latency statistics."""
+        milliseconds = (end - start) * 1000
+        stalled = milliseconds > self.stall_ms
+        self.record(name, "tk", start, end, {"stall": True} if stalled else None)
+        with self._lock:
+            self.latencies.setdefault(name, []).append(milliseconds)
+            if stalled:
+                self.stalls[name] = self.stalls.get(name, 0) + 1
+        if stalled:
+            logger.warning(f"UI stall: {name} took {milliseconds:.0f} ms (budget {self.stall_ms:.0f} ms)")
+
+    def trace(self) -> dict:
+        with self._lock:
+            metadata = [{"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+                        for tid, name in self._threads.items()]
+            return {"traceEvents": metadata + list(self.events), "displayTimeUnit": "ms"}
+
+    def save(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.trace(), f)
+
+    def summary(self) -> str:
+        """Per-handler latency table, slowest worst case first."""
+        with self._lock:
+            latencies = {name: sorted(values) for name, values in self.latencies.items()}
+        lines = [f"{'handler':<40} {'calls':>6} {'mean ms':>8} {'p95 ms':>8} {'max ms':>8} {'stalls':>6}"]
+        for name, values in sorted(latencies.items(), key=lambda item: item[1][-1], reverse=True):
+            p95 = values[min(int(len(values) * 0.95), len(values) - 1)]
+            lines.append(f"{name:<40} {len(values):>6} {sum(values) / len(values):>8.1f} {p95:>8.1f} "
+                         f"{values[-1]:>8.1f} {self.stalls.get(name, 0):>6}")
+        return "\n".join(lines)
+
+
+_tracer: Optional[Tracer] = None
+_original_call_wrapper = None
+
+
+def handler_name(func: Callable) -> str:
+    name = getattr(func, "__qualname__", None) or type(func).__name__
+    if ".after.<locals>." in name:
+        # after() wraps its handler in a closure that only keeps the handler's __name__
+        return f"after:{func.__name__}"
+    return name
+
+
+def _profiling_call_wrapper(base: type) -> type:
+    class ProfilingCallWrapper(base):
+        """tkinter.CallWrapper that times every callback it dispatches."""
+
+        def __call__(self, *args):
+            tracer = _tracer
+            if tracer is None:
+                return super().__call__(*args)
+            start = time.perf_counter()
+            try:
+                return super().__call__(*args)
+            finally:
+                tracer.record_handler(handler_name(self.func), start, time.perf_counter())
+
+    return ProfilingCallWrapper
+
+
+def enable(stall_ms: float = PROFILE_STALL_MS) -> Tracer:
+    """Start profiling. Must run before the widgets whose callbacks should be timed are created."""
+    # Imported here so engine code can use span() without pulling in tkinter
+    import tkinter
+
+    global _tracer, _original_call_wrapper
+    _tracer = Tracer(stall_ms)
+    if _original_call_wrapper is None:
+        _original_call_wrapper = tkinter.CallWrapper
+        tkinter.CallWrapper = _profiling_call_wrapper(_original_call_wrapper)
+    logger.info(f"Profiling enabled, stall budget {stall_ms:.0f} ms")
+    return _tracer
+
+
+def disable() -> Optional[Tracer]:
+    global _tracer, _original_call_wrapper
+    tracer, _tracer = _tracer, None
+    if _original_call_wrapper is not None:
+        import tkinter
+
+        tkinter.CallWrapper = _original_call_wrapper
+        _original_call_wrapper = None
+    return tracer
+
+
+def active() -> Optional[Tracer]:
+    return _tracer
+
+
+@contextmanager
+def span(name: str, category: str = "app", **args) -> Iterator[None]:
+    """Record the enclosed block on the current thread's track."""
+    tracer = _tracer
+    if tracer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        tracer.record(name, category, start, time.perf_counter(), args or None)
+
+
+def traced(func: Callable) -> Callable:
+    """Decorator form of span(), named after the function."""
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        tracer = _tracer
+        if tracer is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            tracer.record(name, "app", start, time.perf_counter())
+    return wrapper
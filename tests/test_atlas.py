@@ -0,0 +1,59 @@
+# tests/test_atlas.py
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from src.core.atlas import build_atlas, pack, write_atlas
+
+
+class TestAtlas(unittest.TestCase):
+    def test_pack_without_overlap(self):
+        rng = np.random.default_rng(1)
+        sizes = [(f"t{i}", int(w), int(h)) for i, (w, h) in enumerate(rng.integers(8, 200, (150, 2)))]
+        placements, page_sizes = pack(sizes, padding=2, max_size=1024)
+
+        self.assertEqual(len(placements), len(sizes))
+        for page, (width, height) in enumerate(page_sizes):
+            occupied = np.zeros((height, width), dtype=np.uint8)
+            for p in placements:
+                if p.page == page:
+                    self.assertGreaterEqual(min(p.x, p.y), 2)
+                    self.assertLessEqual(p.x + p.width + 2, width)
+                    self.assertLessEqual(p.y + p.height + 2, height)
+                    occupied[p.y - 2:p.y + p.height + 2, p.x - 2:p.x + p.width + 2] += 1
+            self.assertLessEqual(occupied.max(), 1)
+
+    def test_build_atlas_bleeds_edges(self):
+        red = np.zeros((10, 20, 3), dtype=np.uint8)
+        red[:, :] = (0, 0, 255)
+        green = np.zeros((30, 5, 3), dtype=np.uint8)
+        green[:, :] = (0, 255, 0)
+        pages, uv_map = build_atlas([("red", red), ("green", green)], padding=3)
+
+        self.assertEqual(len(pages), 1)
+        entry = uv_map["textures"]["red"]
+        x, y = entry["x"], entry["y"]
+        region = pages[0][y - 3:y + 13, x - 3:x + 23]
+        self.assertTrue((region == (0, 0, 255)).all())
+        self.assertAlmostEqual(entry["u0"], x / pages[0].shape[1])
+
+    def test_write_atlas(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            textures = [(f"t{i}", np.full((64, 64, 4), i, dtype=np.uint8)) for i in range(20)]
+            uv_map = write_atlas(os.path.join(tmp_dir, "atlas.png"), textures, max_size=256)
+            self.assertGreater(len(uv_map["pages"]), 1)
+            with open(os.path.join(tmp_dir, "atlas.json")) as f:
+                self.assertEqual(len(json.load(f)["textures"]), 20)
+            page = cv2.imread(os.path.join(tmp_dir, "atlas.png"), cv2.IMREAD_UNCHANGED)
+            self.assertEqual(page.shape[2], 4)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+# tests/test_block_compression.py
+
+import os
+import shutil
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from PIL import Image
+from src.core.block_compression import choose_format, compress, dds_header, write_dds
+from src.core.engine import save_texture
+
+
+def smooth_image(width: int, height: int, alpha: bool = False) -> np.ndarray:
+    x, y = np.meshgrid(np.linspace(0, 255, width), np.linspace(0, 255, height))
+    channels = [x, y, (x + y) / 2] + ([255 - x] if alpha else [])
+    return np.dstack(channels).astype(np.uint8)
+
+
+class TestBlockCompression(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def round_trip(self, image: np.ndarray, block_format: str, quality: str = "normal") -> np.ndarray:
+        path = os.path.join(self.tmp_dir, f"{block_format}_{quality}.dds")
+        write_dds(path, [image], block_format, quality)
+        with Image.open(path) as decoded:
+            return np.asarray(decoded.convert("RGBA"))
+
+    def test_formats_decode(self):
+        image = smooth_image(64, 64, alpha=True)
+        expected = cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA).astype(int)
+        for block_format, color_tolerance in (("BC1", 5), ("BC3", 5), ("BC7", 4)):
+            for quality in ("fast", "normal", "high"):
+                decoded = self.round_trip(image, block_format, quality).astype(int)
+                rms = np.sqrt(((decoded[:, :, :3] - expected[:, :, :3]) ** 2).mean())
+                self.assertLess(rms, color_tolerance, (block_format, quality))
+                if block_format != "BC1":
+                    self.assertLess(np.abs(decoded[:, :, 3] - expected[:, :, 3]).mean(), 3, (block_format, quality))
+
+    def test_block_sizes(self):
+        image = smooth_image(10, 6)
+        # 3x2 blocks, padded by edge replication
+        self.assertEqual(len(compress(image, "BC1")), 6 * 8)
+        self.assertEqual(len(compress(image, "BC3")), 6 * 16)
+        self.assertEqual(len(compress(image, "BC7")), 6 * 16)
+        self.assertEqual(self.round_trip(image, "BC1").shape, (6, 10, 4))
+
+    def test_header(self):
+        header = dds_header(256, 128, "BC1", mip_count=9)
+        self.assertEqual(len(header), 128)
+        self.assertTrue(header.startswith(b"DDS "))
+        self.assertIn(b"DXT1", header)
+        self.assertEqual(len(dds_header(256, 128, "BC7")), 148)
+
+    def test_auto_format(self):
+        self.assertEqual(choose_format(smooth_image(8, 8)), "BC1")
+        self.assertEqual(choose_format(smooth_image(8, 8, alpha=True)), "BC3")
+        self.assertEqual(choose_format(smooth_image(8, 8, alpha=True), "BC7"), "BC7")
+
+    def test_save_texture_writes_dds(self):
+        path = os.path.join(self.tmp_dir, "texture.dds")
+        save_texture(path, smooth_image(32, 32))
+        with Image.open(path) as decoded:
+            self.assertEqual(decoded.size, (32, 32))
+        self.assertEqual(os.listdir(self.tmp_dir), ["texture.dds"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+# tests/test_camera.py
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from src.core import camera as camera_module
+from src.core.camera import CameraProfile, camera_maps, clear_map_cache, get_camera_profile, load_camera_profiles
+from src.core.engine import ExtractionSession
+from src.core.image_processor import ImageProcessor
+
+
+def checkerboard(width, height, square):
+    y, x = np.mgrid[0:height, 0:width]
+    board = (((x // square) + (y // square)) % 2 * 255).astype(np.uint8)
+    return cv2.cvtColor(board, cv2.COLOR_GRAY2BGR)
+
+
+class TestCamera(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.camera = CameraProfile("test", 500.0, 500.0, 320.0, 240.0, (-0.25, 0.05, 0.0, 0.0), 640, 480)
+        self.points = [(120.0, 90.0), (520.0, 90.0), (520.0, 390.0), (120.0, 390.0)]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def distorted_photo(self, scene):
+        """Render scene (in undistorted coordinates) as photographed through self.camera."""
+        y, x = np.mgrid[0:480, 0:640].astype(np.float32)
+        undistorted = self.camera.undistort_points(np.stack([x.ravel(), y.ravel()], axis=1), (640, 480))
+        map_x, map_y = undistorted.reshape(480, 640, 2).astype(np.float32).transpose(2, 0, 1)
+        return cv2.remap(scene, map_x, map_y, cv2.INTER_LINEAR)
+
+    def test_zero_distortion_matches_plain_warp(self):
+        pinhole = CameraProfile("pinhole", 500.0, 500.0, 320.0, 240.0, (0.0, 0.0, 0.0, 0.0), 640, 480)
+        image = cv2.resize(np.random.default_rng(0).integers(0, 255, (48, 64, 3), dtype=np.uint8), (640, 480))
+        plain = ImageProcessor.extract_texture(image, self.points, 256, 192)
+        corrected = ImageProcessor.extract_texture(image, self.points, 256, 192, camera=pinhole)
+        self.assertEqual(plain.shape, corrected.shape)
+        self.assertLess(np.abs(plain.astype(float) - corrected).mean(), 1.0)
+
+    def test_distortion_is_corrected(self):
+        scene = checkerboard(640, 480, 20)
+        photo = self.distorted_photo(scene)
+        scene_points = self.camera.undistort_points(np.array(self.points), (640, 480))
+        expected = ImageProcessor.extract_texture(scene, scene_points, 400, 300)
+        plain = ImageProcessor.extract_texture(photo, self.points, 400, 300)
+        corrected = ImageProcessor.extract_texture(photo, self.points, 400, 300, camera=self.camera)
+        plain_error = np.abs(plain.astype(float) - expected).mean()
+        corrected_error = np.abs(corrected.astype(float) - expected).mean()
+        self.assertLess(corrected_error, plain_error / 4)
+
+    def test_maps_are_cached(self):
+        clear_map_cache()
+        first = camera_maps(self.camera, (480, 640, 3), self.points, 128, 96)
+        second = camera_maps(self.camera, (480, 640, 3), np.array(self.points), 128, 96)
+        self.assertIs(first, second)
+        camera_maps(self.camera, (480, 640, 3), self.points, 64, 48)
+        self.assertEqual(len(camera_module._map_cache), 2)
+
+    def test_session_uses_camera(self):
+        photo = self.distorted_photo(checkerboard(640, 480, 20))
+        session = ExtractionSession(photo)
+        session.set_points(self.points)
+        plain = session.extract(session.make_job()).warped
+        session.camera = self.camera
+        corrected = session.extract(session.make_job()).warped
+        self.assertEqual(plain.shape, corrected.shape)
+        self.assertGreater(np.abs(plain.astype(float) - corrected).mean(), 1.0)
+
+    def test_load_profiles(self):
+        path = os.path.join(self.tmp_dir, "cameras.json")
+        with open(path, 'w') as f:
+            json.dump({"test": self.camera.to_dict()}, f)
+        self.assertEqual(load_camera_profiles(path), {"test": self.camera})
+        self.assertEqual(get_camera_profile("test", path), self.camera)
+        self.assertIsNone(get_camera_profile(None, path))
+        self.assertEqual(load_camera_profiles(os.path.join(self.tmp_dir, "missing.json")), {})
+        with self.assertRaises(ValueError):
+            get_camera_profile("other", path)
+
+    def test_rejects_bad_coefficients(self):
+        with self.assertRaises(ValueError):
+            CameraProfile.from_dict("bad", dict(self.camera.to_dict(), distortion=[0.1, 0.2]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+# tests/test_engine.py
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from src.config.settings import BASE_DIR
+from src.core.engine import ExtractionSession, ExtractionJob, apply_orientation, parse_resolution, save_texture
+from src.utils.exceptions import TextureExtractionError, TextureSaveError
+
+
+class TestExtractionSession(unittest.TestCase):
+    def setUp(self):
+        self.image = np.zeros((200, 300, 3), dtype=np.uint8)
+        self.image[50:150, 50:250] = 255
+        self.session = ExtractionSession(self.image)
+        self.session.set_points([(50, 50), (250, 50), (250, 150), (50, 150)])
+
+    def test_estimated_aspect_ratio(self):
+        self.assertAlmostEqual(self.session.aspect_ratio, 2.0)
+        self.session.set_aspect_mode("Square")
+        self.assertEqual(self.session.aspect_ratio, 1.0)
+        self.session.set_aspect_mode("Custom", 1.5)
+        self.assertEqual(self.session.aspect_ratio, 1.5)
+
+    def test_extract(self):
+        result = self.session.extract()
+        self.assertEqual(result.warped.shape, (100, 200, 3))
+        self.assertGreaterEqual(np.mean(result.warped == 255), 0.95)
+        self.assertEqual(result.preview.shape, (100, 200, 3))
+
+    def test_set_resolution(self):
+        self.session.set_resolution("64x32")
+        self.assertEqual(self.session.output_size(), (64, 32))
+        self.session.set_resolution("Original")
+        self.assertEqual(self.session.output_size(), (300, 150))
+        with self.assertRaises(ValueError):
+            parse_resolution("1024")
+
+    def test_orientation(self):
+        self.session.rotate = True
+        result = self.session.extract()
+        self.assertEqual(result.oriented().shape, (200, 100, 3))
+
+        image = np.arange(6).reshape(2, 3)
+        np.testing.assert_array_equal(apply_orientation(image, flip=True), [[3, 4, 5], [0, 1, 2]])
+        np.testing.assert_array_equal(apply_orientation(image, flop=True), [[2, 1, 0], [5, 4, 3]])
+        np.testing.assert_array_equal(apply_orientation(image, rotate=True), [[3, 0], [4, 1], [5, 2]])
+
+    def test_submit_and_stream(self):
+        self.assertEqual(self.session.submit().result().warped.shape, (100, 200, 3))
+
+        jobs = [ExtractionJob(self.image, tuple(self.session.points), size, size, name=str(size))
+                for size in (16, 32, 64, 128)]
+        names = [result.job.name for result in self.session.stream(jobs, max_in_flight=2)]
+        self.assertEqual(names, ["16", "32", "64", "128"])
+        unordered = {result.job.name for result in self.session.stream(jobs, ordered=False)}
+        self.assertEqual(unordered, {"16", "32", "64", "128"})
+
+    def test_make_job_requires_quad(self):
+        self.session.set_points([(0, 0), (1, 1)])
+        with self.assertRaises(TextureExtractionError):
+            self.session.make_job()
+
+    def test_engine_does_not_import_tk(self):
+        code = "import sys, src.core.engine; print('tkinter' in sys.modules)"
+        output = subprocess.check_output([sys.executable, "-c", code], text=True, cwd=BASE_DIR)
+        self.assertEqual(output.strip(), "False")
+
+
+class TestSaveTexture(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.image = np.random.default_rng(2).integers(0, 255, (24, 32, 3), dtype=np.uint8)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_non_ascii_path(self):
+        path = os.path.join(self.tmp_dir, "Mauer_\u00e4\u00df\u6728.png")
+        save_texture(path, self.image)
+        saved = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        np.testing.assert_array_equal(saved, self.image)
+        self.assertEqual(os.listdir(self.tmp_dir), [os.path.basename(path)])
+
+    def test_jpeg_quality_and_unknown_formats(self):
+        path = os.path.join(self.tmp_dir, "wall.jpg")
+        save_texture(path, self.image)
+        _, expected = cv2.imencode(".jpg", self.image, [cv2.IMWRITE_JPEG_QUALITY, 75])
+        self.assertEqual(os.path.getsize(path), len(expected))
+        with self.assertRaises(TextureSaveError):
+            save_texture(os.path.join(self.tmp_dir, "wall.xyz"), self.image)
+        self.assertEqual(os.listdir(self.tmp_dir), ["wall.jpg"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+# tests/test_export_set.py
+
+import os
+import shutil
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from PIL import Image
+from src.core.engine import ExtractionSession
+from src.core.export_set import derive_levels, export_set, mip_chain
+from src.utils.exceptions import TextureSaveError
+
+
+class TestExportSet(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.image = cv2.resize(rng.integers(0, 255, (32, 48, 3), dtype=np.uint8), (600, 400))
+        self.session = ExtractionSession(self.image)
+        self.session.set_points([(100, 50), (500, 60), (490, 350), (110, 340)])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_mip_chain(self):
+        levels = mip_chain(np.zeros((64, 16, 3), dtype=np.uint8))
+        self.assertEqual([level.shape[:2] for level in levels],
+                         [(64, 16), (32, 8), (16, 4), (8, 2), (4, 1), (2, 1), (1, 1)])
+
+    def test_derived_levels_match_box_filter(self):
+        image = self.image[:256, :256]
+        levels = derive_levels(image, [(256, 256), (128, 128), (64, 64), (100, 50)])
+        self.assertIs(levels[(256, 256)], image)
+        expected = image.reshape(64, 4, 64, 4, 3).mean(axis=(1, 3))
+        # Each halving rounds to uint8, so two levels may drift by up to one step
+        self.assertLessEqual(np.abs(levels[(64, 64)] - expected).max(), 1.5)
+        self.assertEqual(levels[(100, 50)].shape, (50, 100, 3))
+
+    def test_export_set(self):
+        self.session.rotate = True
+        paths = export_set(self.session.make_job(), os.path.join(self.tmp_dir, "brick.png"), ["256x128", "128x64", "64x32"])
+        self.assertEqual([os.path.basename(path) for path in paths],
+                         ["brick_256x128.png", "brick_128x64.png", "brick_64x32.png"])
+        # Sizes are warp sizes; orientation is applied on save like a single export
+        self.assertEqual(cv2.imread(paths[1]).shape, (128, 64, 3))
+
+    def test_mip_chain_file(self):
+        path = os.path.join(self.tmp_dir, "brick.dds")
+        self.assertEqual(export_set(self.session.make_job(), path, ["128x128"], mip_chain_file=True), [path])
+        with open(path, 'rb') as f:
+            header = f.read(128)
+        self.assertEqual(int.from_bytes(header[28:32], 'little'), 8)
+        with Image.open(path) as decoded:
+            self.assertEqual(decoded.size, (128, 128))
+        with self.assertRaises(TextureSaveError):
+            export_set(self.session.make_job(), os.path.join(self.tmp_dir, "brick.png"), ["128x128"], mip_chain_file=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -57,6 +57,49 @@ class TestImageProcessor(unittest.TestCase):
         self.assertGreaterEqual(white_percentage, 0.90,
                                 f"Only {white_percentage:.2%} of pixels are exactly white, expected at least 90%")
 
+    def test_select_pyramid_level(self):
+        points = np.array([(0, 0), (999, 0), (999, 999), (0, 999)], dtype=np.float32)
+        self.assertEqual(self.image_processor.select_pyramid_level(points, 1000, 1000), 0)
+        self.assertEqual(self.image_processor.select_pyramid_level(points, 250, 250), 2)
+        self.assertEqual(self.image_processor.select_pyramid_level(points, 2000, 2000), 0)
+
+    def test_extract_texture_downscaled_is_anti_aliased(self):
+        # One-pixel checkerboard: point-sampling at 1/8 scale aliases to solid black or white
+        checker = (np.indices((800, 800)).sum(axis=0) % 2 * 255).astype(np.uint8)
+        image = np.dstack([checker] * 3)
+        points = np.array([(0, 0), (799, 0), (799, 799), (0, 799)], dtype=np.float32)
+
+        for quality in ("Balanced", "High", "Best"):
+            extracted = self.image_processor.extract_texture(image, points, 100, 100, quality=quality)
+            self.assertEqual(extracted.shape, (100, 100, 3))
+            self.assertLess(np.abs(extracted[5:-5, 5:-5].astype(float) - 127.5).max(), 20, quality)
+
+    def test_extract_texture_quality_profiles_match_at_unit_scale(self):
+        image = np.zeros((100, 100, 3), dtype=np.uint8)
+        image[25:75, 25:75] = 255
+        points = np.array([(25, 25), (75, 25), (75, 75), (25, 75)], dtype=np.float32)
+
+        legacy = self.image_processor.extract_texture(image, points, 50, 50, quality="Legacy")
+        balanced = self.image_processor.extract_texture(image, points, 50, 50, quality="Balanced")
+        np.testing.assert_array_equal(legacy, balanced)
+
+    def test_pyramid_levels_stay_registered(self):
+        # A ramp survives pyrDown's symmetric blur, so any misregistration of a level shows up as an offset
+        ramp = np.tile(np.arange(256, dtype=np.float32), (256, 1))
+        image = np.dstack([ramp, ramp.T, ramp])
+        points = np.array([(20, 30), (220, 30), (220, 230), (20, 230)], dtype=np.float32)
+
+        direct = self.image_processor.extract_texture(image, points, 50, 50, quality="Legacy")
+        reduced = self.image_processor.extract_texture(image, points, 50, 50, quality="Balanced")
+        self.assertLess(np.abs(reduced[2:-2, 2:-2] - direct[2:-2, 2:-2]).max(), 0.1)
+
+    def test_source_output_size(self):
+        # 300x150 quad: the output keeps the longest edge's pixel density
+        points = np.array([(1000, 1000), (1300, 1000), (1300, 1150), (1000, 1150)], dtype=np.float32)
+        self.assertEqual(self.image_processor.source_output_size(points, 2.0), (300, 150))
+        self.assertEqual(self.image_processor.source_output_size(points, 0.5), (150, 300))
+        self.assertEqual(self.image_processor.source_output_size(points, 2.0, power_of_two=True), (256, 128))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
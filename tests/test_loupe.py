@@ -0,0 +1,47 @@
+# tests/test_loupe.py
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from src.core.tiled_image import build_tiled_image
+from src.ui.loupe import BACKGROUND, magnify
+
+
+class TestMagnify(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.image = rng.integers(0, 255, (300, 400, 3), dtype=np.uint8)
+
+    def test_centre_shows_the_source_pixel_at_full_resolution(self):
+        view = magnify(self.image, 200.0, 100.0, size=81, zoom=9)
+        self.assertEqual(view.shape, (81, 81, 3))
+        # Each source pixel is a 9x9 block; the one under (200, 100) is centred, in RGB order
+        np.testing.assert_array_equal(view[36:45, 36:45], np.broadcast_to(self.image[100, 200, ::-1], (9, 9, 3)))
+        np.testing.assert_array_equal(view[36:45, 45:54], np.broadcast_to(self.image[100, 201, ::-1], (9, 9, 3)))
+
+    def test_sub_pixel_positions_shift_the_view(self):
+        view = magnify(self.image, 200.0, 100.0, size=80, zoom=8)
+        shifted = magnify(self.image, 200.25, 100.0, size=80, zoom=8)
+        np.testing.assert_array_equal(shifted[:, 10:70], view[:, 12:72])
+
+    def test_edges_and_tiled_sources(self):
+        view = magnify(self.image, 0.0, 0.0, size=64, zoom=8)
+        np.testing.assert_array_equal(view[0, 0], BACKGROUND)
+        np.testing.assert_array_equal(view[32, 32], self.image[0, 0, ::-1])
+
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            tiled = build_tiled_image(self.image, os.path.join(tmp_dir, "pyramid"), tile=64)
+            np.testing.assert_array_equal(magnify(tiled, 130.5, 64.0), magnify(self.image, 130.5, 64.0))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+        gray16 = (self.image[:, :, 0].astype(np.uint16) * 257)
+        np.testing.assert_array_equal(magnify(gray16, 50.0, 50.0, size=16, zoom=4)[8, 8],
+                                      np.repeat(self.image[50, 50, 0], 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# tests/test_memory.py
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import cv2
+import numpy as np
+from src.core import tiled_image
+from src.core.engine import load_image
+from src.core.memory import MemoryGovernor, buffer_size, format_bytes
+from src.core.tiled_image import TiledImage
+
+MB = 1024 * 1024
+
+
+class FakePhotoImage:
+    def width(self):
+        return 100
+
+    def height(self):
+        return 50
+
+
+class TestMemoryGovernor(unittest.TestCase):
+    def test_buffer_sizes(self):
+        image = np.zeros((100, 200, 3), dtype=np.uint8)
+        self.assertEqual(buffer_size(image), 60000)
+        self.assertEqual(buffer_size(image[::-1, 10:50]), 60000)  # A view pins its whole base
+        self.assertEqual(buffer_size([image, None, np.zeros(10, dtype=np.float64)]), 60080)
+        self.assertEqual(buffer_size(FakePhotoImage()), 20000)
+        self.assertEqual(format_bytes(1536 * MB), "1.5 GB")
+
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, "image.npy")
+            np.save(path, image)
+            self.assertEqual(buffer_size(np.load(path, mmap_mode="r")), 0)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_relief_steps_run_in_order_until_under_the_limit(self):
+        governor = MemoryGovernor(100 * MB, soft_limit=0.8, restore_limit=0.5)
+        calls = []
+
+        def shrink(name, size):
+            def apply():
+                calls.append(name)
+                governor.buffers["image"] = size * MB
+                return True
+            return apply
+
+        governor.add_relief("caches", shrink("caches", 85))
+        governor.add_relief("preview", shrink("preview", 45), lambda: calls.append("restore preview"))
+        governor.add_relief("tiles", shrink("tiles", 10))
+
+        governor.track("image", np.zeros(60 * MB, dtype=np.uint8))
+        self.assertEqual(governor.rebalance(), [])
+        governor.track("texture", np.zeros(30 * MB, dtype=np.uint8))
+        self.assertEqual(governor.rebalance(), ["caches", "preview"])
+        self.assertEqual(governor.usage, 75 * MB)
+        self.assertTrue(governor.fits(5 * MB))
+        self.assertFalse(governor.fits(6 * MB))
+
+        # Already applied steps are skipped, so further pressure goes to the next one
+        governor.track("texture", np.zeros(40 * MB, dtype=np.uint8))
+        self.assertEqual(governor.rebalance(), ["tiles"])
+
+        governor.track("texture", None)
+        governor.rebalance()
+        self.assertEqual(calls, ["caches", "preview", "tiles", "restore preview"])
+        self.assertFalse(any(step.active for step in governor.steps))
+
+    def test_sources_can_be_loaded_as_tiles_on_demand(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, "small.png")
+            image = np.random.default_rng(2).integers(0, 255, (60, 80, 3), dtype=np.uint8)
+            cv2.imwrite(path, image)
+            with patch.object(tiled_image, "TILED_CACHE_DIR", os.path.join(tmp_dir, "cache")):
+                self.assertIsInstance(load_image(path), np.ndarray)
+                tiled = load_image(path, min_tiled_pixels=0)
+                self.assertIsInstance(tiled, TiledImage)
+                np.testing.assert_array_equal(tiled.read(0, 0, 0, 80, 60), image)
+                # An image already in memory is tiled without decoding the file again
+                other = os.path.join(tmp_dir, "other.png")
+                cv2.imwrite(other, image)
+                with patch.object(tiled_image.cv2, "imread", side_effect=AssertionError("decoded")):
+                    np.testing.assert_array_equal(tiled_image.open_tiled(other, image).read(0, 0, 0, 80, 60), image)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
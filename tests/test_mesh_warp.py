@@ -0,0 +1,115 @@
+# tests/test_mesh_warp.py
+
+import os
+import shutil
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from src.core.camera import CameraProfile
+from src.core.engine import ExtractionSession
+from src.core.image_processor import ImageProcessor
+from src.core.mesh_warp import extract_mesh_texture, mesh_aspect_ratio, mesh_corners, mesh_from_quad
+from src.core.project import Project, configure_session
+
+
+class TestMeshWarp(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.image = cv2.resize(rng.integers(0, 255, (30, 40, 3), dtype=np.uint8), (800, 600))
+        self.points = [(100.0, 80.0), (700.0, 100.0), (680.0, 520.0), (120.0, 500.0)]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def bent_page(self, width=400, height=300, amplitude=40.0):
+        """A texture, a photo of it bent into a wave, and the forward map from texture to photo."""
+        y, x = np.mgrid[0:height, 0:width]
+        texture = cv2.cvtColor((((x // 25) + (y // 25)) % 2 * 255).astype(np.uint8), cv2.COLOR_GRAY2BGR)
+
+        def forward(u, v):
+            return 100 + u, 100 + v + amplitude * np.sin(np.pi * u / (width - 1))
+
+        sy, sx = np.mgrid[0:600, 0:800].astype(np.float32)
+        u = sx - 100
+        v = sy - 100 - amplitude * np.sin(np.pi * u / (width - 1))
+        photo = cv2.remap(texture, u, v.astype(np.float32), cv2.INTER_LINEAR)
+        return texture, photo, forward
+
+    def test_flat_mesh_matches_four_point_warp(self):
+        mesh = mesh_from_quad(self.points, 4, 3)
+        self.assertEqual(mesh.shape, (3, 4, 2))
+        np.testing.assert_allclose(mesh_corners(mesh), self.points, atol=1e-3)
+        for quality in ("Fast", "Balanced", "High"):
+            plain = ImageProcessor.extract_texture(self.image, self.points, 256, 192, quality=quality)
+            warped = extract_mesh_texture(self.image, mesh, 256, 192, quality=quality)
+            self.assertEqual(plain.shape, warped.shape)
+            self.assertLess(np.abs(plain.astype(float) - warped).mean(), 0.1)
+
+    def test_mesh_follows_curved_surface(self):
+        texture, photo, forward = self.bent_page()
+        u, v = np.meshgrid(np.linspace(0, 399, 9), np.linspace(0, 299, 3))
+        mesh = np.stack(forward(u, v), axis=-1)
+        corners = mesh_corners(mesh)
+
+        flat = ImageProcessor.extract_texture(photo, corners, 400, 300)
+        curved = extract_mesh_texture(photo, mesh, 400, 300)
+        flat_error = np.abs(flat.astype(float) - texture).mean()
+        curved_error = np.abs(curved.astype(float) - texture).mean()
+        self.assertLess(curved_error, flat_error / 4)
+        self.assertGreater(mesh_aspect_ratio(mesh), 400 / 300)
+
+    def test_camera_without_distortion_matches(self):
+        pinhole = CameraProfile("pinhole", 700.0, 700.0, 400.0, 300.0, (0.0, 0.0, 0.0, 0.0), 800, 600)
+        mesh = mesh_from_quad(self.points, 3, 3)
+        mesh[1, 1] += (15, -10)
+        plain = extract_mesh_texture(self.image, mesh, 200, 150)
+        corrected = extract_mesh_texture(self.image, mesh, 200, 150, camera=pinhole)
+        self.assertLess(np.abs(plain.astype(float) - corrected).mean(), 1.0)
+
+    def test_session_mesh(self):
+        session = ExtractionSession(self.image)
+        session.set_points(self.points)
+        session.set_mesh(mesh_from_quad(self.points, 3, 3))
+        session.mesh[1, 1] += (20, 0)
+        job = session.make_job()
+        self.assertIsNot(job.mesh, session.mesh)
+        self.assertEqual(session.extract(job).warped.shape[:2], (job.height, job.width))
+
+        # Moving a corner carries the grid along
+        moved = list(self.points)
+        moved[0] = (90.0, 70.0)
+        session.set_points(moved)
+        np.testing.assert_allclose(mesh_corners(session.mesh), moved, atol=1e-3)
+
+        session.set_mesh(None)
+        self.assertIsNone(session.make_job().mesh)
+        with self.assertRaises(ValueError):
+            session.set_mesh([[0, 0], [1, 1]])
+
+    def test_project_round_trip(self):
+        source = os.path.join(self.tmp_dir, "source.png")
+        cv2.imwrite(source, self.image)
+        session = ExtractionSession(self.image)
+        session.set_points(self.points)
+        session.set_mesh(mesh_from_quad(self.points, 3, 3))
+        session.mesh[1, 1] += (20, 0)
+
+        project = Project(os.path.join(self.tmp_dir, "project.json"))
+        quad = project.add_selection(source, session)
+        restored = ExtractionSession(self.image)
+        configure_session(restored, quad)
+        np.testing.assert_allclose(restored.mesh, session.mesh)
+
+        key = project.tasks()[0].key
+        quad["mesh"][1][1][0] += 5
+        self.assertNotEqual(project.tasks()[0].key, key)
+
+        quad["mesh"] = None
+        configure_session(restored, quad)
+        self.assertIsNone(restored.mesh)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+# tests/test_overlay.py
+
+import unittest
+from src.ui.overlay import SelectionOverlay
+from src.ui.ui_manager import UIManager
+
+
+class FakeCanvas:
+    """Records canvas items without a display."""
+
+    def __init__(self):
+        self.items = {}
+        self.created = 0
+
+    def _create(self, *coords, **options):
+        self.created += 1
+        self.items[self.created] = {"coords": list(coords), "state": "normal", "tags": options.get("tags")}
+        return self.created
+
+    create_line = create_oval = create_text = _create
+
+    def coords(self, item, *coords):
+        self.items[item]["coords"] = list(coords)
+
+    def itemconfigure(self, item, **options):
+        self.items[item].update(options)
+
+    def visible(self, tag):
+        return [item for item in self.items.values() if tag in item["tags"] and item["state"] == "normal"]
+
+
+class FakeMaster:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, callback):
+        self.scheduled.append(callback)
+        return len(self.scheduled)
+
+
+class TestSelectionOverlay(unittest.TestCase):
+    def setUp(self):
+        self.canvas = FakeCanvas()
+        self.overlay = SelectionOverlay(self.canvas)
+
+    def test_items_are_reused_while_dragging(self):
+        points = [(10, 10), (90, 10), (90, 90), (10, 90)]
+        self.overlay.set_points(points)
+        created = self.canvas.created
+        for step in range(20):
+            points[2] = (90 + step, 90 + step)
+            self.overlay.set_points(points)
+        self.assertEqual(self.canvas.created, created)
+        self.assertEqual(self.canvas.items[self.overlay.outline]["coords"][4:6], [109, 109])
+        self.assertEqual(len(self.canvas.visible("points")), 8)
+
+    def test_clear_hides_instead_of_deleting(self):
+        self.overlay.set_points([(0, 0), (5, 0)])
+        self.overlay.set_rubber_band((5, 0), (9, 9))
+        self.overlay.set_mesh([[(0, 0), (5, 0)]], [(2, 2)])
+        self.overlay.clear()
+        self.assertTrue(self.canvas.items)
+        self.assertEqual([item for item in self.canvas.items.values() if item["state"] == "normal"], [])
+
+
+class TestFrameCoalescing(unittest.TestCase):
+    def test_requests_merge_into_one_frame(self):
+        ui = UIManager.__new__(UIManager)  # frame scheduling needs no widgets
+        ui.master, ui._frame_callbacks, ui._frame_pending = FakeMaster(), {}, None
+        calls = []
+        for i in range(10):
+            ui.request_frame("overlay", lambda i=i: calls.append(("overlay", i)))
+            ui.request_frame("status", lambda i=i: calls.append(("status", i)))
+        self.assertEqual(len(ui.master.scheduled), 1)
+        ui._run_frame()
+        self.assertEqual(calls, [("overlay", 9), ("status", 9)])
+
+        ui.request_frame("overlay", lambda: calls.append(("overlay", "next")))
+        self.assertEqual(len(ui.master.scheduled), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
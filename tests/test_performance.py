@@ -0,0 +1,86 @@
+# tests/test_performance.py
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from src.config import performance
+from src.config.settings import PERFORMANCE_DEFAULTS, PERFORMANCE_PROFILES
+from src.core import engine
+
+
+class TestPerformanceSettings(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.tmp_dir, "performance.json")
+        self.previous = performance.performance()
+
+    def tearDown(self):
+        performance.apply(self.previous)
+        shutil.rmtree(self.tmp_dir)
+
+    def write_config(self, values):
+        with open(self.config_path, 'w') as f:
+            json.dump(values, f)
+
+    def test_layers_override_in_order(self):
+        missing = os.path.join(self.tmp_dir, "missing.json")
+        defaults = performance.resolve(path=missing, environ={})
+        self.assertEqual(defaults.preview_size, PERFORMANCE_DEFAULTS["preview_size"])
+        self.assertIsNone(defaults.profile)
+
+        self.write_config({"profile": "laptop", "preview_size": 300, "poll_ms": 80})
+        settings = performance.resolve(path=self.config_path, environ={"TEXTRACTOR_POLL_MS": "60"})
+        self.assertEqual(settings.profile, "laptop")
+        self.assertEqual(settings.extraction_workers, PERFORMANCE_PROFILES["laptop"]["extraction_workers"])
+        self.assertEqual(settings.preview_size, 300)
+        self.assertEqual(settings.poll_ms, 60)
+
+        settings = performance.resolve("batch-server", performance.parse_overrides(["poll-ms=20"]),
+                                       path=self.config_path, environ={"TEXTRACTOR_PERF_PROFILE": "workstation"})
+        self.assertEqual(settings.profile, "batch-server")
+        self.assertEqual(settings.opencv_threads, 1)
+        self.assertEqual(settings.preview_size, 300)  # The file still overrides the profile
+        self.assertEqual(settings.poll_ms, 20)
+
+    def test_invalid_settings_are_rejected(self):
+        with self.assertRaises(ValueError):
+            performance.parse_overrides(["preview_sise=300"])
+        with self.assertRaises(ValueError):
+            performance.parse_overrides(["preview_size"])
+        with self.assertRaises(ValueError):
+            performance.resolve("desktop", path=self.config_path, environ={})
+        with self.assertRaises(ValueError):
+            performance.resolve(path=self.config_path, environ={"TEXTRACTOR_EXTRACTION_WORKERS": "many"})
+
+    def test_applied_settings_reach_opencv_and_the_engine(self):
+        performance.configure(overrides={"opencv_threads": 1, "extraction_workers": 3, "preview_size": 64},
+                              path=self.config_path)
+        self.assertEqual(cv2.getNumThreads(), 1)
+        self.assertEqual(engine.get_executor()._max_workers, 3)
+        session = engine.ExtractionSession(np.zeros((200, 300, 3), dtype=np.uint8))
+        session.set_points([(0, 0), (299, 0), (299, 199), (0, 199)])
+        self.assertEqual(max(session.extract().preview.shape[:2]), 64)
+
+        performance.configure(overrides={"extraction_workers": 2}, path=self.config_path)
+        self.assertEqual(engine.get_executor()._max_workers, 2)
+
+    def test_camera_map_cache_follows_settings_applied_after_import(self):
+        from src.core import camera
+        profile = camera.CameraProfile("test", 500.0, 500.0, 320.0, 240.0, (-0.25, 0.05, 0.0, 0.0), 640, 480)
+        points = [(120.0, 90.0), (520.0, 90.0), (520.0, 390.0), (120.0, 390.0)]
+        performance.configure(overrides={"camera_map_cache_mb": 1}, path=self.config_path)
+        camera.clear_map_cache()
+        # 6 bytes per output pixel: 300x300 and 320x320 maps do not fit in 1 MB together, and 500x500 not at all
+        for size in (300, 320, 500):
+            camera.camera_maps(profile, (480, 640, 3), points, size, size)
+        self.assertEqual([key[3] for key in camera._map_cache], [320])
+        self.assertLessEqual(camera._map_cache_bytes, 2 ** 20)
+        camera.clear_map_cache()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+# tests/test_phash_index.py
+
+import os
+import shutil
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from src.cli import main
+from src.core.phash_index import HashIndex, hamming, phash, phash_batch, quad_hash
+
+
+def texture(seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return cv2.GaussianBlur(cv2.resize(rng.integers(0, 255, (16, 16, 3), dtype=np.uint8), (256, 256)), (9, 9), 0)
+
+
+class TestPerceptualHash(unittest.TestCase):
+    def test_near_identical_images(self):
+        image = texture(0)
+        recompressed = cv2.imdecode(cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 60])[1], 1)
+        for variant in (recompressed, cv2.resize(image, (180, 170)), cv2.add(image, 15)):
+            self.assertLessEqual(hamming(phash(image), phash(variant)), 4)
+        self.assertGreater(hamming(phash(image), phash(texture(1))), 16)
+
+    def test_batch_matches_single(self):
+        images = [texture(seed) for seed in range(5)]
+        self.assertEqual(phash_batch(images), [phash(image) for image in images])
+
+    def test_quad_hash_matches_texture(self):
+        source = cv2.copyMakeBorder(texture(0), 50, 50, 50, 50, cv2.BORDER_CONSTANT)
+        points = [(50, 50), (305, 50), (305, 305), (50, 305)]
+        self.assertLessEqual(hamming(quad_hash(source, points), phash(texture(0))), 4)
+
+
+class TestHashIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "index.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_query_matches_linear_scan(self):
+        rng = np.random.default_rng(0)
+        values = [int(value) for value in rng.integers(0, 2 ** 62, 2000)]
+        index = HashIndex(self.path)
+        for i, value in enumerate(values):
+            index.add(value, f"texture_{i}.png")
+        for i in range(0, 2000, 100):
+            # Flip up to eight random bits of an indexed hash
+            probe = values[i]
+            for bit in rng.choice(64, size=rng.integers(0, 9), replace=False):
+                probe ^= 1 << int(bit)
+            expected = sorted(j for j, value in enumerate(values) if hamming(probe, value) <= 8)
+            found = sorted(int(entry["path"][8:-4]) for _, entry in index.query(probe, 8))
+            self.assertEqual(found, expected)
+
+    def test_persistence_and_replacement(self):
+        index = HashIndex(self.path)
+        index.add(0xFFFF, "a.png", source="photo.jpg")
+        index.add(0xFFFF, "a.png", kind="source")
+        index.add(0x0F0F, "a.png")
+        index.save()
+
+        loaded = HashIndex.load(self.path)
+        self.assertEqual(len(loaded), 2)
+        self.assertIsNone(loaded.find_duplicate(0xFFFF, kind="texture", max_distance=2))
+        self.assertEqual(loaded.find_duplicate(0x0F0F)["path"], "a.png")
+        self.assertIsNone(loaded.find_duplicate(0x0F0F, kind="texture", exclude_path="a.png"))
+
+    def test_index_command(self):
+        for name, seed in (("a.png", 0), ("b.png", 1)):
+            cv2.imwrite(os.path.join(self.tmp_dir, name), texture(seed))
+        cv2.imwrite(os.path.join(self.tmp_dir, "c.jpg"), texture(0))
+        self.assertEqual(main(["index", os.path.join(self.tmp_dir, "*.png"), "--index", self.path]), 0)
+        index = HashIndex.load(self.path)
+        self.assertEqual(len(index), 2)
+        duplicate = index.find_duplicate(phash(cv2.imread(os.path.join(self.tmp_dir, "c.jpg"))))
+        self.assertEqual(os.path.basename(duplicate["path"]), "a.png")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+# tests/test_postprocess.py
+
+import unittest
+import cv2
+import numpy as np
+from src.core.engine import ExtractionSession
+from src.core.postprocess import PostProcessChain
+from src.core.project import Project
+
+
+class TestPostProcess(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.texture = cv2.resize(rng.integers(60, 200, (24, 32, 3), dtype=np.uint8), (320, 240))
+
+    def test_white_balance(self):
+        tinted = np.clip(self.texture * np.array([0.7, 1.0, 1.2]), 0, 255).astype(np.uint8)
+        result = PostProcessChain([{"stage": "white_balance"}]).apply(tinted)
+        self.assertIs(result, tinted)
+        means = result.reshape(-1, 3).mean(axis=0)
+        self.assertLess(means.max() - means.min(), 2.0)
+
+    def test_flat_field_removes_vignette(self):
+        y, x = np.mgrid[0:240, 0:320]
+        falloff = 1 - 0.4 * (((x - 160) / 160) ** 2 + ((y - 120) / 120) ** 2) / 2
+        vignetted = np.repeat((150 * falloff)[:, :, None], 3, axis=2).astype(np.uint8)
+        before = vignetted.std()
+        PostProcessChain([{"stage": "flat_field"}]).apply(vignetted)
+        self.assertLess(vignetted.std(), before / 3)
+
+    def test_sharpen_increases_edge_contrast(self):
+        edge = np.zeros((64, 64, 3), dtype=np.uint8)
+        edge[:, 32:] = 200
+        edge = cv2.GaussianBlur(edge, (0, 0), 1.5)
+        sharpened = PostProcessChain([{"stage": "sharpen", "amount": 1.0, "radius": 2.0}]).apply(edge.copy())
+        self.assertGreater(np.abs(np.diff(sharpened[32, :, 0].astype(int))).max(),
+                           np.abs(np.diff(edge[32, :, 0].astype(int))).max())
+
+    def test_alpha_mask(self):
+        image = np.full((40, 40, 3), 255, dtype=np.uint8)
+        image[10:30, 10:30] = (40, 80, 120)
+        result = PostProcessChain([{"stage": "alpha_mask", "tolerance": 0.1, "feather": 0.05}]).apply(image)
+        self.assertEqual(result.shape, (40, 40, 4))
+        self.assertEqual(result[0, 0, 3], 0)
+        self.assertEqual(result[20, 20, 3], 255)
+        np.testing.assert_array_equal(result[:, :, :3], image)
+
+    def test_sixteen_bit_and_gray(self):
+        chain = PostProcessChain([{"stage": "white_balance"}, {"stage": "sharpen"}])
+        deep = self.texture.astype(np.uint16) * 257
+        self.assertEqual(chain.apply(deep).dtype, np.uint16)
+        gray = self.texture[:, :, 0].copy()
+        self.assertEqual(chain.apply(gray).shape, gray.shape)
+
+    def test_buffers_are_reused(self):
+        chain = PostProcessChain([{"stage": "sharpen"}])
+        chain.apply(self.texture.copy())
+        buffer = chain._buffer("color", (240, 320, 3))
+        chain.apply(self.texture.copy())
+        self.assertIs(chain._buffer("color", (240, 320, 3)), buffer)
+
+    def test_unknown_stage(self):
+        with self.assertRaises(ValueError):
+            PostProcessChain([{"stage": "denoise"}])
+        with self.assertRaises(ValueError):
+            PostProcessChain.from_preset("Nope")
+
+    def test_preview_jobs_finish_at_save_time(self):
+        image = cv2.resize(self.texture, (1600, 1200))
+        session = ExtractionSession(image)
+        session.set_points([(100, 100), (1500, 120), (1480, 1100), (120, 1080)])
+        session.set_resolution("1024x1024")
+        session.postprocess = PostProcessChain([{"stage": "white_balance"}, {"stage": "sharpen", "radius": 2.0}])
+        session.preview_size = 256
+
+        result = session.extract()
+        self.assertFalse(result.postprocessed)
+        raw = result.warped.copy()
+        finished = result.finish().warped
+        self.assertTrue(result.postprocessed)
+        self.assertFalse(np.array_equal(raw, finished))
+        self.assertIs(result.finish().warped, finished)
+
+        # The preview shows the same chain at preview resolution
+        expected = cv2.cvtColor(cv2.resize(finished, (256, 256), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2RGB)
+        self.assertLess(np.abs(result.preview.astype(float) - expected).mean(), 4.0)
+
+        session.preview_size = None
+        batch = session.extract()
+        self.assertTrue(batch.postprocessed)
+        np.testing.assert_array_equal(batch.warped, finished)
+
+    def test_project_key_includes_chain(self):
+        quad = {"points": [[0, 0], [10, 0], [10, 10], [0, 10]], "resolution": "64x64", "quality": "Balanced"}
+        key = Project.task_key("hash", quad)
+        chained = dict(quad, postprocess=[{"stage": "sharpen", "amount": 0.5}])
+        self.assertNotEqual(Project.task_key("hash", chained), key)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+# tests/test_profiler.py
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import tkinter
+import unittest
+import numpy as np
+from src.core.engine import ExtractionSession
+from src.core.postprocess import PostProcessChain
+from src.utils import profiler
+
+
+class FakeMisc:
+    """Mimics the closure tkinter.Misc.after registers for its handler."""
+
+    def after(self, func):
+        def callit():
+            func()
+        callit.__name__ = func.__name__
+        return callit
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.tracer = profiler.enable(stall_ms=20)
+
+    def tearDown(self):
+        profiler.disable()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_tk_callbacks_are_timed(self):
+        calls = []
+
+        def on_drag(event=None):
+            calls.append(event)
+            time.sleep(0.03)
+
+        def check_thread():
+            calls.append("after")
+
+        tkinter.CallWrapper(on_drag, None, None)("event")
+        tkinter.CallWrapper(FakeMisc().after(check_thread), None, None)()
+        self.assertEqual(calls, ["event", "after"])
+
+        drag_name = on_drag.__qualname__
+        self.assertEqual(set(self.tracer.latencies), {drag_name, "after:check_thread"})
+        self.assertEqual(self.tracer.stalls, {drag_name: 1})
+        summary = self.tracer.summary().splitlines()
+        self.assertTrue(summary[1].startswith(drag_name))
+
+    def test_disable_restores_call_wrapper(self):
+        wrapper = tkinter.CallWrapper
+        self.assertIsNot(profiler.disable(), None)
+        self.assertIsNot(tkinter.CallWrapper, wrapper)
+        self.assertIsNone(profiler.active())
+
+    def test_worker_spans_in_trace(self):
+        session = ExtractionSession(np.zeros((200, 300, 3), dtype=np.uint8))
+        session.set_points([(10, 10), (290, 20), (280, 190), (20, 180)])
+        session.set_resolution("64x64")
+        session.postprocess = PostProcessChain.from_preset("Balance")
+        session.submit().result()
+        with profiler.span("ui_work", size=3):
+            pass
+
+        path = os.path.join(self.tmp_dir, "trace.json")
+        self.tracer.save(path)
+        with open(path, 'r') as f:
+            events = json.load(f)["traceEvents"]
+        spans = {event["name"]: event for event in events if event["ph"] == "X"}
+        threads = {event["tid"]: event["args"]["name"] for event in events if event["ph"] == "M"}
+        self.assertIn("run_job", spans)
+        self.assertIn("warp", spans)
+        self.assertIn("PostProcessChain.apply", spans)
+        self.assertEqual(spans["run_job"]["args"]["size"], "64x64")
+        self.assertTrue(threads[spans["run_job"]["tid"]].startswith("extract"))
+        self.assertNotEqual(spans["run_job"]["tid"], spans["ui_work"]["tid"])
+        self.assertGreaterEqual(spans["run_job"]["dur"], spans["warp"]["dur"])
+
+    def test_disabled_records_nothing(self):
+        profiler.disable()
+
+        @profiler.traced
+        def work():
+            return 42
+
+        self.assertEqual(work(), 42)
+        with profiler.span("ignored"):
+            pass
+        self.assertEqual(self.tracer.events, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
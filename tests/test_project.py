@@ -0,0 +1,98 @@
+# tests/test_project.py
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import cv2
+import numpy as np
+from src.core.camera import CameraProfile
+from src.core.engine import ExtractionSession
+from src.core.project import Project
+
+
+class TestProject(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.tmp_dir, "wall.png")
+        image = np.zeros((120, 160, 3), dtype=np.uint8)
+        image[20:100, 20:140] = (0, 128, 255)
+        cv2.imwrite(self.source, image)
+
+        self.project_path = os.path.join(self.tmp_dir, "library.json")
+        project = Project(self.project_path)
+        session = ExtractionSession(image)
+        session.set_points([(20, 20), (140, 20), (140, 100), (20, 100)])
+        project.add_selection(self.source, session)
+        session.set_points([(0, 0), (80, 0), (80, 80), (0, 80)])
+        project.add_selection(self.source, session)
+        project.save()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_round_trip(self):
+        project = Project.load(self.project_path)
+        entry = project.data["sources"][0]
+        self.assertEqual(entry["path"], "wall.png")
+        self.assertEqual(len(entry["quads"]), 2)
+        self.assertEqual(entry["quads"][0]["points"][1], [140.0, 20.0])
+        self.assertEqual(len(entry["hash"]), 64)
+
+    def test_default_outputs_are_unique(self):
+        project = Project.load(self.project_path)
+        other = os.path.join(self.tmp_dir, "b", "wall.png")
+        os.makedirs(os.path.dirname(other))
+        shutil.copy(self.source, other)
+        session = ExtractionSession(cv2.imread(other))
+        session.set_points([(20, 20), (140, 20), (140, 100), (20, 100)])
+        quad = project.add_selection(other, session)
+        self.assertEqual(quad["output"], os.path.join(".", "wall_3.png"))
+        summary = project.reexport(workers=1)
+        self.assertEqual(len(set(summary.rendered)), 3)
+
+    def test_incremental_reexport(self):
+        project = Project.load(self.project_path)
+        summary = project.reexport(workers=1)
+        self.assertEqual(len(summary.rendered), 2)
+        output = cv2.imread(os.path.join(self.tmp_dir, "wall_1.png"))
+        self.assertEqual(output.shape, (80, 120, 3))
+
+        # Nothing changed: everything is up to date
+        project = Project.load(self.project_path)
+        summary = project.reexport(workers=1)
+        self.assertEqual((len(summary.rendered), len(summary.skipped)), (0, 2))
+
+        # Touch one quad: only its output is rendered again
+        project.data["sources"][0]["quads"][1]["points"][2] = [70.0, 70.0]
+        project.save()
+        summary = Project.load(self.project_path).reexport(workers=1)
+        self.assertEqual(summary.rendered, [os.path.join(self.tmp_dir, "wall_2.png")])
+
+        # A resolution override invalidates every output
+        summary = Project.load(self.project_path).reexport(workers=2, overrides={"resolution": "32x32"})
+        self.assertEqual(len(summary.rendered), 2)
+        self.assertEqual(cv2.imread(os.path.join(self.tmp_dir, "wall_1.png")).shape, (32, 32, 3))
+
+    def test_missing_camera_profile_fails_only_its_task(self):
+        project = Project.load(self.project_path)
+        project.data["sources"][0]["quads"][0]["camera"] = "test"
+        project.data["sources"][0]["quads"][1]["camera"] = "lost"
+        camera = CameraProfile("test", 150.0, 150.0, 80.0, 60.0, (0.0, 0.0, 0.0, 0.0), 160, 120)
+        with mock.patch("src.core.project.load_camera_profiles", return_value={"test": camera}) as profiles:
+            summary = project.reexport(workers=1)
+        profiles.assert_called_once()
+        self.assertEqual(summary.rendered, [os.path.join(self.tmp_dir, "wall_1.png")])
+        self.assertEqual(summary.failed, {os.path.join(self.tmp_dir, "wall_2.png"): "Unknown camera profile: lost"})
+
+    def test_source_change_invalidates_outputs(self):
+        Project.load(self.project_path).reexport(workers=1)
+        cv2.imwrite(self.source, np.full((120, 160, 3), 7, dtype=np.uint8))
+        os.utime(self.source, ns=(0, 1))
+        summary = Project.load(self.project_path).reexport(workers=1)
+        self.assertEqual(len(summary.rendered), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# tests/test_quad_detector.py
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from src.cli import main
+from src.core.quad_detector import detect_quads, order_corners
+
+
+def scene(quads, size=(1500, 2000), seed=0) -> np.ndarray:
+    """Textured samples on a noisy green backdrop."""
+    rng = np.random.default_rng(seed)
+    image = cv2.add(np.full(size + (3,), (40, 90, 40), np.uint8), rng.integers(0, 30, size + (3,), dtype=np.uint8))
+    for points in quads:
+        texture = cv2.resize(rng.integers(120, 255, (30, 40, 3), dtype=np.uint8), (400, 300))
+        # Texture pixel centres sit half a pixel inside its outline
+        outline = np.float32([[-0.5, -0.5], [399.5, -0.5], [399.5, 299.5], [-0.5, 299.5]])
+        H = cv2.getPerspectiveTransform(outline, np.float32(points))
+        warped = cv2.warpPerspective(texture, H, size[::-1])
+        mask = cv2.warpPerspective(np.full((300, 400), 255, np.uint8), H, size[::-1]) > 0
+        image[mask] = warped[mask]
+    return image
+
+
+class TestQuadDetector(unittest.TestCase):
+    def setUp(self):
+        self.points = np.array([[450, 350], [1550, 410], [1475, 1200], [500, 1125]], dtype=np.float32)
+
+    def test_detects_single_sample(self):
+        quads = detect_quads(scene([self.points]))
+        self.assertGreaterEqual(quads[0].confidence, 0.6)
+        self.assertLess(np.abs(np.array(quads[0].points) - self.points).max(), 1.0)
+
+    def test_detects_several_samples(self):
+        left = [[100, 100], [800, 120], [780, 700], [120, 680]]
+        right = [[1100, 500], [1900, 520], [1880, 1400], [1120, 1380]]
+        quads = [quad for quad in detect_quads(scene([left, right])) if quad.confidence >= 0.6]
+        self.assertEqual(len(quads), 2)
+        found = sorted(quad.points[0][0] for quad in quads)
+        self.assertAlmostEqual(found[0], 100, delta=3)
+        self.assertAlmostEqual(found[1], 1100, delta=3)
+
+    def test_low_confidence_without_sample(self):
+        quads = detect_quads(scene([]))
+        self.assertTrue(all(quad.confidence < 0.6 for quad in quads))
+
+    def test_order_corners(self):
+        shuffled = self.points[[2, 0, 3, 1]]
+        np.testing.assert_array_equal(order_corners(shuffled), self.points)
+
+
+class TestDetectCommand(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_batch_skips_low_confidence(self):
+        cv2.imwrite(os.path.join(self.tmp_dir, "sample.png"),
+                    scene([[[450, 350], [1550, 410], [1475, 1200], [500, 1125]]]))
+        cv2.imwrite(os.path.join(self.tmp_dir, "empty.png"), scene([]))
+        project_path = os.path.join(self.tmp_dir, "project.json")
+
+        index_path = os.path.join(self.tmp_dir, "index.json")
+        self.assertEqual(main(["detect", project_path, self.tmp_dir, "--resolution", "64x64", "--export",
+                               "--index", index_path]), 0)
+        with open(project_path) as f:
+            sources = json.load(f)["sources"]
+        self.assertEqual([source["path"] for source in sources], ["sample.png"])
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, "sample_1.png")))
+
+
+if __name__ == '__main__':
+    unittest.main()
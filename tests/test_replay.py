@@ -0,0 +1,92 @@
+# tests/test_replay.py
+
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import cv2
+import numpy as np
+from src.core import phash_index, textractor
+from src.ui.headless import HeadlessMaster, HeadlessUI
+from src.ui.replay import InteractionRecorder, load_trace, percentile, replay
+
+TRACE_DIR = os.path.join(os.path.dirname(__file__), "traces")
+# Generous enough for a loaded CI machine; a preview pipeline that blocks or drops results blows through it
+MAX_P90_MS = 3000
+
+
+def make_wall(path):
+    """The image the checked-in traces load: a 1200x900 wall with a textured panel on it."""
+    rng = np.random.default_rng(11)
+    wall = np.full((900, 1200, 3), 90, dtype=np.uint8)
+    panel = cv2.resize(rng.integers(0, 255, (40, 50, 3), dtype=np.uint8), (700, 480), interpolation=cv2.INTER_CUBIC)
+    matrix = cv2.getPerspectiveTransform(np.float32([[0, 0], [700, 0], [700, 480], [0, 480]]),
+                                         np.float32([[267, 200], [933, 227], [907, 693], [293, 667]]))
+    cv2.warpPerspective(panel, matrix, (1200, 900), dst=wall, borderMode=cv2.BORDER_TRANSPARENT)
+    cv2.imwrite(path, wall)
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.wall = os.path.join(self.tmp_dir, "wall.png")
+        make_wall(self.wall)
+        # Keep the user's recent files and hash index out of it
+        self.patches = [patch.object(textractor, "load_recent_files", return_value=[]),
+                        patch.object(textractor, "save_recent_files"),
+                        patch.object(phash_index, "PHASH_INDEX_PATH", os.path.join(self.tmp_dir, "phash_index.json"))]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_trace_corpus(self):
+        paths = sorted(glob.glob(os.path.join(TRACE_DIR, "*.json")))
+        self.assertTrue(paths)
+        for path in paths:
+            with self.subTest(trace=os.path.basename(path)):
+                report = replay(load_trace(path), {"wall.png": self.wall})
+                self.assertEqual(report.errors, [])
+                self.assertGreater(report.displayed, 0)
+                self.assertGreater(report.coalesced, 0)  # Drags request more extractions than frames
+                self.assertEqual(report.unanswered, 0)
+                self.assertLess(percentile(report.latencies_ms, 0.9), MAX_P90_MS, report.summary())
+
+    def test_recorded_session_replays(self):
+        app = textractor.Textractor(HeadlessMaster(), ui_factory=HeadlessUI)
+        recorder = InteractionRecorder(app)
+        app.load_image(self.wall)
+        app.clear_selection()
+        for x, y in [(200, 150), (700, 170), (680, 520), (220, 500)]:
+            app.on_move(Event(x - 5, y))
+            app.on_press(Event(x, y))
+            app.on_release(Event(x, y))
+        app.ui.flip_var.set(True)
+        app.undo()
+        app.redo()
+        path = os.path.join(self.tmp_dir, "session.json")
+        recorder.save(path)
+
+        trace = load_trace(path)
+        self.assertEqual([event.get("method") or event.get("handler") or event["name"] for event in trace["events"]],
+                         ["load_image", "clear_selection"] + ["on_move", "on_press", "on_release"] * 4 +
+                         ["flip_var", "undo", "redo"])
+        self.assertEqual(trace["events"][0]["args"], [self.wall])
+        report = replay(trace, speed=4)
+        self.assertEqual(report.errors, [])
+        self.assertEqual(report.unanswered, 0)
+        self.assertGreaterEqual(report.displayed, 1)
+
+
+class Event:
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+
+
+if __name__ == '__main__':
+    unittest.main()
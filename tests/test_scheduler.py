@@ -0,0 +1,69 @@
+# tests/test_scheduler.py
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from src.core.engine import ExtractionSession
+from src.core.project import Project, estimate_source
+from src.core.scheduler import JobEstimate, dispatch, simulate
+
+
+class TestScheduler(unittest.TestCase):
+    def test_largest_first_shortens_the_makespan(self):
+        jobs = [JobEstimate(f"small{i}", 1.0, 1) for i in range(12)] + [JobEstimate("huge", 10.0, 1)]
+        self.assertEqual(simulate(jobs, 4, 100, largest_first=False), 13.0)
+        self.assertEqual(simulate(jobs, 4, 100), 10.0)
+
+    def test_memory_budget_limits_concurrent_jobs(self):
+        lock = threading.Lock()
+        running, peak = [0], [0]
+
+        def work(memory):
+            with lock:
+                running[0] += memory
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= memory
+            return memory
+
+        jobs = [JobEstimate(f"big{i}", 10.0, 60, (60,)) for i in range(3)] + \
+               [JobEstimate(f"small{i}", 1.0, 10, (10,)) for i in range(4)] + \
+               [JobEstimate("oversized", 5.0, 150, (150,))]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            finished = [(job.name, future.result()) for job, future in dispatch(executor, work, jobs, 4, 100)]
+        self.assertEqual(len(finished), len(jobs))
+        # The oversized job ran alone; everything else stayed within the budget
+        self.assertEqual(peak[0], 150)
+        self.assertEqual(simulate(jobs, 4, 100), 10.0 * 3 + 5.0)
+
+    def test_estimates_come_from_headers_and_output_sizes(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            project = Project(os.path.join(tmp_dir, "library.json"))
+            sources = []
+            for name, size in (("small.png", (100, 150)), ("large.png", (800, 1200))):
+                path = os.path.join(tmp_dir, name)
+                cv2.imwrite(path, np.zeros(size + (3,), dtype=np.uint8))
+                session = ExtractionSession(np.zeros(size + (3,), dtype=np.uint8))
+                height, width = size
+                session.set_points([(0, 0), (width - 1, 0), (width - 1, height - 1), (0, height - 1)])
+                project.add_selection(path, session)
+                sources.append(path)
+            by_source = project.stale_tasks()
+            small, large = (estimate_source(source, by_source[source]) for source in sources)
+            self.assertGreater(large.cost, 30 * small.cost)
+            self.assertGreaterEqual(large.memory, 800 * 1200 * 3 * 2)
+            self.assertEqual(large.args[0], sources[1])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+# tests/test_sequence.py
+
+import os
+import shutil
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from src.core.image_processor import ImageProcessor
+from src.core.sequence import QuadTracker, SequenceWriter, extract_sequence, read_frames
+
+
+def textured_frame(offset_x: int = 0, offset_y: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    texture = cv2.GaussianBlur(rng.integers(0, 255, (300, 400, 3), dtype=np.uint8), (5, 5), 0)
+    M = np.float32([[1, 0, offset_x], [0, 1, offset_y]])
+    return cv2.warpAffine(texture, M, (400, 300), borderMode=cv2.BORDER_REFLECT)
+
+
+class TestSequence(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.points = [(100.0, 80.0), (300.0, 90.0), (290.0, 220.0), (110.0, 210.0)]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_remap_tables_match_warp(self):
+        frame = textured_frame()
+        for quality in ("Fast", "Balanced", "High"):
+            maps = ImageProcessor.perspective_maps(frame.shape, self.points, 160, 100, quality)
+            expected = ImageProcessor.extract_texture(frame, self.points, 160, 100, quality=quality)
+            difference = np.abs(maps.apply(frame).astype(int) - expected.astype(int))
+            self.assertLess(difference.mean(), 1.0, quality)
+
+    def test_static_sequence(self):
+        source = os.path.join(self.tmp_dir, "in", "frame_%03d.png")
+        os.makedirs(os.path.dirname(source))
+        for i in range(5):
+            cv2.imwrite(source % i, textured_frame())
+
+        output = os.path.join(self.tmp_dir, "out")
+        count = extract_sequence(source, output, self.points, resolution="64x48")
+        self.assertEqual(count, 5)
+        frames = list(read_frames(output))
+        self.assertEqual(len(frames), 5)
+        self.assertEqual(frames[0].shape, (48, 64, 3))
+        np.testing.assert_array_equal(frames[0], frames[4])
+
+    def test_video_takes_bgra_gray_and_16_bit_frames(self):
+        output = os.path.join(self.tmp_dir, "out.mp4")
+        bgra = cv2.cvtColor(textured_frame()[:32, :48], cv2.COLOR_BGR2BGRA)
+        with SequenceWriter(output) as writer:
+            writer.write(bgra)
+            writer.write(cv2.cvtColor(bgra, cv2.COLOR_BGRA2GRAY))
+            writer.write(bgra.astype(np.uint16) * 257)
+        frames = list(read_frames(output))
+        self.assertEqual(len(frames), 3)
+        self.assertEqual(frames[0].shape, (32, 48, 3))
+        # 16-bit frames are scaled down, not saturated (the codec is lossy, so compare brightness only)
+        self.assertAlmostEqual(frames[2].mean(), bgra[:, :, :3].mean(), delta=5)
+
+    def test_tracker_follows_camera_motion(self):
+        tracker = QuadTracker(np.array(self.points))
+        for step in range(6):
+            corners = tracker.update(textured_frame(offset_x=3 * step, offset_y=2 * step))
+        expected = np.array(self.points) + [15, 10]
+        self.assertLess(np.abs(corners - expected).max(), 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
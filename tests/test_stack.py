@@ -0,0 +1,100 @@
+# tests/test_stack.py
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from src.cli import main
+from src.core.stack import MedianAccumulator, SigmaClipAccumulator, StackFrame, stack_frames, stack_quads, \
+    weighted_median
+
+
+class TestAccumulators(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(8)
+        self.frames = rng.normal(100, 10, (23, 16, 12, 3)).astype(np.float32)
+
+    def test_mean_and_exact_median(self):
+        np.testing.assert_allclose(stack_frames(iter(self.frames), "mean"), self.frames.mean(axis=0), atol=1e-3)
+        np.testing.assert_array_equal(stack_frames(iter(self.frames[:5]), "median"), np.median(self.frames[:5], axis=0))
+        np.testing.assert_array_equal(stack_frames(iter(self.frames[:4]), "median"), np.median(self.frames[:4], axis=0))
+
+    def test_remedian_keeps_a_few_frames_per_level(self):
+        accumulator = MedianAccumulator(base=3)
+        for frame in self.frames:
+            accumulator.add(frame)
+            self.assertLessEqual(sum(len(frames) for frames in accumulator.levels), 2 * len(accumulator.levels))
+        # 23 = 2 * 9 + 1 * 3 + 2: two level-2 medians, one level-1 median and two frames
+        self.assertEqual([len(frames) for frames in accumulator.levels], [2, 1, 2])
+        approximate = accumulator.result()
+        exact = np.median(self.frames, axis=0)
+        self.assertLess(np.abs(approximate - exact).mean(), 3.0)  # A third of the noise
+
+        values = np.array([[1.0], [5.0], [2.0]])
+        np.testing.assert_array_equal(weighted_median(values, np.array([1, 1, 1])), [2.0])
+        np.testing.assert_array_equal(weighted_median(values, np.array([1, 3, 1])), [5.0])
+        np.testing.assert_array_equal(weighted_median(values[:2], np.array([1, 1])), [3.0])
+
+    def test_robust_methods_ignore_outliers(self):
+        frames = np.full((8, 10, 10, 3), 100, dtype=np.uint8) + np.arange(8, dtype=np.uint8)[:, None, None, None] % 3
+        frames[5, 2:6, 2:6] = 255  # Something passing through one shot
+        for method in ("median", "sigma-clip"):
+            stacked = stack_frames(iter(frames), method)
+            self.assertEqual(stacked.dtype, np.uint8)
+            self.assertLessEqual(int(stacked[3, 3, 0]), 102, method)
+        self.assertGreater(int(stack_frames(iter(frames), "mean")[3, 3, 0]), 115)
+
+        accumulator = SigmaClipAccumulator(kappa=2.5)
+        for frame in frames:
+            accumulator.add(frame)
+        self.assertAlmostEqual(accumulator.rejected, 16 / 800, places=3)
+
+
+class TestStackQuads(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(4)
+        self.texture = cv2.resize(rng.integers(40, 215, (20, 30, 3), dtype=np.uint8), (300, 200),
+                                  interpolation=cv2.INTER_CUBIC)
+        plane = np.float32([[0, 0], [299, 0], [299, 199], [0, 199]])
+        self.frames = []
+        for i, points in enumerate([[(20, 30), (330, 20), (340, 250), (30, 240)],
+                                    [(40, 20), (350, 40), (330, 260), (20, 230)],
+                                    [(25, 25), (320, 35), (345, 245), (35, 255)]]):
+            H = cv2.getPerspectiveTransform(plane, np.float32(points))
+            photo = cv2.warpPerspective(self.texture, H, (380, 290), flags=cv2.INTER_CUBIC)
+            noisy = np.clip(photo + rng.normal(0, 12, photo.shape), 0, 255).astype(np.uint8)
+            path = os.path.join(self.tmp_dir, f"shot{i}.png")
+            cv2.imwrite(path, noisy)
+            self.frames.append(StackFrame(path, points))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def error(self, texture):
+        return np.abs(texture[3:-3, 3:-3].astype(np.float32) - self.texture[3:-3, 3:-3]).mean()
+
+    def test_stacking_reduces_noise(self):
+        single = stack_quads(self.frames[:1], 300, 200)
+        for method in ("mean", "median", "sigma-clip"):
+            stacked = stack_quads(self.frames, 300, 200, method=method)
+            self.assertEqual(stacked.shape, (200, 300, 3))
+            self.assertLess(self.error(stacked), self.error(single) * 0.8, method)
+
+    def test_cli(self):
+        spec = {"frames": [{"image": os.path.basename(frame.image), "points": frame.points} for frame in self.frames]}
+        spec_path = os.path.join(self.tmp_dir, "stack.json")
+        with open(spec_path, 'w') as f:
+            json.dump(spec, f)
+        output = os.path.join(self.tmp_dir, "stacked.png")
+        self.assertEqual(main(["stack", spec_path, output, "--method", "mean", "--align"]), 0)
+        stacked = cv2.imread(output)
+        # Sized from the most detailed selection
+        self.assertEqual(stacked.shape[:2], (221, 311))
+
+
+if __name__ == '__main__':
+    unittest.main()
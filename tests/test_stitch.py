@@ -0,0 +1,88 @@
+# tests/test_stitch.py
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from src.cli import main
+from src.core.stitch import StitchPiece, Stitcher, piece_maps, plane_rect, register_pieces
+
+
+class TestStitch(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(3)
+        self.texture = cv2.resize(rng.integers(0, 255, (30, 40, 3), dtype=np.uint8), (400, 300),
+                                  interpolation=cv2.INTER_CUBIC)
+        # Two photos of overlapping halves of the texture, each taken from a different angle
+        self.left = self.photograph(plane_rect(0, 0, 240, 300), [(30, 20), (300, 45), (290, 330), (15, 310)])
+        self.right = self.photograph(plane_rect(160, 0, 240, 300), [(50, 35), (330, 10), (345, 300), (40, 330)])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def photograph(self, plane, points):
+        H = cv2.getPerspectiveTransform(np.float32(plane), np.float32(points))
+        image = cv2.warpPerspective(self.texture, H, (380, 360), flags=cv2.INTER_CUBIC)
+        return image, points, plane
+
+    def pieces(self, right_offset=(0, 0)):
+        (left, left_points, left_plane), (right, right_points, right_plane) = self.left, self.right
+        right_plane = [(x + right_offset[0], y + right_offset[1]) for x, y in right_plane]
+        return [StitchPiece(left, left_points, left_plane, name="left"),
+                StitchPiece(right, right_points, right_plane, name="right")]
+
+    def assert_reconstructs_texture(self, mosaic):
+        # The outermost pixels are interpolated against the black background of the photos
+        difference = np.abs(mosaic[2:-2, 2:-2].astype(np.int16) - self.texture[2:-2, 2:-2].astype(np.int16))
+        self.assertLess(difference.mean(), 2.0)
+
+    def test_blends_reconstruct_the_plane(self):
+        for blend in ("feather", "multiband"):
+            stitcher = Stitcher(self.pieces(), blend=blend)
+            self.assertEqual((stitcher.width, stitcher.height), (400, 300))
+            self.assert_reconstructs_texture(stitcher.render_tile(0, 0, 400, 300))
+
+    def test_tiles_match_a_single_render(self):
+        for blend, tolerance in (("feather", 1), ("multiband", 3)):
+            whole = Stitcher(self.pieces(), blend=blend, tile=1024).render_tile(0, 0, 400, 300)
+            path = os.path.join(self.tmp_dir, f"{blend}.npy")
+            Stitcher(self.pieces(), blend=blend, tile=96).write(path)
+            tiled = np.load(path)
+            self.assertEqual(tiled.shape, whole.shape)
+            self.assertLessEqual(np.abs(tiled.astype(np.int16) - whole.astype(np.int16)).max(), tolerance)
+
+    def test_tiles_read_only_the_quad(self):
+        left = self.pieces()[0]
+        # Most of this tile lies right of the left piece, where its homography runs far past the quad
+        roi = piece_maps(left, 200, 0, 400, 300).roi
+        self.assertLessEqual(roi[2], 300 + 8)
+        self.assertGreaterEqual(roi[0], 15 - 8)
+
+    def test_registration_recovers_a_misplaced_piece(self):
+        pieces = self.pieces(right_offset=(6, -4))
+        shifts = register_pieces(pieces, scale=0.5)
+        self.assertEqual(shifts[0], (0.0, 0.0))
+        np.testing.assert_allclose(shifts[1], (-6, 4), atol=1.0)
+        self.assert_reconstructs_texture(Stitcher(pieces, 400, 300).render_tile(0, 0, 400, 300))
+
+    def test_command_line(self):
+        entries = []
+        for name, (image, points, plane) in (("left.png", self.left), ("right.png", self.right)):
+            cv2.imwrite(os.path.join(self.tmp_dir, name), image)
+            x, y = plane[0]
+            entries.append({"image": name, "points": points,
+                            "plane": {"x": x, "y": y, "width": 240, "height": 300}})
+        spec_path = os.path.join(self.tmp_dir, "wall.json")
+        with open(spec_path, 'w') as f:
+            json.dump({"width": 400, "height": 300, "pieces": entries}, f)
+        output = os.path.join(self.tmp_dir, "wall.png")
+        self.assertEqual(main(["stitch", spec_path, output, "--tile", "128"]), 0)
+        self.assert_reconstructs_texture(cv2.imread(output))
+
+
+if __name__ == '__main__':
+    unittest.main()
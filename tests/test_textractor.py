@@ -12,7 +12,8 @@ class TestTextractor(unittest.TestCase):
         self.root = tk.Tk()
         with patch('src.core.textractor.UIManager'), \
                 patch('src.core.textractor.ImageProcessor'), \
-                patch('src.core.textractor.load_recent_files'):
+                patch('src.core.textractor.load_recent_files'), \
+                patch('src.core.textractor.HashIndex'):
             self.textractor = Textractor(self.root)
 
     def tearDown(self):
@@ -44,11 +45,30 @@ class TestTextractor(unittest.TestCase):
         self.assertEqual(self.textractor.points, [])
         self.assertEqual(self.textractor.original_points, [])
 
+    @patch('src.core.textractor.detect_quads', return_value=[])
+    def test_auto_detect_reports_only_interactive_misses(self, mock_detect_quads):
+        self.textractor.image = np.zeros((100, 100, 3), dtype=np.uint8)
+        self.textractor.auto_detect(min_confidence=0.0, interactive=False)
+        self.textractor.ui.update_status.assert_not_called()
+        self.textractor.auto_detect(min_confidence=0.5)
+        self.textractor.ui.update_status.assert_called_once()
+
     def test_estimate_aspect_ratio(self):
         self.textractor.points = [(0, 0), (1, 0), (1, 1), (0, 1)]
         self.textractor.estimate_aspect_ratio()
         self.assertEqual(self.textractor.aspect_ratio, 1.0)
 
+    def test_calculate_output_size_original_policy(self):
+        self.textractor.sizing_policy = "Original"
+        self.textractor.aspect_ratio = 2.0
+        points = np.array([(0, 0), (300, 0), (300, 150), (0, 150)], dtype=np.float32)
+        self.assertEqual(self.textractor._calculate_output_size(points, 6000), (6000, 3000))
+
+    def test_calculate_output_size_fixed_resolution(self):
+        self.textractor.update_output_resolution("1024x1024")
+        points = np.array([(0, 0), (300, 0), (300, 150), (0, 150)], dtype=np.float32)
+        self.assertEqual(self.textractor._calculate_output_size(points, 6000), (1024, 1024))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
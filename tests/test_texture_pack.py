@@ -0,0 +1,149 @@
+# tests/test_texture_pack.py
+
+import os
+import shutil
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from src.cli import main
+from src.core.engine import ExtractionSession
+from src.core.project import Project
+from src.core.texture_pack import HEADER_SIZE, TexturePack, TexturePackError
+
+
+class TestTexturePack(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "textures.pack")
+        rng = np.random.default_rng(6)
+        self.color = rng.integers(0, 255, (30, 40, 3), dtype=np.uint8)
+        self.gray16 = rng.integers(0, 65535, (17, 9), dtype=np.uint16)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_round_trip_and_zero_copy_reads(self):
+        quad = [(1.5, 2.0), (40.0, 2.0), (40.0, 30.0), (1.5, 30.0)]
+        with TexturePack(self.path, "a") as pack:
+            pack.append("walls/brick.png", self.color, source_hash="ab" * 32, key="cd" * 32, quad=quad)
+            pack.append("floor.png", self.gray16, format="png")
+            np.testing.assert_array_equal(pack.read("floor.png"), self.gray16)  # Readable before the index is written
+
+        with TexturePack(self.path) as pack:
+            self.assertEqual(list(pack), ["walls/brick.png", "floor.png"])
+            brick = pack.read("walls/brick.png")
+            np.testing.assert_array_equal(brick, self.color)
+            self.assertFalse(brick.flags.writeable)
+            self.assertFalse(brick.flags.owndata)
+            self.assertEqual(pack.entry("walls/brick.png").offset % 64, 0)
+            entry = pack.entry("walls/brick.png")
+            self.assertEqual((entry.source_hash, entry.key, entry.quad), ("ab" * 32, "cd" * 32, quad))
+            self.assertIsNone(pack.entry("floor.png").quad)
+            np.testing.assert_array_equal(pack.read("floor.png"), self.gray16)
+            with self.assertRaises(TexturePackError):
+                pack.append("more.png", self.color)
+
+    def test_replace_remove_and_compact(self):
+        with TexturePack(self.path, "a") as pack:
+            pack.append("a.png", self.color)
+            pack.append("b.png", self.gray16)
+        # On POSIX a reader opened before the changes keeps seeing the old textures, even after compaction
+        with TexturePack(self.path) as reader, TexturePack(self.path, "a") as pack:
+            if os.name == "nt":
+                reader.close()
+            pack.append("a.png", self.color[::-1])
+            pack.remove("b.png")
+            pack.flush()
+            self.assertGreater(pack.dead_bytes, self.color.nbytes)
+            pack.compact()
+            self.assertLess(pack.dead_bytes, 64)
+            if os.name != "nt":
+                np.testing.assert_array_equal(reader.read("a.png"), self.color)
+                np.testing.assert_array_equal(reader.read("b.png"), self.gray16)
+        with TexturePack(self.path) as pack:
+            self.assertEqual(list(pack), ["a.png"])
+            np.testing.assert_array_equal(pack.read("a.png"), self.color[::-1])
+            self.assertLess(pack.size, HEADER_SIZE + self.color.nbytes + 256)
+
+    def test_compact_refuses_while_textures_are_in_use(self):
+        with TexturePack(self.path, "a") as pack:
+            pack.append("a.png", self.color)
+            pack.append("a.png", self.color[::-1])
+            texture = pack.read("a.png")
+            with self.assertRaises(TexturePackError):
+                pack.compact()
+            np.testing.assert_array_equal(texture, self.color[::-1])
+            del texture
+            self.assertGreater(pack.compact(), 0)
+            np.testing.assert_array_equal(pack.read("a.png"), self.color[::-1])
+
+    def test_unfinished_append_leaves_the_previous_index(self):
+        with TexturePack(self.path, "a") as pack:
+            pack.append("a.png", self.color)
+        size = os.path.getsize(self.path)
+        pack = TexturePack(self.path, "a")
+        pack.append("b.png", self.gray16)
+        pack._file.flush()  # Data written, but the process dies before the index is
+        with TexturePack(self.path) as reader:
+            self.assertEqual(list(reader), ["a.png"])
+        self.assertGreater(os.path.getsize(self.path), size)
+        pack.close()
+
+    def test_project_export(self):
+        source = os.path.join(self.tmp_dir, "wall.png")
+        image = np.zeros((120, 160, 3), dtype=np.uint8)
+        image[20:100, 20:140] = (0, 128, 255)
+        cv2.imwrite(source, image)
+        project_path = os.path.join(self.tmp_dir, "library.json")
+        project = Project(project_path)
+        session = ExtractionSession(image)
+        for points in ([(20, 20), (140, 20), (140, 100), (20, 100)], [(0, 0), (80, 0), (80, 80), (0, 80)]):
+            session.set_points(points)
+            project.add_selection(source, session)
+        project.save()
+
+        self.assertEqual(main(["pack", "build", project_path, self.path]), 0)
+        with TexturePack(self.path) as pack:
+            self.assertEqual(list(pack), ["wall_1.png", "wall_2.png"])
+            self.assertEqual(pack.read("wall_1.png").shape, (80, 120, 3))
+            self.assertEqual(pack.entry("wall_1.png").source_hash, project.data["sources"][0]["hash"])
+        summary = Project.load(project_path).export_pack(self.path)
+        self.assertEqual((len(summary.rendered), len(summary.skipped)), (0, 2))
+        # Changing only the format re-renders too
+        summary = Project.load(project_path).export_pack(self.path, format="png")
+        self.assertEqual(len(summary.rendered), 2)
+        with TexturePack(self.path) as pack:
+            self.assertEqual(pack.entry("wall_1.png").format, "png")
+        summary = Project.load(project_path).export_pack(self.path, format="png", overrides={"resolution": "32x32"})
+        self.assertEqual(len(summary.rendered), 2)
+        # Replacing every texture left more dead bytes than live ones, so the pack was compacted
+        with TexturePack(self.path) as pack:
+            self.assertEqual(pack.read("wall_2.png").shape, (32, 32, 3))
+            self.assertLess(pack.dead_bytes, 128)
+
+        self.assertEqual(main(["pack", "extract", self.path, os.path.join(self.tmp_dir, "out.png"), "wall_2.png"]), 0)
+        self.assertEqual(cv2.imread(os.path.join(self.tmp_dir, "out.png")).shape, (32, 32, 3))
+
+    def test_names_cannot_escape(self):
+        source = os.path.join(self.tmp_dir, "project", "wall.png")
+        os.makedirs(os.path.dirname(source))
+        cv2.imwrite(source, self.color)
+        project = Project(os.path.join(self.tmp_dir, "project", "library.json"))
+        session = ExtractionSession(self.color)
+        session.set_points([(0, 0), (39, 0), (39, 29), (0, 29)])
+        project.add_selection(source, session, output=os.path.join(self.tmp_dir, "outside.png"))
+        summary = project.export_pack(self.path)
+        self.assertEqual((summary.rendered, list(summary.failed)), ([], [os.path.join(self.tmp_dir, "outside.png")]))
+
+        with TexturePack(self.path, "a") as pack:
+            pack.append("../escaped.png", self.color)
+            pack.append("inside.png", self.color)
+        target = os.path.join(self.tmp_dir, "target")
+        self.assertEqual(main(["pack", "extract", self.path, target]), 1)
+        self.assertTrue(os.path.exists(os.path.join(target, "inside.png")))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, "escaped.png")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# tests/test_tiled_image.py
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import cv2
+import numpy as np
+from PIL import Image
+from src.core import tiled_image
+from src.core.engine import ExtractionSession, load_image
+from src.core.image_processor import ImageProcessor
+from src.core.mesh_warp import extract_mesh_texture, mesh_from_quad
+from src.core.tiled_image import ImageInfo, TiledImage, build_tiled_image, probe_image
+
+
+class TestTiledImage(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.image = cv2.resize(rng.integers(0, 255, (75, 90, 3), dtype=np.uint8), (901, 750))
+        self.tiled = build_tiled_image(self.image, os.path.join(self.tmp_dir, "pyramid"), tile=64)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_levels_match_pyrdown_of_whole_image(self):
+        level = self.image
+        for n, (height, width) in enumerate(self.tiled.level_shapes):
+            np.testing.assert_array_equal(self.tiled.read(n, 0, 0, width, height), level)
+            level = cv2.pyrDown(level)
+        self.assertLessEqual(max(self.tiled.level_shapes[-1]), 64)
+
+    def assert_close(self, actual, expected):
+        # In-memory warps reduce just the ROI, so pixels next to its edge may be rounded differently
+        difference = np.abs(actual.astype(np.int16) - expected.astype(np.int16))
+        self.assertLessEqual(difference.max(), 1)
+        self.assertLess(np.count_nonzero(difference), difference.size * 0.01)
+
+    def test_extraction_matches_in_memory_image(self):
+        points = [(103.5, 88.0), (811.0, 140.0), (760.0, 700.0), (60.0, 655.0)]
+        for width, height, quality in ((600, 500, "Balanced"), (120, 100, "Balanced"), (30, 25, "High")):
+            self.assert_close(ImageProcessor.extract_texture(self.tiled, points, width, height, quality),
+                              ImageProcessor.extract_texture(self.image, points, width, height, quality))
+            maps = ImageProcessor.perspective_maps(self.image.shape, points, width, height, quality)
+            self.assert_close(maps.apply(self.tiled), maps.apply(self.image))
+        mesh = mesh_from_quad(points, 3, 3)
+        mesh[1, 1] += (12, -7)
+        self.assert_close(extract_mesh_texture(self.tiled, mesh, 90, 80),
+                          extract_mesh_texture(self.image, mesh, 90, 80))
+
+    def test_grayscale_and_overview(self):
+        gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        tiled = build_tiled_image(gray, os.path.join(self.tmp_dir, "gray"), tile=128)
+        self.assertEqual(tiled.shape, gray.shape)
+        np.testing.assert_array_equal(tiled.read(0, 100, 200, 400, 333), gray[200:333, 100:400])
+        overview, scale = tiled.overview(300)
+        self.assertLessEqual(max(overview.shape), 300)
+        self.assertAlmostEqual(scale, overview.shape[1] / gray.shape[1])
+
+    def test_load_image_converts_large_sources_once(self):
+        path = os.path.join(self.tmp_dir, "large.npy")
+        np.save(path, self.image)
+        with patch.object(tiled_image, "TILED_IMAGE_MIN_PIXELS", 500 * 500), \
+                patch.object(tiled_image, "TILED_CACHE_DIR", os.path.join(self.tmp_dir, "cache")):
+            image = load_image(path)
+            self.assertIsInstance(image, TiledImage)
+            with patch.object(tiled_image, "build_tiled_image") as build:
+                self.assertEqual(load_image(path).path, image.path)
+            build.assert_not_called()
+        self.assertIsInstance(load_image(path), np.ndarray)
+
+        session = ExtractionSession(pickle.loads(pickle.dumps(image)))
+        session.set_points([(100, 100), (800, 100), (800, 700), (100, 700)])
+        session.preview_size = None
+        self.assertEqual(session.extract().warped.shape[:2], (600, 700))
+
+    def test_probe_reads_headers_past_the_decompression_bomb_limit(self):
+        path = os.path.join(self.tmp_dir, "large.png")
+        cv2.imwrite(path, np.zeros((750, 901, 4), dtype=np.uint16))
+        with patch.object(Image, "MAX_IMAGE_PIXELS", 1000):
+            self.assertEqual(probe_image(path), ImageInfo(901, 750, 4, 16))
+            self.assertEqual(Image.MAX_IMAGE_PIXELS, 1000)
+        text = os.path.join(self.tmp_dir, "notes.txt")
+        with open(text, "w") as f:
+            f.write("not an image")
+        self.assertIsNone(probe_image(text))
+
+
+if __name__ == '__main__':
+    unittest.main()
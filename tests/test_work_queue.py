@@ -0,0 +1,87 @@
+# tests/test_work_queue.py
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import cv2
+import numpy as np
+from src.config.settings import BASE_DIR
+from src.core.engine import ExtractionSession
+from src.core.project import Project
+from src.core.work_queue import WorkQueue, run_worker
+
+
+class TestWorkQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.project_path = os.path.join(self.tmp_dir, "library.json")
+        self.queue_dir = os.path.join(self.tmp_dir, "queue")
+        project = Project(self.project_path)
+        rng = np.random.default_rng(0)
+        for i in range(6):
+            source = os.path.join(self.tmp_dir, f"photo_{i}.png")
+            image = rng.integers(0, 255, (120, 160, 3), dtype=np.uint8)
+            cv2.imwrite(source, image)
+            session = ExtractionSession(image)
+            session.set_resolution("48x32")
+            session.set_points([(10, 10), (150, 12), (148, 110), (12, 108)])
+            project.add_selection(source, session)
+            session.set_points([(0, 0), (60, 0), (60, 60), (0, 60)])
+            project.add_selection(source, session)
+        project.save()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_workers_share_queue(self):
+        queue = WorkQueue(self.queue_dir)
+        self.assertEqual(len(queue.submit(Project.load(self.project_path))), 6)
+        # Submitting again while the jobs are queued adds nothing
+        self.assertEqual(queue.submit(Project.load(self.project_path)), [])
+
+        workers = [subprocess.Popen([sys.executable, "-m", "src.cli", "queue", "work", self.queue_dir,
+                                     "--name", f"worker{i}"], cwd=BASE_DIR,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) for i in range(3)]
+        for worker in workers:
+            self.assertEqual(worker.wait(timeout=120), 0)
+
+        status = queue.status()
+        self.assertTrue(status.finished)
+        self.assertEqual((status.counts["done"], status.rendered, len(status.failed)), (6, 12, 0))
+        self.assertEqual(sum(status.workers.values()), 6)
+        self.assertEqual(cv2.imread(os.path.join(self.tmp_dir, "photo_3_1.png")).shape, (32, 48, 3))
+
+        # Once collected into the project, nothing is stale any more
+        project = Project.load(self.project_path)
+        self.assertEqual(len(queue.collect(project).rendered), 12)
+        self.assertEqual(Project.load(self.project_path).stale_tasks(), {})
+
+    def test_expired_lease_is_retried(self):
+        queue = WorkQueue(self.queue_dir, lease_seconds=60)
+        queue.submit(Project.load(self.project_path))
+        abandoned = queue.claim()
+        self.assertEqual(abandoned["attempts"], 1)
+
+        # The worker holding the lease died a while ago
+        stale = time.time() - 120
+        os.utime(queue.path("leased", abandoned["id"]), (stale, stale))
+        self.assertEqual(run_worker(queue, worker="survivor", poll_seconds=0.01), 6)
+        status = queue.status()
+        self.assertEqual((status.counts["done"], status.counts["leased"], status.rendered), (6, 0, 12))
+
+    def test_failed_jobs_give_up(self):
+        queue = WorkQueue(self.queue_dir, max_attempts=2)
+        queue.submit(Project.load(self.project_path))
+        os.remove(os.path.join(self.tmp_dir, "photo_0.png"))
+        run_worker(queue, worker="worker", poll_seconds=0.01)
+        status = queue.status()
+        self.assertEqual((status.counts["done"], status.counts["failed"]), (5, 1))
+        self.assertEqual(sorted(os.path.basename(output) for output in status.failed), ["photo_0_1.png", "photo_0_2.png"])
+
+
+if __name__ == '__main__':
+    unittest.main()